@@ -1,26 +1,39 @@
-import pandas as pd
+from time import perf_counter
+_debut_phase = perf_counter()
+
 import streamlit as st
-from datetime import date, timedelta, time
-import numpy as np
+from datetime import date, datetime, timedelta
 import os
-import calendar
-import io
-import re
-from collections import defaultdict
-import locale
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import statistics
+import threading
+
+# pandas et le noyau de calcul (noyau_planning.py) ne sont importés qu'une fois l'utilisateur connecté
+# (voir 4.2) : la page de connexion s'affiche sans eux.
 
 # --- 1. CONFIGURATION ET CONSTANTES ---
 
-# Définir la locale pour les noms de mois en français
-# Cela est important pour l'affichage correct des noms de mois dans le sélecteur
-try:
-    locale.setlocale(locale.LC_TIME, 'fr_FR.UTF-8')
-except locale.Error:
-    try:
-        locale.setlocale(locale.LC_TIME, 'fra')
-    except locale.Error:
-        # Fallback si la locale française n'est pas installée
-        pass 
+# Mode profil de démarrage (PLANNING_PROFIL=1) : durée de chaque phase de l'exécution affichée dans la console
+PROFIL_DEMARRAGE = os.environ.get("PLANNING_PROFIL") == "1"
+# Nombre d'exécutions de la page conservées pour le panneau Performance (p50/p95)
+TAILLE_HISTORIQUE_PERFORMANCES = 500
+# Journal JSONL des mesures (une ligne par exécution), alimenté quand l'option est activée dans le panneau
+FICHIER_PERFORMANCES = "performances_planning.jsonl"
+
+# Durée (en ms) de chaque phase de l'exécution en cours, dans l'ordre (voir fin_de_phase)
+phases_execution = {}
+
+def fin_de_phase(nom):
+    """Enregistre le temps écoulé depuis la fin de la phase précédente (et l'affiche en mode profil)."""
+    global _debut_phase
+    maintenant = perf_counter()
+    duree = (maintenant - _debut_phase) * 1000
+    phases_execution[nom] = phases_execution.get(nom, 0) + duree
+    if PROFIL_DEMARRAGE:
+        print(f"[profil] {nom:<35} {duree:9.1f} ms", flush=True)
+    _debut_phase = maintenant
 
 # TITRE DE L'ONGLET DU NAVIGATEUR ET RÉGLAGES DE LA PAGE
 st.set_page_config(
@@ -31,7 +44,12 @@ st.set_page_config(
     page_icon="📅"
 )
 
-NOM_DU_FICHIER = "RePlannings1.2.xlsx"
+# Fichier de planning, ou dossier / motif glob de plusieurs classeurs combinés (voir lire_plannings). La variable
+# d'environnement PLANNING_FICHIER permet d'en utiliser un autre, ex. 'plannings/*.xlsx' ou pour les benchmarks
+NOM_DU_FICHIER = os.environ.get("PLANNING_FICHIER", "RePlannings1.2.xlsx")
+# Stockage du planning : "memoire" (DataFrame), "sqlite" (base indexée) ou "annees" (années chargées à la demande),
+# voir PlanningSQLite et PlanningParAnnee dans noyau_planning
+STOCKAGE_PLANNING = os.environ.get("PLANNING_STOCKAGE", "memoire")
 NOM_DU_LOGO = "mon_logo.png"
 # ADRESSE DE CONTACT
 CONTACT_EMAIL = "julien.beguin@gmail.com"
@@ -46,357 +64,111 @@ ANNIVERSAIRES = {
     "HOUDA": (1, 27),
 }
 
-# Noms des colonnes (headers) - DOIVENT CORRESPONDRE
-COL_EMPLOYE = 'NOM VENDEUR'
-COL_SEMAINE = 'SEMAINE'
-COL_JOUR = 'JOUR'
-COL_DEBUT = 'HEURE DEBUT'
-COL_FIN = 'HEURE FIN'
-
-# Liste des colonnes obligatoires pour le bon fonctionnement du script
-COLONNES_OBLIGATOIRES = [COL_EMPLOYE, COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN]
-
-# Ordre logique des jours
-ORDRE_JOURS = ['LUNDI', 'MARDI', 'MERCREDI', 'JEUDI', 'VENDREDI', 'SAMEDI', 'DIMANCHE']
+# --- 2. FONCTIONS D'AFFICHAGE ---
 
-# --- 2. FONCTIONS DE TRAITEMENT ---
+def _creer_planning_en_direct(fichier, stockage):
+    from noyau_planning import prechauffer
+    # Reprend le préchauffage lancé au démarrage du serveur (serveur.py), ou le lance
+    return prechauffer(fichier, stockage).result()
 
-def formater_duree(td):
-    """Convertit un Timedelta en format 'Hh MMmin' lisible, utilisé pour le total."""
-    if pd.isna(td):
-        return "0h 00"
-    
-    total_seconds = td.total_seconds()
-    heures = int(total_seconds // 3600)
-    minutes = int((total_seconds % 3600) // 60)
-    
-    return f"{heures}h {minutes:02d}"
-
-def formater_heure_pour_colonne(val):
-    """Formatte une heure (time/Timestamp/Timedelta) en hh:mm ou retourne une chaîne vide."""
-    if pd.isna(val) or val == "":
-        return ""
-    
-    if isinstance(val, (time, pd.Timestamp)):
-          # Nettoyage de l'objet heure
-          return str(val).split('.')[-1].split(' ')[-1] if ' ' in str(val) else str(val)
-    
-    if isinstance(val, pd.Timedelta):
-        seconds = val.total_seconds()
-        heures = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        return f"{heures:02d}:{minutes:02d}"
-    
-    val_str = str(val)
-    if val_str.lower() in ('nan', '<nat>'):
-        return ""
-        
-    return val_str
-
-
-def get_dates_for_week(week_str, year, format_type='full'):
-    """Calcule la plage de dates pour la semaine, en utilisant l'année fournie."""
-    try:
-        week_match = re.search(r'S(\d+)', week_str.upper())
-        if not week_match:
-            return week_str if format_type == 'full' else "Erreur SEMAINE"
-            
-        week_num = int(week_match.group(1))
-        
-    except ValueError:
-        return week_str if format_type == 'full' else "Erreur SEMAINE"
-    
-    try:
-        d = date(year, 1, 1)
-        # Début de l'année ISO (Lundi de la première semaine)
-        date_debut_annee_iso = d + timedelta(days=-d.weekday())
-
-        date_debut = date_debut_annee_iso + timedelta(weeks=week_num - 1)
-        date_fin = date_debut + timedelta(days=6)
-        
-        date_debut_str = date_debut.strftime("%d/%m/%y")
-        date_fin_str = date_fin.strftime("%d/%m/%y")
-
-        if format_type == 'full':
-            return f"{week_str} ({year}): du {date_debut_str} au {date_fin_str}"
-        elif format_type == 'start_date':
-              return date_debut
-        elif format_type == 'month':
-              return (date_debut.month, date_debut.year)
-        elif format_type == 'month_name':
-              # Retourne le nom du mois en toutes lettres
-              return date_debut.strftime('%B').title()
-        else: # only_dates
-            return f"Semaine {week_str} ({year}) : du {date_debut_str} au {date_fin_str}"
-            
-    except Exception as e:
-        # Gère les cas où la semaine n'est pas calculable pour l'année donnée
-        return date(year, 1, 1) if format_type == 'start_date' else (1, year) if format_type == 'month' else "Erreur SEMAINE"
-
-def convertir_heure_en_timedelta(val):
-    """Convertit diverses entrées d'heure en timedelta (pour le calcul des heures)."""
-    if pd.isna(val) or val == "":
-        return pd.NaT
-    if isinstance(val, str) and "ECOLE" in val.upper():
-            return pd.NaT
-            
-    if isinstance(val, (time, pd.Timestamp)):
-        return pd.to_timedelta(str(val))
-    elif isinstance(val, (int, float)) and 0 <= val <= 1:
-        total_seconds = val * 86400
-        return pd.to_timedelta(total_seconds, unit='s')
-    try:
-        return pd.to_timedelta(val)
-    except:
-        return pd.NaT
-    
-def calculer_duree_brute(row):
-    """Calcule la durée de travail brute (avant déduction de la pause)."""
-    if pd.isna(row['Duree_Debut']) or pd.isna(row['Duree_Fin']):
-        return pd.Timedelta(0)
-    
-    duree = row['Duree_Fin'] - row['Duree_Debut']
-    
-    if duree < pd.Timedelta(0):
-        duree += pd.Timedelta(days=1)
-    
-    return duree
-
-def calculer_duree_service(row):
+@st.cache_resource
+def chargement_planning(fichier, stockage):
     """
-    Calcule la durée de travail nette pour une ligne avec déduction de pause,
-    sauf pour MOUNIA ou si le jour est DIMANCHE.
+    Premier chargement du planning (import du noyau compris), lancé une seule fois par serveur dans un thread.
+    Démarré dès la page de connexion, il avance pendant que l'utilisateur saisit son mot de passe.
     """
-    duree = row['Duree_Brute']
-    employe = row[COL_EMPLOYE].upper()
-    jour = row[COL_JOUR].upper()
-    
-    # 1. Règle pour MOUNIA : pas de pause (même si service > 1h)
-    if employe == "MOUNIA":
-        pass # Aucune déduction
-        
-    # 2. Règle pour DIMANCHE : pas de pause (pour les autres employés)
-    elif jour == "DIMANCHE":
-        pass # Aucune déduction le dimanche
-    
-    # 3. Règle Générale (Autres jours et autres employés) : 1h de pause si service > 1h
-    elif duree > pd.Timedelta(hours=1):
-        duree -= pd.Timedelta(hours=1)
-        
-    if duree < pd.Timedelta(0): return pd.Timedelta(0)
-    return duree
-
-def obtenir_statut_global(row):
-    """Détermine le statut (Travail, Repos, École) basé sur la durée et le texte."""
-    if row['Durée du service'] > pd.Timedelta(0):
-        return "Travail"
-    debut_str = str(row[COL_DEBUT]).upper()
-    fin_str = str(row[COL_FIN]).upper()
-    if "ECOLE" in debut_str or "ECOLE" in fin_str:
-        return "École"
-    return "Repos"
-
+    executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chargement-planning")
+    return executeur.submit(_creer_planning_en_direct, fichier, stockage)
 
-def calculer_heures_travaillees(df_planning):
-    """Calcule le total des heures nettes pour le planning."""
-
-    durees_positives = df_planning[df_planning['Durée du service'] > pd.Timedelta(0)]['Durée du service']
-    total_duree = durees_positives.sum()
-    
-    total_heures_format = formater_duree(total_duree).replace("min", "")
-    
-    return df_planning, total_heures_format
-
-def extraire_annee(semaine_str):
-    """Essaie d'extraire l'année (YY) du format SXX-YY ou retourne une année par défaut."""
-    if isinstance(semaine_str, str):
-        match = re.search(r'-(\d{2})$', semaine_str)
-        if match:
-            return 2000 + int(match.group(1))
-            
-    return date.today().year
-
-@st.cache_data
-def charger_donnees(fichier):
-    """Charge le fichier, vérifie les colonnes, calcule toutes les durées par ligne et pré-calcule les totaux."""
-    if not os.path.exists(fichier):
-        st.error(f"**ERREUR CRITIQUE DE FICHIER :** Le fichier '{fichier}' est introuvable. Assurez-vous qu'il est dans le même dossier que 'app.py' et que le nom est exact.")
-        st.stop()
+def planning_pret(fichier, stockage):
+    """Indicateur de disponibilité : vrai dès que le premier chargement du planning est terminé."""
+    return chargement_planning(fichier, stockage).done()
 
+def planning_en_direct(fichier, stockage):
+    """Instance unique (par fichier et par serveur) de PlanningEnDirect, partagée par toutes les sessions."""
     try:
-        df = pd.read_excel(fichier)
+        return chargement_planning(fichier, stockage).result()
     except Exception:
-        try:
-            df = pd.read_csv(fichier, sep=';', encoding='latin1')
-        except Exception as e_final:
-            st.error(f"**ERREUR CRITIQUE DE FICHIER :** Impossible de lire le fichier '{fichier}'. Vérifiez que le fichier n'est pas déjà ouvert et que son contenu est valide (format Excel ou CSV).")
-            st.stop()
-    
-    df.columns = df.columns.str.strip()
-    colonnes_manquantes = [col for col in COLONNES_OBLIGATOIRES if col not in df.columns]
-    
-    if colonnes_manquantes:
-        st.error(f"**ERREUR DE DONNÉES : Colonnes manquantes.** Votre fichier doit contenir : {', '.join(COLONNES_OBLIGATOIRES)}. Manque : {', '.join(colonnes_manquantes)}")
-        st.stop()
-        
-    for col in df.columns:
-        if df[col].dtype == 'object' or df[col].dtype.name == 'category':
-            df[col] = df[col].astype(str).str.strip()
-            
-    df = df.dropna(how='all')
-    df[COL_JOUR] = df[COL_JOUR].astype(str).str.upper()
-    df[COL_SEMAINE] = df[COL_SEMAINE].astype(str).str.upper()
-    
-    df['ANNEE'] = df[COL_SEMAINE].apply(extraire_annee)
-    
-    # --- CALCULS DE DURÉE PAR LIGNE (Pour le calendrier et le tableau) ---
-    df['Duree_Debut'] = df[COL_DEBUT].apply(convertir_heure_en_timedelta)
-    df['Duree_Fin'] = df[COL_FIN].apply(convertir_heure_en_timedelta)
-    
-    df['Duree_Brute'] = df.apply(calculer_duree_brute, axis=1)
-    # APPEL À LA FONCTION CORRIGÉE
-    df['Durée du service'] = df.apply(calculer_duree_service, axis=1) # Colonne nécessaire pour le calendrier
-    
-    # Ajout du statut par ligne pour le calendrier (Travail/Repos/École)
-    df['Statut'] = df.apply(obtenir_statut_global, axis=1)
-    
-    # Ajout de la colonne DATE (pour le calendrier)
-    df['DATE'] = df.apply(
-        lambda row: get_dates_for_week(row[COL_SEMAINE], row['ANNEE'], format_type='start_date') +
-        timedelta(days=ORDRE_JOURS.index(row[COL_JOUR])), axis=1
-    )
-    df['DATE'] = pd.to_datetime(df['DATE'])
-    # -----------------------------------------------------------------------------------
-
-    # Calcul des totaux par semaine (pour la synthèse latérale)
-    df_totaux = df.groupby([COL_EMPLOYE, COL_SEMAINE, 'ANNEE'])['Durée du service'].sum().reset_index()
-    df_totaux = df_totaux.rename(columns={'Durée du service': 'TEMPS_TOTAL_SEMAINE'})
-    
-    df = pd.merge(df, df_totaux, on=[COL_EMPLOYE, COL_SEMAINE, 'ANNEE'], how='left')
-    df['TEMPS_TOTAL_SEMAINE'] = df['TEMPS_TOTAL_SEMAINE'].fillna(pd.Timedelta(0))
-    
-    return df
+        # Comme pour st.cache_resource, un échec n'est pas mis en cache : nouvel essai à la prochaine exécution
+        chargement_planning.clear()
+        raise
 
-def verifier_donnees(df_semaine):
-    """Vérifie la logique des données de planning et retourne une liste d'avertissements."""
-    avertissements = []
-    df_travail = df_semaine[df_semaine['Durée du service'] > pd.Timedelta(0)].copy()
-    
-    # 1. Vérification : Heure de début après Heure de fin (sans compter les nuits)
-    erreurs_ordre = df_travail[
-        (df_travail['Duree_Brute'] < pd.Timedelta(0)) &
-        (df_travail['Duree_Brute'] > pd.Timedelta(days=-1))
-    ]
-    
-    if not erreurs_ordre.empty:
-        jours = ", ".join(erreurs_ordre[COL_JOUR].unique())
-        avertissements.append(f"**Heure inversée :** Les horaires de début et de fin sont inversés pour le(s) jour(s) : **{jours}**. Vérifiez la saisie.")
+class HistoriquePerformances:
+    """
+    Durées des phases des dernières exécutions de la page (toutes sessions confondues), pour le panneau
+    Performance des administrateurs. Si `journal_actif`, chaque exécution est aussi ajoutée à
+    FICHIER_PERFORMANCES (une ligne JSON par exécution) pour analyse hors ligne.
+    """
 
-    # 2. Vérification : Multiples entrées pour le même jour (risque de chevauchement)
-    comptage_jours = df_semaine.groupby(COL_JOUR).size()
-    multiples_entrees = comptage_jours[comptage_jours > 1]
-    
-    if not multiples_entrees.empty:
-        jours = ", ".join(multiples_entrees.index)
-        avertissements.append(f"**Multiples entrées :** Plusieurs lignes de planning trouvées pour le(s) jour(s) : **{jours}**. Risque de chevauchement d'horaires non géré par le calcul (le temps de travail est cumulé).")
-    
-    return avertissements
+    def __init__(self, taille=TAILLE_HISTORIQUE_PERFORMANCES):
+        self._verrou = threading.Lock()
+        self._executions = deque(maxlen=taille)
+        self.journal_actif = False
+
+    def ajouter(self, utilisateur, phases):
+        execution = {
+            'horodatage': datetime.now().isoformat(timespec='seconds'),
+            'utilisateur': utilisateur,
+            'phases_ms': {nom: round(duree, 2) for nom, duree in phases.items()},
+            'total_ms': round(sum(phases.values()), 2),
+        }
+        with self._verrou:
+            self._executions.append(execution)
+            if self.journal_actif:
+                with open(FICHIER_PERFORMANCES, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(execution, ensure_ascii=False) + "\n")
+
+    def statistiques(self):
+        """
+        Une ligne par phase (plus le total) : durée lors de la dernière exécution, médiane et 95e centile
+        sur l'historique, nombre de mesures. Les phases sont dans l'ordre de la dernière exécution.
+        """
+        with self._verrou:
+            executions = list(self._executions)
+        if not executions:
+            return []
+        durees = defaultdict(list)
+        for execution in executions:
+            for nom, duree in execution['phases_ms'].items():
+                durees[nom].append(duree)
+            durees['Total'].append(execution['total_ms'])
+        derniere = dict(executions[-1]['phases_ms'], Total=executions[-1]['total_ms'])
+        lignes = []
+        for nom, duree in derniere.items():
+            valeurs = durees[nom]
+            p95 = statistics.quantiles(valeurs, n=20, method='inclusive')[18] if len(valeurs) > 1 else valeurs[0]
+            lignes.append({
+                'Phase': nom, 'Dernière (ms)': round(duree, 1), 'p50 (ms)': round(statistics.median(valeurs), 1),
+                'p95 (ms)': round(p95, 1), 'Mesures': len(valeurs),
+            })
+        return lignes
+
+@st.cache_resource
+def historique_performances():
+    """Instance unique (par serveur) de HistoriquePerformances."""
+    return HistoriquePerformances()
+
+def afficher_panneau_performances(historique):
+    """Panneau « Performance » (admin) : détail de la dernière exécution et p50/p95 glissants par phase."""
+    with st.sidebar.expander("⏱️ Performance"):
+        st.dataframe(historique.statistiques(), hide_index=True, use_container_width=True)
+        historique.journal_actif = st.checkbox(
+            f"Enregistrer les mesures dans {FICHIER_PERFORMANCES}", value=historique.journal_actif,
+            key='journal_performances'
+        )
 
 def afficher_calendrier(df_employe, mois, annee, employe_connecte, employe_affiche, output_container):
     """Affiche un calendrier HTML stylisé dans le conteneur spécifié (st ou st.sidebar)."""
     
-    statut_par_jour = defaultdict(lambda: 'Repos')
-    
-    # Si 'Tous' est sélectionné, le calendrier ne peut pas afficher les statuts individuels de manière simple.
-    # On filtre les données reçues (qui peuvent contenir plusieurs mois) pour n'afficher que le mois en cours.
-    df_mois = df_employe[
-        (df_employe['ANNEE'] == annee) &
-        (df_employe['DATE'].dt.month == mois)
-    ].copy()
-
     # Si l'employé affiché est "Tous les employés", on ne peut pas afficher de statut Jour/Repos/École
     is_admin_view_all = (employe_affiche == "Tous les employés")
+    statuts = () if is_admin_view_all else statuts_du_mois(df_employe, mois, annee)
     
-    if not is_admin_view_all:
-        for _, row in df_mois.iterrows():
-            jour = row['DATE'].day
-            # Note: Si plusieurs entrées existent pour un jour, seul le statut de la dernière ligne sera retenu
-            statut_par_jour[jour] = row['Statut']
-
-    # 2. Préparer les styles
-    styles = {
-        'Travail': 'background-color: #CCFFCC; font-weight: bold;',
-        'Repos': 'background-color: #F0F0F0;',
-        'École': 'background-color: #DDEEFF; color: #0000FF;',
-        'Aujourdhui': 'border: 2px solid #FF0000; font-weight: bold; padding: 2px;',
-        'Anniversaire': 'background-color: #FFFF99; font-weight: bold;',
-        'Default': 'background-color: white;'
-    }
-    
-    # 3. Générer le calendrier HTML
-    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
     output_container.header("Vue Mensuelle")
-    
-    # Utilisation du nom du mois localisé
-    nom_du_mois = date(annee, mois, 1).strftime('%B').title()
-    
-    html_calendar = f"<h4>{nom_du_mois} {annee}</h4>"
-    
-    # Correction pour forcer l'affichage des 7 colonnes
-    html_calendar += "<table style='width: 100%; font-size: 14px; text-align: center; border-collapse: collapse; table-layout: fixed;'>"
-    html_calendar += "<thead><tr>"
-    
-    # Forcer la largeur des en-têtes (noms de jours localisés)
-    jours_semaine = [date(2000, 1, day).strftime('%a').title() for day in range(3, 10)] # Lun, Mar, Mer...
-    for day_name in jours_semaine:
-        html_calendar += f"<th style='width: 14.28%;'>{day_name}</th>"
-    html_calendar += "</tr></thead><tbody>"
-
-    aujourdhui = date.today()
-    
-    # Gestion de l'Anniversaire (uniquement en vue individuelle)
-    anniversaire_trouve = False
-    mois_anniv, jour_anniv = None, None
-    
-    if employe_affiche != "Tous les employés" and employe_affiche in ANNIVERSAIRES:
-        mois_anniv, jour_anniv = ANNIVERSAIRES[employe_affiche]
-        if mois == mois_anniv:
-            anniversaire_trouve = True
-            
-    # Utilisation de l'information de l'utilisateur (JULIEN - 18/10)
-    if employe_affiche == "JULIEN" and mois == 10 and jour_anniv == 18:
-        anniversaire_trouve = True
-
-    for week in cal.monthdays2calendar(annee, mois):
-        html_calendar += "<tr>"
-        for day_num, weekday in week:
-            if day_num == 0:
-                html_calendar += "<td style='background-color: #E8E8E8; height: 35px;'></td>"
-                continue
-            
-            day_date = date(annee, mois, day_num)
-            
-            # Application des styles
-            day_style = styles.get('Default')
-            
-            if not is_admin_view_all:
-                day_status = statut_par_jour[day_num]
-                day_style = styles.get(day_status, styles['Default'])
-                
-            # Styles spéciaux
-            if day_date == aujourdhui:
-                day_style += styles['Aujourdhui']
-                
-            if anniversaire_trouve and day_num == jour_anniv:
-                day_style = styles['Anniversaire']
-            
-            html_calendar += f"<td style='{day_style}; border: 1px solid #DDDDDD; height: 35px;'>{day_num}</td>"
-        html_calendar += "</tr>"
-    
-    html_calendar += "</tbody></table>"
-    
-    output_container.markdown(html_calendar, unsafe_allow_html=True)
-    
+    output_container.markdown(
+        generer_html_calendrier(mois, annee, employe_affiche, statuts, date.today(), ANNIVERSAIRES.get(employe_affiche)),
+        unsafe_allow_html=True
+    )
 
 # --- FONCTION D'AFFICHAGE DE LA NOTICE ---
 
@@ -565,89 +337,69 @@ def appliquer_style(row, date_debut_semaine, employe_connecte, employe_affiche,
     
     return styles
     
-# --- FONCTION D'EXPORT MISE À JOUR (Multi-semaines) ---
-def to_excel_buffer_multi(df_initial, employe_selectionne, semaines_a_exporter, annee_selectionnee):
-    """Crée un buffer Excel en mémoire pour le téléchargement multi-semaines (export limité aux 4 colonnes essentielles)."""
-    
-    # 1. Filtrer les données pour les semaines sélectionnées
-    df_export_data = df_initial[
-        (df_initial[COL_SEMAINE].isin(semaines_a_exporter)) &
-        (df_initial['ANNEE'] == annee_selectionnee)
-    ].copy()
-    
-    # Filtrer par employé SAUF si 'Tous les employés' est sélectionné
-    if employe_selectionne != "Tous les employés":
-        df_export_data = df_export_data[df_export_data[COL_EMPLOYE] == employe_selectionne].copy()
-    
-    if df_export_data.empty:
-        return None
-        
-    # 2. Calcul du total global (uniquement pour l'info d'en-tête)
-    df_export_data, total_heures_format = calculer_heures_travaillees(df_export_data)
-    
-    # 3. Préparer le DataFrame final pour l'export (LIMITÉ AUX COLONNES)
-    cols_to_export = [COL_EMPLOYE, COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN] if employe_selectionne == "Tous les employés" else [COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN]
-    
-    df_export = df_export_data[cols_to_export].copy()
-    df_export[COL_JOUR] = pd.Categorical(df_export[COL_JOUR], categories=ORDRE_JOURS, ordered=True)
-    df_export = df_export.sort_values(by=([COL_EMPLOYE] if employe_selectionne == "Tous les employés" else []) + [COL_SEMAINE, COL_JOUR])
-    
-    
-    # Renommage des colonnes pour l'export
-    column_names = (['Employé'] if employe_selectionne == "Tous les employés" else []) + ['Semaine', 'Jour', 'Début', 'Fin']
-    df_export.columns = column_names
-    
-    output = io.BytesIO()
-    
-    try:
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Formats
-            time_format = workbook.add_format({'num_format': 'hh:mm'})
-            header_format = workbook.add_format({'bold': True, 'bg_color': '#DDEEFF', 'border': 1})
-            
-            # Écriture dans la feuille 'Planning Global'
-            sheet_name = 'Planning Global' if employe_selectionne == "Tous les employés" else f'Planning {employe_selectionne}'
-            worksheet = workbook.add_worksheet(sheet_name)
-            writer.sheets[sheet_name] = worksheet 
-            
-            # Infos de l'en-tête (Lignes 1 à 4)
-            worksheet.write('A1', "Export Global Planning", workbook.add_format({'bold': True, 'font_size': 14}))
-            worksheet.write('A2', f"Employé(s) : {employe_selectionne.title()}")
-            worksheet.write('A3', f"Période: {len(semaines_a_exporter)} semaine(s) de l'année {annee_selectionnee}")
-            worksheet.write('A4', f"TOTAL HEURES NETTES sur la période: {total_heures_format}h", workbook.add_format({'bold': True, 'bg_color': '#CCFFCC'}))
-            
-            # Écriture du DataFrame (Commence à la ligne 6, headers à la ligne 7)
-            df_export.to_excel(writer, sheet_name=sheet_name, index=False, startrow=6, header=False)
-            
-            # Écriture des en-têtes (à la ligne 6) et mise en forme des colonnes
-            for col_num, value in enumerate(df_export.columns.values):
-                worksheet.write(6, col_num, value, header_format)
-
-            # Mise en forme des colonnes
-            start_col_time = 2 if employe_selectionne == "Tous les employés" else 1
-            worksheet.set_column('A:A', 15) # Employé ou Semaine
-            worksheet.set_column(start_col_time, start_col_time + 1, 12, time_format)  # Début, Fin
-            
-            # Message d'information sur les heures omises
-            worksheet.write('A15', "NOTE : Les colonnes de calcul (Pause Déduite, Heures Net) ont été omises de cet export.")
-            
-    except ImportError:
-          st.error("Erreur d'exportation : Le module 'xlsxwriter' est manquant.")
-          return None
-          
-    output.seek(0)
-    return output
+@st.cache_resource
+def cache_exports():
+    """Instance unique (par serveur) de CacheExports."""
+    return CacheExports()
+
+def afficher_export(cle, df_initial, index_planning, nom_fichier,
+                    libelle_preparer="📄 Préparer l'export Excel", libelle_telecharger="📥 Télécharger le planning"):
+    """Bouton de préparation puis de téléchargement de l'export (exécuté en fragment, voir plus bas)."""
+    exports = cache_exports()
+    etat, contenu = exports.etat(cle)
+    en_attente = st.session_state.setdefault('exports_en_attente', set())
+    if etat == 'pret':
+        if cle in en_attente:
+            # Export terminé : réexécution complète pour arrêter le rafraîchissement automatique
+            en_attente.discard(cle)
+            st.rerun()
+        st.download_button(
+            label=libelle_telecharger,
+            data=contenu,
+            file_name=nom_fichier,
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"telecharger_{nom_fichier}",
+        )
+    elif etat == 'en_cours':
+        en_attente.add(cle)
+        st.info("⏳ Préparation de l'export en cours...")
+    else:
+        if etat == 'echec':
+            st.warning(contenu)
+        if st.button(libelle_preparer, key=f"preparer_{nom_fichier}"):
+            exports.demander(cle, df_initial, index_planning)
+            # Réexécution complète pour relancer le fragment avec le rafraîchissement automatique
+            st.rerun()
 
 
 # --- LOGIQUE PRINCIPALE DE L'APPLICATION ---
 
+fin_de_phase("Imports et configuration")
+
 if not st.session_state['authenticated']:
+    # Le chargement des données démarre en arrière-plan pendant la saisie du mot de passe
+    # (s'il n'a pas déjà été fait au démarrage du serveur, voir serveur.py)
+    chargement_planning(NOM_DU_FICHIER, STOCKAGE_PLANNING)
     login()
+    if planning_pret(NOM_DU_FICHIER, STOCKAGE_PLANNING):
+        st.caption("✅ Planning à jour et prêt.")
+    else:
+        st.caption("⏳ Chargement du planning en cours...")
+    fin_de_phase("Page de connexion")
     
 else:
     try:
+        # Imports différés (voir en tête de fichier) : sans effet après la première connexion au serveur
+        import pandas as pd
+        from noyau_planning import (
+            COL_DEBUT, COL_EMPLOYE, COL_FIN, COL_JOUR, COL_SEMAINE, EXPORT_PAR_EMPLOYE, ORDRE_JOURS,
+            CacheExports,
+            annees_planning, avertissements_semaine, calculer_heures_travaillees, cle_export, filtrer_planning, formater_duree,
+            formater_heure_pour_colonne, generer_html_calendrier, infos_semaine, minutes_en_duree, positions_planning,
+            semaines_travaillees, statuts_du_mois,
+        )
+        fin_de_phase("Import de pandas et du noyau")
+        
         employe_connecte = st.session_state['username']
         is_admin = (employe_connecte == ADMIN_USER)
         
@@ -664,10 +416,16 @@ else:
                 st.sidebar.image(logo_path, caption='Logo', use_column_width=True)
         else:
             st.sidebar.warning(f"Fichier de logo non trouvé : {NOM_DU_LOGO}")
+        fin_de_phase("Titre et logo")
 
         # 4.2 Chargement des données
-        df_initial = charger_donnees(NOM_DU_FICHIER)
-        liste_employes = sorted(df_initial[COL_EMPLOYE].unique().tolist())
+        planning = planning_en_direct(NOM_DU_FICHIER, STOCKAGE_PLANNING)
+        df_initial, index_planning, version_planning, anomalies, totaux_semaines = planning.instantane()
+        if df_initial is None:
+            st.error(planning.derniere_erreur)
+            st.stop()
+        liste_employes = sorted(index_planning)
+        fin_de_phase("Chargement des données")
         
         # --- Barre latérale : Informations utilisateur ---
         st.sidebar.markdown(f"**👋 Bienvenue, {employe_connecte.title()}**")
@@ -703,21 +461,25 @@ else:
                 options_admin,
                 key='admin_employee_select'
             )
+            # Fraîcheur des données (rechargées en arrière-plan à chaque modification du fichier)
+            st.sidebar.caption(
+                f"Données actualisées à {planning.derniere_actualisation:%H:%M:%S} "
+                f"(reconstruction : {planning.duree_reconstruction:.2f} s)"
+            )
+            if planning.derniere_erreur:
+                st.sidebar.warning(f"Dernière actualisation en échec, version précédente affichée. {planning.derniere_erreur}")
             st.sidebar.markdown("---")
             
         # --- Filtrage initial des données (sur tout le fichier si Admin sélectionne 'Tous') ---
-        if employe_selectionne == "Tous les employés":
-            df_employe_filtre = df_initial.copy()
-        else:
-            if employe_selectionne not in liste_employes:
-                st.error(f"Erreur : L'utilisateur sélectionné ({employe_selectionne}) ne correspond pas à un employé dans le fichier de planning.")
-                st.stop()
-
-            df_employe_filtre = df_initial[df_initial[COL_EMPLOYE] == employe_selectionne].copy()
+        # Les filtres passent par l'index (employé -> année -> semaine) construit au chargement
+        employe_filtre = None if employe_selectionne == "Tous les employés" else employe_selectionne
+        if employe_filtre is not None and employe_filtre not in index_planning:
+            st.error(f"Erreur : L'utilisateur sélectionné ({employe_selectionne}) ne correspond pas à un employé dans le fichier de planning.")
+            st.stop()
             
         
         # --- DÉTECTION ET SÉLECTION DE L'ANNÉE (PÉRIODE GLOBALE) ---
-        annees_disponibles = sorted(df_employe_filtre['ANNEE'].unique().tolist(), reverse=True)
+        annees_disponibles = annees_planning(index_planning, employe_filtre)[::-1]
         if not annees_disponibles:
               annees_disponibles = [date.today().year]
 
@@ -731,17 +493,12 @@ else:
         )
         st.sidebar.markdown("---")
         
-        df_employe_annee = df_employe_filtre[df_employe_filtre['ANNEE'] == annee_selectionnee].copy()
 
 
         # --- DÉTECTION ET SÉLECTION DE LA SEMAINE (DÉTAIL SEMAINE) ---
         
         # La détection des semaines travaillées est basée sur le filtre actuel (tous les employés ou un seul)
-        df_semaines_travaillees = df_employe_annee[
-            df_employe_annee['TEMPS_TOTAL_SEMAINE'] > pd.Timedelta(0)
-        ].drop_duplicates(subset=[COL_SEMAINE])
-        
-        liste_semaines_brutes = sorted(df_semaines_travaillees[COL_SEMAINE].unique().tolist())
+        liste_semaines_brutes = semaines_travaillees(totaux_semaines, index_planning, employe_filtre, annee_selectionnee)
         
         if not liste_semaines_brutes:
             nom_affiche = employe_selectionne.title() if employe_selectionne != "Tous les employés" else "tous les employés"
@@ -778,14 +535,13 @@ else:
         # --- NOUVEAU: CALCULE DU MOIS POUR CHAQUE SEMAINE ---
         semaines_avec_mois = []
         for s in liste_semaines_brutes:
-              # Récupère le nom du mois et le numéro du mois
-              mois_nom = get_dates_for_week(s, annee_selectionnee, format_type='month_name')
-              mois_num = get_dates_for_week(s, annee_selectionnee, format_type='month')[0]
+              # Récupère le nom du mois et le numéro du mois (table des semaines)
+              infos = infos_semaine(s, annee_selectionnee)
               semaines_avec_mois.append({
                   'semaine_brute': s,
-                  'mois_nom': mois_nom,
-                  'mois_num': mois_num,
-                  'semaine_formatee': get_dates_for_week(s, annee_selectionnee, format_type='full')
+                  'mois_nom': infos.nom_mois,
+                  'mois_num': infos.mois[0],
+                  'semaine_formatee': infos.libelle
               })
 
         # Trier la liste par numéro de mois pour l'affichage du selectbox
@@ -847,7 +603,7 @@ else:
         default_selection = []
         semaine_formattee_defaut = None
         if semaine_actuelle_brute in liste_semaines_brutes:
-            semaine_formattee_defaut = get_dates_for_week(semaine_actuelle_brute, annee_selectionnee, format_type='full')
+            semaine_formattee_defaut = infos_semaine(semaine_actuelle_brute, annee_selectionnee).libelle
             if semaine_formattee_defaut in semaines_du_mois:
                   default_selection = [semaine_formattee_defaut]
         elif semaines_du_mois:
@@ -885,6 +641,7 @@ else:
         # Récupération des semaines brutes pour le filtre et l'export
         semaines_selectionnees_brutes = [semaine_mapping.get(s) for s in semaines_selectionnees_formattees if s in semaine_mapping]
         # --- FIN LOGIQUE SÉLECTION MOBILE-FRIENDLY ---
+        fin_de_phase("Sélection (année, mois, semaines)")
         
         
         # DÉTERMINATION DE LA SEMAINE POUR L'AFFICHAGE PRINCIPAL (Première sélection)
@@ -921,7 +678,9 @@ else:
         # --- CALCUL ET AFFICHAGE DU TOTAL D'HEURES NETTES (SIDEBAR) ---
         
         # Le total affiché dans la barre latérale sera celui de la semaine d'affichage uniquement
-        df_filtre_affichage_unique = df_employe_annee[df_employe_annee[COL_SEMAINE] == semaine_pour_affichage_brute].copy()
+        df_filtre_affichage_unique = filtrer_planning(
+            df_initial, index_planning, employe_filtre, annee_selectionnee, [semaine_pour_affichage_brute]
+        )
         df_resultat_unique, total_heures_format = calculer_heures_travaillees(df_filtre_affichage_unique)
         
         nom_total_affiche = employe_selectionne.title() if employe_selectionne != "Tous les employés" else "Sélection"
@@ -935,22 +694,30 @@ else:
         st.sidebar.markdown("---")
         st.sidebar.markdown("### Export Planning")
         
-        excel_data = to_excel_buffer_multi(
-            df_initial,
-            employe_selectionne,
-            semaines_selectionnees_brutes, 
-            annee_selectionnee
-        )
+        # L'export n'est généré qu'à la demande (en arrière-plan), puis gardé en cache pour cette version des données
+        positions_export = positions_planning(index_planning, employe_filtre, annee_selectionnee, semaines_selectionnees_brutes)
         
-        if excel_data:
+        if len(positions_export) > 0:
             file_prefix = "Global" if employe_selectionne == "Tous les employés" else employe_selectionne
-            st.sidebar.download_button(
-                label="📥 Télécharger le planning",
-                data=excel_data,
-                file_name=f"Planning_{file_prefix}_{annee_selectionnee}_Global.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+            cle = cle_export(employe_selectionne, semaines_selectionnees_brutes, annee_selectionnee, version_planning)
+            # Tant que l'export est en préparation, le fragment se réexécute seul chaque seconde
+            en_cours = cache_exports().etat(cle)[0] == 'en_cours'
+            with st.sidebar:
+                st.fragment(afficher_export, run_every=1 if en_cours else None)(
+                    cle, df_initial, index_planning, f"Planning_{file_prefix}_{annee_selectionnee}_Global.xlsx"
+                )
             st.sidebar.caption(f"Export de {len(semaines_selectionnees_brutes)} semaine(s) sélectionnée(s).")
+            
+            # Export groupé (admin) : un classeur avec une feuille par employé pour les mêmes semaines
+            if is_admin and employe_selectionne == "Tous les employés":
+                cle = cle_export(EXPORT_PAR_EMPLOYE, semaines_selectionnees_brutes, annee_selectionnee, version_planning)
+                en_cours = cache_exports().etat(cle)[0] == 'en_cours'
+                with st.sidebar:
+                    st.fragment(afficher_export, run_every=1 if en_cours else None)(
+                        cle, df_initial, index_planning, f"Planning_ParEmploye_{annee_selectionnee}.xlsx",
+                        libelle_preparer="📄 Préparer l'export par employé",
+                        libelle_telecharger="📥 Télécharger (une feuille par employé)"
+                    )
         else:
             st.sidebar.warning("Aucune donnée de planning à exporter pour la sélection.")
             
@@ -972,7 +739,7 @@ else:
             unsafe_allow_html=True
         )
         st.sidebar.markdown("---") 
-
+        fin_de_phase("Totaux et export (barre latérale)")
 
         
         # --- GESTION PAR ONGLETS ---
@@ -985,17 +752,17 @@ else:
             
             # --- CALCUL DU MOIS POUR LE CALENDRIER ---
             # Le mois affiché est basé sur la première semaine sélectionnée
-            mois_selectionne, annee_calendrier = get_dates_for_week(
-                semaine_pour_affichage_brute,
-                annee_selectionnee,
-                format_type='month'
-            )
+            mois_selectionne, annee_calendrier = infos_semaine(semaine_pour_affichage_brute, annee_selectionnee).mois
             
             # --- Filtrage pour le CALENDRIER (Toutes les semaines sélectionnées) ---
             # CORRECTION : Utilisation de toutes les semaines sélectionnées pour le calendrier
-            df_calendrier = df_employe_annee[
-                df_employe_annee[COL_SEMAINE].isin(semaines_selectionnees_brutes)
-            ].copy()
+            # (inutile en vue "Tous les employés", où le calendrier n'affiche pas de statut par jour)
+            if employe_filtre is not None:
+                df_calendrier = filtrer_planning(
+                    df_initial, index_planning, employe_filtre, annee_selectionnee, semaines_selectionnees_brutes
+                )
+            else:
+                df_calendrier = filtrer_planning(df_initial, index_planning, semaines=[])
             
             # --- 1. CALENDRIER MENSUEL (Vue Globale) ---
             col_calendar = st.container()
@@ -1010,34 +777,28 @@ else:
                     employe_selectionne, 
                     st.container()
                 )
+            fin_de_phase("Calendrier")
 
             # --- 3. TABLEAU DÉTAILLÉ DE LA SEMAINE (OU VUE GLOBALE) ---
             
             # Pour le tableau détaillé, on utilise toujours df_filtre_affichage_unique (la première semaine)
-            df_display = df_filtre_affichage_unique.copy()
             
-            # Calcul du champ 'Pause Déduite' pour l'affichage (si 1h déduite, afficher "1h 00", sinon "")
-            def calculer_pause_affiche(row):
-                if row[COL_EMPLOYE].upper() == "MOUNIA" or row[COL_JOUR].upper() == "DIMANCHE":
-                    return "" # Pas de pause déduite pour MOUNIA ou le DIMANCHE
-                
-                # Règle générale : si la durée brute est > 1h, une pause a été déduite
-                if row['Duree_Brute'] > pd.Timedelta(hours=1):
-                    # On vérifie qu'on n'est pas tombé sur la règle de Mounia ou Dimanche par erreur
-                    return "1h 00"
-                return ""
-            
-            df_display['Pause Déduite'] = df_display.apply(calculer_pause_affiche, axis=1)
-
-            df_display['Heures Net (Déduites)'] = df_display['Durée du service'].apply(formater_duree).str.replace('min', '')
+            # Champ 'Pause Déduite' : la pause réellement déduite de la ligne (colonne Pause du noyau, une seule
+            # pause pour des services du même jour qui se chevauchent), vide si aucune pause n'est déduite
+            pauses = df_filtre_affichage_unique['Pause']
             
-            # Formatage des heures de début et fin
-            df_display['Début'] = df_display[COL_DEBUT].apply(formater_heure_pour_colonne)
-            df_display['Fin'] = df_display[COL_FIN].apply(formater_heure_pour_colonne)
+            # Seul le tableau affiché est construit : les colonnes reprises du planning ne sont pas copiées (copy-on-write)
+            df_display = df_filtre_affichage_unique[[COL_EMPLOYE, COL_SEMAINE, COL_JOUR]].assign(**{
+                'Pause Déduite': minutes_en_duree(pauses).apply(formater_duree).where(pauses > 0, ""),
+                'Heures Net (Déduites)': minutes_en_duree(df_filtre_affichage_unique['Durée du service']).apply(formater_duree).str.replace('min', ''),
+                # Formatage des heures de début et fin
+                'Début': df_filtre_affichage_unique[COL_DEBUT].apply(formater_heure_pour_colonne),
+                'Fin': df_filtre_affichage_unique[COL_FIN].apply(formater_heure_pour_colonne),
+            })
             
             # Création du DataFrame final pour Streamlit
             column_order = [COL_EMPLOYE, COL_SEMAINE, COL_JOUR, 'Début', 'Fin', 'Pause Déduite', 'Heures Net (Déduites)'] if employe_selectionne == "Tous les employés" else [COL_JOUR, 'Début', 'Fin', 'Pause Déduite', 'Heures Net (Déduites)']
-            df_final = df_display[column_order].copy()
+            df_final = df_display[column_order]
             
             # Tri
             df_final[COL_JOUR] = pd.Categorical(df_final[COL_JOUR], categories=ORDRE_JOURS, ordered=True)
@@ -1051,10 +812,10 @@ else:
             df_final.columns = column_names
 
             # Application du style (couleur de fond par ligne)
-            date_debut_semaine = get_dates_for_week(semaine_pour_affichage_brute, annee_selectionnee, format_type='start_date')
+            date_debut_semaine = infos_semaine(semaine_pour_affichage_brute, annee_selectionnee).debut
             
             # Le statut map n'est utile qu'en vue individuelle
-            statut_map = df_display.set_index(COL_JOUR)['Statut'].to_dict() if employe_selectionne != "Tous les employés" else {}
+            statut_map = df_filtre_affichage_unique.set_index(COL_JOUR)['Statut'].to_dict() if employe_selectionne != "Tous les employés" else {}
 
             styled_df = df_final.style.apply(
                 appliquer_style,
@@ -1064,19 +825,33 @@ else:
                 statut_map=statut_map,
                 axis=1
             )
+            fin_de_phase("Préparation du tableau")
+            
+            # Anomalies de la semaine affichée, relevées au chargement pour tout le planning
+            for nom in ([employe_filtre] if employe_filtre is not None else liste_employes):
+                for avertissement in avertissements_semaine(anomalies, nom, annee_selectionnee, semaine_pour_affichage_brute):
+                    st.warning(avertissement if employe_filtre is not None else f"{nom.title()} — {avertissement}")
             
             st.dataframe(
                 styled_df,
                 hide_index=True,
                 use_container_width=True,
             )
+            fin_de_phase("Rendu du tableau (appliquer_style)")
             
             # Affichage du total en bas du tableau
             st.markdown(f"**TOTAL HEURES NETTES pour la semaine ({semaine_pour_affichage_brute}) : {total_heures_format}h**", unsafe_allow_html=True)
             
             # Ajout d'une ligne de séparation finale pour la clarté
             st.markdown("---")
-
+        
+        fin_de_phase("Fin de page")
+        
+        # Mesures de cette exécution (le panneau lui-même n'est pas compté)
+        historique = historique_performances()
+        historique.ajouter(employe_connecte, phases_execution)
+        if is_admin:
+            afficher_panneau_performances(historique)
 
     except Exception as e:
         # Gestion des erreurs non capturées
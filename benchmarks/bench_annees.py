@@ -0,0 +1,129 @@
+"""
+Compare le chargement par année (PlanningParAnnee) au planning en mémoire sur un planning synthétique de trois ans :
+1. mêmes index, totaux par semaine et anomalies, mêmes lignes pour les filtres (indexées par leur position
+   dans le planning trié, sans doublon d'une année à l'autre), totaux hebdomadaires et exports ;
+2. ouverture (années et employés seuls) face au chargement complet, premier accès à une année puis accès suivants ;
+3. borne du cache des années (TAILLE_CACHE_ANNEES) et mémoire du processus qui sert le planning (PlanningEnDirect,
+   avec son index, ses totaux et ses anomalies) après ouverture puis après la page de l'année la plus récente :
+   index, semaines travaillées et une semaine de lignes (RSS au-delà d'un processus témoin).
+Les partitions sont créées avec un script principal factice (module __main__, comme app.py sous Streamlit) que
+le processus de création ne doit pas exécuter.
+
+Usage : python benchmarks/bench_annees.py [nb_lignes]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from bench_memoire_partagee import memoire_processus  # noqa: E402
+from bench_multi_classeurs import script_principal_factice  # noqa: E402
+from bench_sqlite import ouvrir, par_semaine, requetes  # noqa: E402
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+
+def processus(stockage, fichier):
+    """
+    Processus de mesure : RSS après ouverture du planning tel que servi aux pages (PlanningEnDirect), puis après
+    la page d'un employé pour l'année la plus récente.
+    """
+    mesures = [memoire_processus()[0]]
+    if stockage != 'temoin':
+        planning = noyau.PlanningEnDirect(fichier, stockage=stockage)
+        mesures.append(memoire_processus()[0])
+        df, index, _, anomalies, totaux = planning.instantane()
+        _, employe, annee, semaines = requetes(index)[0]
+        noyau.semaines_travaillees(totaux, index, employe, annee)
+        noyau.avertissements_semaine(anomalies, employe, annee, semaines[0])
+        noyau.filtrer_planning(df, index, employe, annee, semaines)
+        mesures.append(memoire_processus()[0])
+    print(*mesures, flush=True)
+
+
+def mesurer_processus(stockage, fichier):
+    sortie = subprocess.run([sys.executable, os.path.abspath(__file__), "--processus", stockage, fichier],
+                            capture_output=True, text=True, check=True).stdout
+    return [float(v) for v in sortie.split()]
+
+
+def chronometrer(fonction):
+    t0 = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--processus":
+        processus(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        ecrire_xlsx(generer_planning(nb_lignes, encodages_mixtes=True), fichier)
+
+        (df, index), t_memoire = chronometrer(lambda: ouvrir(noyau.STOCKAGE_MEMOIRE, fichier))
+        with script_principal_factice(dossier):
+            _, t_creation = chronometrer(lambda: ouvrir(noyau.STOCKAGE_ANNEES, fichier))
+        (planning, index_annees), t_ouverture = chronometrer(lambda: ouvrir(noyau.STOCKAGE_ANNEES, fichier))
+        assert planning.annees_chargees() == []
+
+        # 2. Premier accès à une année, puis accès suivants (année déjà chargée)
+        _, employe, annee, semaines = requetes(index)[0]
+        _, t_premier = chronometrer(lambda: noyau.filtrer_planning(planning, index_annees, employe, annee, semaines))
+        _, t_suivant = chronometrer(lambda: noyau.filtrer_planning(planning, index_annees, employe, annee, semaines))
+        assert planning.annees_chargees() == [annee]
+
+        # 1. Équivalence (toutes les années sont consultées : le cache reste borné)
+        assert {(e, a, s): len(p) for e, par_a in index.items() for a, par_s in par_a.items() for s, p in par_s.items()} \
+            == {(e, a, s): len(p) for e, par_a in index_annees.items() for a, par_s in par_a.items() for s, p in par_s.items()}
+        assert noyau.totaux_semaines(df) == planning.totaux
+        assert noyau.table_anomalies(df) == planning.anomalies
+        filtres = requetes(index) + [("toutes les années", None, None, None), ("aucune semaine", None, None, [])]
+        for _, employe, annee, semaines in filtres:
+            lignes = noyau.filtrer_planning(planning, index_annees, employe, annee, semaines)
+            assert lignes.index.is_unique
+            assert list(lignes.index) == [
+                p for a in noyau.annees_planning(index_annees, employe) if annee in (None, a)
+                for p in noyau.positions_planning(index_annees, employe, a, semaines)
+            ]
+            pd.testing.assert_frame_equal(
+                par_semaine(noyau.filtrer_planning(df, index, employe, annee, semaines)),
+                par_semaine(noyau.filtrer_planning(planning, index_annees, employe, annee, semaines)),
+            )
+            pd.testing.assert_frame_equal(
+                noyau.totaux_hebdomadaires(df, index, employe, annee, semaines),
+                noyau.totaux_hebdomadaires(planning, index_annees, employe, annee, semaines),
+            )
+            assert len(planning.annees_chargees()) <= noyau.TAILLE_CACHE_ANNEES
+        annee = requetes(index)[0][2]
+        semaines = sorted({s for par_a in index.values() for s in par_a.get(annee, {})})[:4]
+        exports = [pd.read_excel(noyau.to_excel_buffer_par_employe(p, semaines, annee, i), sheet_name=None, header=None)
+                   for p, i in ((df, index), (planning, index_annees))]
+        assert exports[0].keys() == exports[1].keys()
+        for feuille in exports[0]:
+            pd.testing.assert_frame_equal(exports[0][feuille], exports[1][feuille])
+
+        annees = noyau.annees_planning(index)
+        print(f"{nb_lignes} lignes sur {len(annees)} années ({', '.join(map(str, annees))})")
+        print(f"  Chargement complet (mémoire)      : {t_memoire * 1000:9.1f} ms")
+        print(f"  Partitions par année : création {t_creation:.2f} s, ouverture (années et employés) {t_ouverture * 1000:.1f} ms")
+        print(f"  Une semaine, premier accès à l'année : {t_premier * 1000:7.2f} ms, année déjà chargée : {t_suivant * 1000:.2f} ms")
+        print(f"  Années chargées après les vérifications : {planning.annees_chargees()} "
+              f"(au plus {noyau.TAILLE_CACHE_ANNEES})")
+
+        # 3. Mémoire du processus qui sert le planning
+        temoin = mesurer_processus('temoin', fichier)[0]
+        print("  Mémoire du processus (RSS hors témoin) : après ouverture / après la page d'une semaine de l'année")
+        for stockage in (noyau.STOCKAGE_MEMOIRE, noyau.STOCKAGE_ANNEES):
+            _, ouverture, consultation = mesurer_processus(stockage, fichier)
+            print(f"    {stockage:<8}: {ouverture - temoin:7.1f} Mo / {consultation - temoin:7.1f} Mo")
+    finally:
+        shutil.rmtree(dossier)
@@ -0,0 +1,49 @@
+"""
+Mesure le démarrage à froid (lire_planning, comme au redémarrage du serveur) avec et sans cache disque
+(Feather), puis vérifie l'invalidation quand le classeur change.
+
+Usage : python benchmarks/bench_cache_disque.py [nb_lignes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+
+def demarrage_a_froid(fichier):
+    """Temps de lecture du planning par un nouveau processus serveur (seul le cache disque peut servir)."""
+    t0 = time.perf_counter()
+    df = noyau.lire_planning(fichier)
+    return df, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        generer_planning(nb_lignes).to_excel(fichier, index=False)
+
+        sans_cache, t_sans_cache = demarrage_a_froid(fichier)
+        avec_cache, t_avec_cache = demarrage_a_froid(fichier)
+        pd.testing.assert_frame_equal(sans_cache, avec_cache)
+
+        # Invalidation : un classeur modifié doit produire un nouveau calcul, et un seul fichier de cache
+        generer_planning(nb_lignes, graine=1).to_excel(fichier, index=False)
+        modifie, t_modifie = demarrage_a_froid(fichier)
+        assert not modifie.equals(avec_cache)
+        assert len(os.listdir(os.path.join(dossier, noyau.DOSSIER_CACHE))) == 1
+
+        print(f"{nb_lignes} lignes")
+        print(f"  Démarrage sans cache disque   : {t_sans_cache:8.2f} s")
+        print(f"  Démarrage avec cache disque   : {t_avec_cache:8.2f} s  (x{t_sans_cache / t_avec_cache:.0f})")
+        print(f"  Après modification du fichier : {t_modifie:8.2f} s  (cache invalidé)")
+    finally:
+        shutil.rmtree(dossier)
@@ -0,0 +1,102 @@
+"""
+Compare l'extraction des statuts du mois (statuts_du_mois) à l'ancienne boucle iterrows, puis le rendu
+du calendrier HTML à froid et depuis le cache (generer_html_calendrier) pour chaque mois d'un employé.
+Mesure enfin le cache à travers la page (AppTest) : Streamlit réexécute app.py à chaque interaction, le cache
+du noyau doit servir les réexécutions suivantes (succès du cache, durée de la phase Calendrier).
+
+Usage : python benchmarks/bench_calendrier.py [nb_lignes]
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+DOSSIER_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOSSIER_APP)
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+NB_EXECUTIONS_PAGE = 5
+
+
+def statuts_iterrows(df_employe, mois, annee):
+    """Ancienne implémentation (une itération Python par ligne), conservée comme référence."""
+    statut_par_jour = defaultdict(lambda: 'Repos')
+    df_mois = df_employe[(df_employe['ANNEE'] == annee) & (df_employe['DATE'].dt.month == mois)]
+    for _, row in df_mois.iterrows():
+        statut_par_jour[row['DATE'].day] = row['Statut']
+    return tuple(sorted(statut_par_jour.items()))
+
+
+def executions_page(fichier):
+    """
+    Processus de mesure : première exécution de la page de JULIEN (AppTest) puis NB_EXECUTIONS_PAGE
+    réexécutions (chacune repart d'un nouveau module app.py), puis les succès et échecs du cache des calendriers.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["PLANNING_FICHIER"] = fichier
+    os.environ["PLANNING_PROFIL"] = "1"
+    at = AppTest.from_file(os.path.join(DOSSIER_APP, "app.py"), default_timeout=600)
+    at.session_state['authenticated'] = True
+    at.session_state['username'] = "JULIEN"
+    at.run()
+    for _ in range(NB_EXECUTIONS_PAGE):
+        at.run()
+        assert not at.exception, at.exception
+    infos = noyau.generer_html_calendrier.cache_info()
+    print("cache", infos.hits, infos.misses, flush=True)
+
+
+def chronometrer(fonction, mois_a_afficher):
+    t0 = time.perf_counter()
+    resultats = [fonction(mois, annee) for mois, annee in mois_a_afficher]
+    return resultats, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--page":
+        executions_page(sys.argv[2])
+        sys.exit(0)
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = noyau.preparer_planning(generer_planning(nb_lignes))
+    df_employe = df[df[noyau.COL_EMPLOYE] == "JULIEN"]
+    mois_a_afficher = sorted(set(zip(df_employe['DATE'].dt.month, df_employe['ANNEE'])))
+    aujourdhui = date.today()
+
+    reference, t_reference = chronometrer(lambda m, a: statuts_iterrows(df_employe, m, a), mois_a_afficher)
+    statuts, t_statuts = chronometrer(lambda m, a: noyau.statuts_du_mois(df_employe, m, a), mois_a_afficher)
+    assert reference == statuts
+
+    statuts_par_mois = dict(zip(mois_a_afficher, statuts))
+    rendu = lambda m, a: noyau.generer_html_calendrier(m, a, "JULIEN", statuts_par_mois[(m, a)], aujourdhui)  # noqa: E731
+    noyau.generer_html_calendrier.cache_clear()
+    _, t_froid = chronometrer(rendu, mois_a_afficher)
+    _, t_cache = chronometrer(rendu, mois_a_afficher)
+
+    print(f"{nb_lignes} lignes, {len(df_employe)} pour JULIEN, {len(mois_a_afficher)} mois")
+    print(f"  Statuts, iterrows        : {t_reference * 1000:8.2f} ms")
+    print(f"  Statuts, vectorisé       : {t_statuts * 1000:8.2f} ms  (x{t_reference / t_statuts:.0f})")
+    print(f"  HTML, à froid            : {t_froid * 1000:8.2f} ms")
+    print(f"  HTML, depuis le cache    : {t_cache * 1000:8.2f} ms  (x{t_froid / t_cache:.0f})")
+
+    # À travers la page : processus à part (premier import de l'application, comme un serveur qui démarre)
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        ecrire_xlsx(generer_planning(min(nb_lignes, 20_000)), fichier)
+        sortie = subprocess.run([sys.executable, os.path.abspath(__file__), "--page", fichier],
+                                capture_output=True, text=True, check=True).stdout
+    finally:
+        shutil.rmtree(dossier)
+    succes, echecs = map(int, re.search(r"^cache (\d+) (\d+)$", sortie, re.M).groups())
+    durees = [float(d) for d in re.findall(r"^\[profil\] Calendrier\s+([\d.]+) ms", sortie, re.M)]
+    assert succes > 0, "le cache des calendriers n'est jamais utilisé par la page"
+    print(f"  Page (AppTest), {len(durees)} exécutions : cache {succes} succès / {echecs} échecs, phase Calendrier "
+          f"{durees[0]:.2f} ms à la première exécution, {min(durees[1:]):.2f} ms au mieux ensuite")
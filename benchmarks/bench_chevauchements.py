@@ -0,0 +1,176 @@
+"""
+Vérifie le moteur d'intervalles (duree_hors_chevauchement) sur des cas pathologiques (services identiques,
+imbriqués, en chaîne, bout à bout, de durée nulle, passant minuit, journée de milliers de services, ordre
+quelconque) par comparaison avec un balayage Python ligne à ligne, ainsi que la pause déduite
+(pauses_hors_chevauchement : une pause par bloc de services qui se chevauchent) et les anomalies relevées sur un
+petit planning (heures inversées, nuits, services qui se chevauchent), puis mesure son coût et celui de
+preparer_planning sur un planning synthétique (les lignes y sont tirées au hasard : beaucoup de jours
+comportent plusieurs services qui se chevauchent).
+
+Usage : python benchmarks/bench_chevauchements.py [nb_lignes]
+"""
+import os
+import sys
+import time
+from datetime import time as heure
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+H = np.timedelta64(3600, 's').astype('timedelta64[ns]')
+
+
+def parts_reference(groupes, debut, fin):
+    """Balayage naïf : intervalles de chaque groupe pris par début croissant (puis ordre d'origine)."""
+    parts = [None] * len(groupes)
+    for groupe in set(groupes):
+        couvert = None
+        for i in sorted((i for i in range(len(groupes)) if groupes[i] == groupe), key=lambda i: debut[i]):
+            depart = debut[i] if couvert is None else max(debut[i], couvert)
+            parts[i] = max(fin[i] - depart, np.timedelta64(0, 'ns'))
+            couvert = fin[i] if couvert is None else max(couvert, fin[i])
+    return parts
+
+
+def pauses_reference(groupes, debut, fin, parts):
+    """
+    Balayage naïf des pauses : par groupe et par début croissant, un bloc se poursuit tant qu'un service commence
+    avant la fin la plus tardive du bloc ; 1h par bloc de plus d'1h, prise sur les parts dans l'ordre.
+    """
+    pauses = [None] * len(groupes)
+    for groupe in set(groupes):
+        blocs, fin_bloc = [], None
+        for i in sorted((i for i in range(len(groupes)) if groupes[i] == groupe), key=lambda i: debut[i]):
+            if fin_bloc is None or debut[i] >= fin_bloc:
+                blocs.append([])
+                fin_bloc = fin[i]
+            blocs[-1].append(i)
+            fin_bloc = max(fin_bloc, fin[i])
+        for bloc in blocs:
+            reste = H if sum((parts[i] for i in bloc), np.timedelta64(0, 'ns')) > H else np.timedelta64(0, 'ns')
+            for i in bloc:
+                pauses[i] = min(reste, parts[i])
+                reste -= pauses[i]
+    return pauses
+
+
+def union(intervalles):
+    """Durée de l'union d'une liste de (début, fin), par fusion des intervalles triés."""
+    total, courant = np.timedelta64(0, 'ns'), None
+    for debut, fin in sorted(intervalles):
+        if courant is None or debut > courant[1]:
+            if courant is not None:
+                total += courant[1] - courant[0]
+            courant = [debut, fin]
+        else:
+            courant[1] = max(courant[1], fin)
+    return total + (courant[1] - courant[0] if courant is not None else np.timedelta64(0, 'ns'))
+
+
+def cas_pathologiques():
+    """(nom, [(groupe, début en heures, fin en heures), ...])."""
+    rng = np.random.default_rng(0)
+    aleatoires = [(int(g), d, d + l) for g, d, l in zip(rng.integers(0, 50, 5000), rng.integers(0, 40, 5000) / 2,
+                                                         rng.integers(0, 20, 5000) / 2)]
+    return [
+        ("identiques", [(0, 9, 12)] * 5),
+        ("imbriqués", [(0, 8, 18), (0, 9, 17), (0, 12, 13), (0, 10, 11)]),
+        ("en chaîne", [(0, h, h + 2) for h in range(0, 20)]),
+        ("bout à bout", [(0, 9, 12), (0, 12, 15), (0, 15, 18)]),
+        ("débordement d'1h30", [(0, 9, 17), (0, 16.5, 18)]),
+        ("entièrement couvert", [(0, 9, 17), (0, 10, 12)]),
+        ("parts de moins d'1h", [(0, 10, 10 + 2 / 3), (0, 10.5, 11 + 1 / 6), (0, 11, 11 + 2 / 3)]),
+        ("durée nulle", [(0, 9, 9), (0, 9, 12), (0, 12, 12)]),
+        ("nuit (après minuit)", [(0, 22, 30), (0, 23, 25), (0, 5, 7)]),
+        ("même début", [(0, 9, 10), (0, 9, 18), (0, 9, 12)]),
+        ("ordre inverse", [(0, 20 - h, 22 - h) for h in range(20)]),
+        ("milliers de services", [(0, h / 100, h / 100 + 8) for h in range(3000)]),
+        ("groupes entrelacés", [(h % 7, h % 24, h % 24 + 3) for h in range(500)]),
+        ("aléatoires", aleatoires),
+    ]
+
+
+def verifier_cas(nom, intervalles):
+    groupes = np.array([g for g, _, _ in intervalles])
+    debut = np.array([d * H for _, d, _ in intervalles], dtype='timedelta64[ns]')
+    fin = np.array([f * H for _, _, f in intervalles], dtype='timedelta64[ns]')
+    parts = noyau.duree_hors_chevauchement(groupes, debut, fin)
+
+    assert list(parts) == parts_reference(list(groupes), list(debut), list(fin)), nom
+    for groupe in set(groupes.tolist()):
+        du_groupe = groupes == groupe
+        assert parts[du_groupe].sum() == union(list(zip(debut[du_groupe], fin[du_groupe]))), nom
+    pauses = noyau.pauses_hors_chevauchement(groupes, debut, fin, parts, H)
+    assert list(pauses) == pauses_reference(list(groupes), list(debut), list(fin), list(parts)), nom
+    print(f"  {nom:<22}: {len(intervalles):5d} services, OK")
+
+
+def verifier_anomalies():
+    """
+    table_anomalies et verifier_donnees sur une semaine écrite à la main : heures inversées (fin avant début,
+    hors nuits), nuit passant minuit, entrées multiples avec et sans chevauchement.
+    """
+    lignes = [
+        ("LUNDI", heure(18, 0), heure(10, 0)),     # Inversé : 10h-18h saisi à l'envers
+        ("MARDI", heure(22, 0), heure(6, 0)),      # Nuit : pas une inversion
+        ("MERCREDI", heure(10, 0), heure(19, 0)),  # Normal
+        ("JEUDI", heure(9, 0), heure(13, 0)),      # Deux services qui se chevauchent
+        ("JEUDI", heure(12, 0), heure(17, 0)),
+        ("VENDREDI", heure(9, 0), heure(12, 0)),   # Deux services bout à bout
+        ("VENDREDI", heure(12, 0), heure(15, 0)),
+        ("SAMEDI", heure(19, 0), heure(9, 0)),     # Inversé : 9h-19h saisi à l'envers
+        ("DIMANCHE", np.nan, np.nan),              # Repos
+    ]
+    brut = pd.DataFrame({
+        noyau.COL_EMPLOYE: "ADAM", noyau.COL_SEMAINE: "S10-25",
+        noyau.COL_JOUR: [j for j, _, _ in lignes],
+        noyau.COL_DEBUT: [d for _, d, _ in lignes], noyau.COL_FIN: [f for _, _, f in lignes],
+    })
+    df = noyau.preparer_planning(brut)
+    attendu = {
+        noyau.ANOMALIE_HEURE_INVERSEE: ("LUNDI", "SAMEDI"),
+        noyau.ANOMALIE_MULTIPLES_ENTREES: ("JEUDI", "VENDREDI"),
+        noyau.ANOMALIE_CHEVAUCHEMENT: ("JEUDI",),
+    }
+    assert noyau.table_anomalies(df) == {("ADAM", 2025, "S10-25"): attendu}, noyau.table_anomalies(df)
+    assert noyau.verifier_donnees(df) == [
+        noyau.MESSAGES_ANOMALIES[type_anomalie].format(jours=", ".join(attendu[type_anomalie]))
+        for type_anomalie in (noyau.ANOMALIE_HEURE_INVERSEE, noyau.ANOMALIE_MULTIPLES_ENTREES)
+    ]
+    print(f"  {'anomalies':<22}: {len(lignes):5d} services, OK")
+
+
+if __name__ == "__main__":
+    print("Cas pathologiques")
+    for nom, intervalles in cas_pathologiques():
+        verifier_cas(nom, intervalles)
+    verifier_anomalies()
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    brut = generer_planning(nb_lignes)
+
+    t0 = time.perf_counter()
+    df = noyau.preparer_planning(brut.copy())
+    t_preparer = time.perf_counter() - t0
+
+    # Heures et durées du planning compact : minutes entières
+    travaillee = (df['Duree_Brute'] > 0).to_numpy()
+    groupes = df.loc[travaillee].groupby(
+        [noyau.COL_EMPLOYE, 'ANNEE', noyau.COL_SEMAINE, noyau.COL_JOUR], observed=True
+    ).ngroup()
+    debut = df.loc[travaillee, 'Duree_Debut'].to_numpy(dtype='int64')
+    fin = debut + df.loc[travaillee, 'Duree_Brute'].to_numpy(dtype='int64')
+    t0 = time.perf_counter()
+    parts = noyau.duree_hors_chevauchement(groupes.to_numpy(), debut, fin)
+    t_moteur = time.perf_counter() - t0
+
+    cumul = df['Duree_Brute'].sum() / 60
+    print(f"{nb_lignes} lignes, {(parts < fin - debut).sum()} services en partie couverts par un autre")
+    print(f"  Moteur d'intervalles        : {t_moteur * 1000:8.1f} ms pour {travaillee.sum()} services")
+    print(f"  preparer_planning           : {t_preparer:8.2f} s")
+    print(f"  Heures brutes cumulées      : {cumul:12.0f} h")
+    print(f"  Heures brutes sans doublons : {parts.sum() / 60:12.0f} h")
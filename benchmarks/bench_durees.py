@@ -0,0 +1,77 @@
+"""
+Compare la conversion par lots des heures (convertir_colonne_heures) et le calcul vectorisé
+des durées (enrichir_colonnes_vectorise) aux anciennes versions cellule par cellule / df.apply(axis=1)
+sur un planning synthétique, et vérifie que les colonnes sont identiques.
+
+Usage : python benchmarks/bench_durees.py [nb_lignes]
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+COLONNES = ['ANNEE', 'Duree_Brute', 'Durée du service', 'Statut', 'DATE']
+
+
+def enrichir_ligne_a_ligne(df):
+    """Ancienne implémentation (une fonction Python par ligne), conservée comme référence."""
+    df['ANNEE'] = df[noyau.COL_SEMAINE].apply(noyau.extraire_annee)
+    df['Duree_Brute'] = df.apply(noyau.calculer_duree_brute, axis=1)
+    df['Durée du service'] = df.apply(noyau.calculer_duree_service, axis=1)
+    df['Statut'] = df.apply(noyau.obtenir_statut_global, axis=1)
+    df['DATE'] = df.apply(
+        lambda row: noyau.get_dates_for_week(row[noyau.COL_SEMAINE], row['ANNEE'], format_type='start_date') +
+        timedelta(days=noyau.ORDRE_JOURS.index(row[noyau.COL_JOUR])), axis=1
+    )
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    return df
+
+
+def preparer(nb_lignes):
+    """
+    Planning synthétique nettoyé comme dans preparer_planning (avant le calcul des durées), limité à une ligne
+    par employé et par jour : les fonctions ligne à ligne ignorent les chevauchements (voir bench_chevauchements).
+    """
+    df = generer_planning(nb_lignes).drop_duplicates(['NOM VENDEUR', 'SEMAINE', 'JOUR']).reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].astype(str).str.strip()
+    df[noyau.COL_JOUR] = df[noyau.COL_JOUR].str.upper()
+    df[noyau.COL_SEMAINE] = df[noyau.COL_SEMAINE].str.upper()
+    return df
+
+
+def chronometrer(fonction, *args):
+    t0 = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    df = preparer(nb_lignes)
+
+    # 1. Conversion des heures
+    heures_cellule, t_heures_cellule = chronometrer(lambda: df[noyau.COL_DEBUT].apply(noyau.convertir_heure_en_timedelta))
+    heures_lot, t_heures_lot = chronometrer(noyau.convertir_colonne_heures, df[noyau.COL_DEBUT])
+    pd.testing.assert_series_equal(heures_cellule, heures_lot)
+
+    df['Duree_Debut'] = noyau.convertir_colonne_heures(df[noyau.COL_DEBUT])
+    df['Duree_Fin'] = noyau.convertir_colonne_heures(df[noyau.COL_FIN])
+
+    # 2. Durées, statut et date
+    reference, t_reference = chronometrer(enrichir_ligne_a_ligne, df.copy())
+    vectorise, t_vectorise = chronometrer(noyau.enrichir_colonnes_vectorise, df.copy())
+    pd.testing.assert_frame_equal(reference[COLONNES], vectorise[COLONNES])
+
+    print(f"{nb_lignes} lignes tirées, {len(df)} après une ligne par jour")
+    print(f"  Heures, cellule par cellule : {t_heures_cellule:8.2f} s")
+    print(f"  Heures, par lots            : {t_heures_lot:8.2f} s  (x{t_heures_cellule / t_heures_lot:.0f})")
+    print(f"  Durées, df.apply            : {t_reference:8.2f} s")
+    print(f"  Durées, vectorisé           : {t_vectorise:8.2f} s  (x{t_reference / t_vectorise:.0f})")
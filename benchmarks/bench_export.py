@@ -0,0 +1,55 @@
+"""
+Mesure le coût de l'export Excel « Tous les employés » sur toutes les semaines d'une année :
+génération directe (ancien comportement, à chaque réexécution de la page), génération en arrière-plan
+via CacheExports, puis réutilisation du classeur mis en cache.
+
+Usage : python benchmarks/bench_export.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+
+def attendre(exports, cle):
+    """Attend la fin de la génération et retourne le contenu du classeur."""
+    while True:
+        etat, contenu = exports.etat(cle)
+        if etat != 'en_cours':
+            assert etat == 'pret', contenu
+            return contenu
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = noyau.preparer_planning(generer_planning(nb_lignes))
+    index = noyau.construire_index_planning(df)
+    annee = 2025
+    semaines = sorted({s for par_annee in index.values() for s in par_annee.get(annee, {})})
+
+    t0 = time.perf_counter()
+    direct = noyau.to_excel_buffer_multi(df, "Tous les employés", semaines, annee, index)
+    t_direct = time.perf_counter() - t0
+
+    exports = noyau.CacheExports()
+    cle = noyau.cle_export("Tous les employés", semaines, annee, version_planning=0)
+    t0 = time.perf_counter()
+    exports.demander(cle, df, index)
+    t_demande = time.perf_counter() - t0
+    contenu = attendre(exports, cle)
+    t_genere = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    etat, contenu_cache = exports.etat(cle)
+    t_cache = time.perf_counter() - t0
+    assert etat == 'pret' and contenu_cache is contenu
+
+    print(f"{nb_lignes} lignes, {len(semaines)} semaines exportées ({len(direct.getvalue()) / 1e6:.1f} Mo)")
+    print(f"  Génération directe (par réexécution) : {t_direct * 1000:10.1f} ms")
+    print(f"  Demande en arrière-plan (page)       : {t_demande * 1000:10.3f} ms")
+    print(f"  Génération en arrière-plan           : {t_genere * 1000:10.1f} ms")
+    print(f"  Classeur depuis le cache             : {t_cache * 1000:10.3f} ms")
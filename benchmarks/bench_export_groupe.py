@@ -0,0 +1,71 @@
+"""
+Compare l'export groupé (to_excel_buffer_par_employe : un classeur, une feuille par employé) à N exports
+individuels successifs (to_excel_buffer_multi pour chaque employé), et vérifie que chaque feuille est
+identique à l'export individuel correspondant.
+
+Usage : python benchmarks/bench_export_groupe.py [nb_lignes] [nb_employes]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+ANNEE = 2025
+# Noms refusés tels quels par Excel dans 'Planning <employé>' : trop longs avec le même début, caractères interdits
+NOMS_DIFFICILES = {
+    "VENDEUR000": "DUPONT-MARTIN JEAN-CHRISTOPHE ALEXANDRE",
+    "VENDEUR001": "DUPONT-MARTIN JEAN-CHRISTOPHE BENJAMIN",
+    "VENDEUR002": "LEA [CAISSE 1/2]",
+    "VENDEUR003": "LEA CAISSE 12",
+}
+
+
+def verifier_noms_difficiles(nb_lignes, nb_employes):
+    """L'export groupé écrit une feuille par employé, même quand les noms ne sont pas des noms de feuilles valides."""
+    brut = generer_planning(nb_lignes, nb_employes=nb_employes)
+    brut[noyau.COL_EMPLOYE] = brut[noyau.COL_EMPLOYE].replace(NOMS_DIFFICILES)
+    df = noyau.preparer_planning(brut)
+    index = noyau.construire_index_planning(df)
+    semaines = sorted({s for par_annee in index.values() for s in par_annee.get(ANNEE, {})})
+    feuilles = pd.read_excel(noyau.to_excel_buffer_par_employe(df, semaines, ANNEE, index), sheet_name=None, header=None, dtype=str)
+    employes = sorted(index)
+    assert [f.iloc[1, 0] for f in feuilles.values()] == [f"Employé(s) : {e.title()}" for e in employes]
+    par_employe = dict(zip(employes, feuilles.values()))
+    for nom in NOMS_DIFFICILES.values():
+        individuel = noyau.to_excel_buffer_multi(df, nom, semaines, ANNEE, index)
+        pd.testing.assert_frame_equal(par_employe[nom], pd.read_excel(individuel, header=None, dtype=str))
+    return [n for e, n in zip(employes, feuilles) if e in NOMS_DIFFICILES.values()]
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    nb_employes = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    df = noyau.preparer_planning(generer_planning(nb_lignes, nb_employes=nb_employes))
+    index = noyau.construire_index_planning(df)
+    semaines = sorted({s for par_annee in index.values() for s in par_annee.get(ANNEE, {})})
+    employes = sorted(index)
+
+    t0 = time.perf_counter()
+    individuels = {e: noyau.to_excel_buffer_multi(df, e, semaines, ANNEE, index) for e in employes}
+    t_individuels = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    groupe = noyau.to_excel_buffer_par_employe(df, semaines, ANNEE, index)
+    t_groupe = time.perf_counter() - t0
+
+    feuilles = pd.read_excel(groupe, sheet_name=None, header=None, dtype=str)
+    assert list(feuilles) == [noyau.nom_feuille_export(e) for e in employes if individuels[e] is not None]
+    for e, buffer in individuels.items():
+        if buffer is not None:
+            pd.testing.assert_frame_equal(feuilles[noyau.nom_feuille_export(e)], pd.read_excel(buffer, header=None, dtype=str))
+    noms = verifier_noms_difficiles(min(nb_lignes, 20_000), max(nb_employes, 8))
+
+    print(f"{nb_lignes} lignes, {len(employes)} employés, {len(semaines)} semaines")
+    print(f"  {len(employes)} exports individuels : {t_individuels:8.2f} s")
+    print(f"  Export groupé           : {t_groupe:8.2f} s  (x{t_individuels / t_groupe:.1f})")
+    print(f"  Noms de feuilles difficiles : {', '.join(noms)}")
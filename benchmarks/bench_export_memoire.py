@@ -0,0 +1,100 @@
+"""
+Compare le pic de mémoire (tracemalloc) et le temps de l'export Excel « Tous les employés » sur une année :
+écriture en flux (to_excel_buffer_multi, mode constant_memory) contre l'ancienne écriture via un DataFrame
+trié et pd.ExcelWriter (classeur entièrement en mémoire), puis compare les tableaux des deux classeurs.
+Les tableaux sont aussi comparés sur un planning dont les heures sont des fractions de jour Excel avec des cases
+vides (colonnes numériques avec NaN, écrites en cellules vides).
+Le pic est mesuré avec tracemalloc : le RSS du processus est dominé par le chargement du planning.
+
+Usage : python benchmarks/bench_export_memoire.py [nb_lignes]
+"""
+import datetime
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+ANNEE = 2025
+TOUS = "Tous les employés"
+
+
+def export_en_memoire(df_initial, index_planning, semaines):
+    """Ancienne implémentation (DataFrame trié puis pd.ExcelWriter), conservée comme référence."""
+    df_export = noyau.filtrer_planning(df_initial, index_planning, annee=ANNEE, semaines=semaines)
+    df_export = df_export[[noyau.COL_EMPLOYE, noyau.COL_SEMAINE, noyau.COL_JOUR, noyau.COL_DEBUT, noyau.COL_FIN]]
+    df_export[noyau.COL_JOUR] = pd.Categorical(df_export[noyau.COL_JOUR], categories=noyau.ORDRE_JOURS, ordered=True)
+    df_export = df_export.sort_values(by=[noyau.COL_EMPLOYE, noyau.COL_SEMAINE, noyau.COL_JOUR])
+    df_export.columns = ['Employé', 'Semaine', 'Jour', 'Début', 'Fin']
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_export.to_excel(writer, sheet_name='Planning Global', index=False, startrow=7, header=False)
+    output.seek(0)
+    return output
+
+
+def planning_heures_numeriques(nb_lignes):
+    """Planning brut dont HEURE DEBUT / HEURE FIN ne contiennent que des fractions de jour Excel et des cases vides."""
+    brut = generer_planning(nb_lignes)
+    brut = brut[brut[noyau.COL_DEBUT].isna() | brut[noyau.COL_DEBUT].map(lambda v: hasattr(v, 'hour'))]
+    for col in (noyau.COL_DEBUT, noyau.COL_FIN):
+        brut[col] = [np.nan if pd.isna(v) else (v.hour * 3600 + v.minute * 60) / 86400 for v in brut[col]]
+    return brut.reset_index(drop=True)
+
+
+def tableau_export(buffer):
+    return pd.read_excel(buffer, header=None, skiprows=7, dtype=str)
+
+
+def tableau_en_fractions(buffer):
+    """Tableau de l'export, les cellules lues comme heures (colonnes au format hh:mm) ramenées en fraction de jour."""
+    tableau = pd.read_excel(buffer, header=None, skiprows=7)
+    return tableau.map(
+        lambda v: (v.hour * 3600 + v.minute * 60 + v.second) / 86400 if isinstance(v, datetime.time) else v
+    ).infer_objects()
+
+
+def mesurer(fonction, *args):
+    """Retourne (résultat, secondes, pic de mémoire allouée en Mo pendant l'appel)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultat = fonction(*args)
+    duree = time.perf_counter() - t0
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultat, duree, pic / 1e6
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = noyau.preparer_planning(generer_planning(nb_lignes))
+    index = noyau.construire_index_planning(df)
+    semaines = sorted({s for par_annee in index.values() for s in par_annee.get(ANNEE, {})})
+
+    print(f"{nb_lignes} lignes (export de l'année {ANNEE}, tous les employés)")
+    tableaux = {}
+    for libelle, fonction, args in (
+        ("pd.ExcelWriter", export_en_memoire, (df, index, semaines)),
+        ("constant_memory", noyau.to_excel_buffer_multi, (df, TOUS, semaines, ANNEE, index)),
+    ):
+        buffer, duree, pic = mesurer(fonction, *args)
+        tableaux[libelle] = tableau_export(buffer)
+        print(f"  {libelle:<16}: {duree:8.2f} s, pic mémoire {pic:8.1f} Mo, {len(buffer.getvalue()) / 1e6:.1f} Mo écrits")
+    pd.testing.assert_frame_equal(tableaux["pd.ExcelWriter"], tableaux["constant_memory"])
+
+    df = noyau.preparer_planning(planning_heures_numeriques(20_000))
+    index = noyau.construire_index_planning(df)
+    semaines = sorted({s for par_annee in index.values() for s in par_annee.get(ANNEE, {})})
+    assert df[noyau.COL_DEBUT].dtype == np.float64 and df[noyau.COL_DEBUT].isna().any()
+    pd.testing.assert_frame_equal(
+        tableau_en_fractions(export_en_memoire(df, index, semaines)),
+        tableau_en_fractions(noyau.to_excel_buffer_multi(df, TOUS, semaines, ANNEE, index)),
+    )
+    print("  Heures en fractions de jour avec cases vides : tableaux identiques")
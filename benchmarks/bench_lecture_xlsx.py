@@ -0,0 +1,62 @@
+"""
+Compare la lecture en flux (lire_xlsx_en_flux) à pd.read_excel sur un classeur synthétique :
+temps de lecture et pic de mémoire (RSS) de chaque lecteur, mesurés chacun dans un processus séparé.
+
+Usage : python benchmarks/bench_lecture_xlsx.py [nb_lignes]
+"""
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DOSSIER_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DOSSIER_BENCH))
+
+
+def mesurer(lecteur, fichier):
+    """Exécuté dans le sous-processus : lit le fichier et affiche 'secondes rss_avant_ko rss_pic_ko'."""
+    import pandas as pd
+    import noyau_planning as noyau
+
+    rss_avant = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if lecteur == "flux":
+        df = noyau.lire_xlsx_en_flux(fichier)
+    else:
+        df = pd.read_excel(fichier)
+    duree = time.perf_counter() - t0
+    rss_pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{duree} {rss_avant} {rss_pic} {len(df)}")
+
+
+def lancer(lecteur, fichier):
+    sortie = subprocess.run(
+        [sys.executable, __file__, "--mesurer", lecteur, fichier],
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    duree, rss_avant, rss_pic, nb = sortie.split()
+    return float(duree), (int(rss_pic) - int(rss_avant)) / 1024, int(nb)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mesurer":
+        mesurer(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    from generer_planning import ecrire_xlsx, generer_planning
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        ecrire_xlsx(generer_planning(nb_lignes), fichier)
+
+        print(f"{nb_lignes} lignes ({os.path.getsize(fichier) / 1e6:.1f} Mo)")
+        for lecteur, libelle in (("read_excel", "pd.read_excel"), ("flux", "lire_xlsx_en_flux")):
+            duree, memoire, nb = lancer(lecteur, fichier)
+            print(f"  {libelle:<18}: {duree:8.2f} s, pic mémoire +{memoire:8.1f} Mo ({nb} lignes lues)")
+    finally:
+        shutil.rmtree(dossier)
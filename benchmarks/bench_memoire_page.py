@@ -0,0 +1,56 @@
+"""
+Mesure les allocations mémoire d'une réexécution de la page (vue Admin "Tous les employés")
+sur un planning synthétique : pic d'allocation (tracemalloc) pendant la réexécution déclenchée
+par une case à cocher de semaine, une fois les données chargées.
+
+Usage : python benchmarks/bench_memoire_page.py [nb_lignes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DOSSIER_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOSSIER_APP)
+from generer_planning import generer_planning  # noqa: E402
+
+
+def reexecution(at):
+    """Coche / décoche la première semaine proposée et mesure la réexécution (secondes, pic en Mo)."""
+    case = at.sidebar.checkbox[0]
+    (case.uncheck() if case.value else case.check())
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    at.run()
+    duree = time.perf_counter() - t0
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert not at.exception, at.exception
+    return duree, pic / 1e6
+
+
+if __name__ == "__main__":
+    from streamlit.testing.v1 import AppTest
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        generer_planning(nb_lignes).to_excel(fichier, index=False)
+        os.environ["PLANNING_FICHIER"] = fichier
+
+        at = AppTest.from_file(os.path.join(DOSSIER_APP, "app.py"), default_timeout=600)
+        at.session_state['authenticated'] = True
+        at.session_state['username'] = "ADMIN"
+        at.run()
+        at.sidebar.selectbox(key='admin_employee_select').select("Tous les employés").run()
+
+        mesures = [reexecution(at) for _ in range(3)]
+        print(f"{nb_lignes} lignes, vue 'Tous les employés'")
+        for i, (duree, pic) in enumerate(mesures, 1):
+            print(f"  Réexécution {i} : {duree:6.2f} s, pic d'allocation {pic:8.1f} Mo")
+    finally:
+        shutil.rmtree(dossier)
@@ -0,0 +1,119 @@
+"""
+Mémoire du planning partagé (Linux : /proc/self/smaps_rollup).
+
+1. Sessions : dans un même processus Streamlit, RSS après l'ouverture de 1, 5, 10 puis 20 sessions (AppTest,
+   une par employé) : le planning n'est chargé qu'une fois, le RSS ne grossit que des pages affichées.
+2. Processus : N processus chargent le même planning depuis le cache disque, projeté en mémoire sans copie
+   (lire_planning), puis avec une copie complète par processus (ancienne lecture, table.to_pandas()).
+   Mémoire privée (propre au processus) et PSS (pages partagées réparties entre les processus) par processus,
+   hors interpréteur et bibliothèques (processus témoin qui importe le noyau et pyarrow sans charger de planning).
+
+Usage : python benchmarks/bench_memoire_partagee.py [nb_lignes] [nb_processus]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+DOSSIER_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOSSIER_APP)
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+NB_SESSIONS = [1, 5, 10, 20]
+
+
+def memoire_processus():
+    """(RSS, PSS, mémoire privée) du processus courant, en Mo."""
+    valeurs = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for ligne in f:
+            morceaux = ligne.split()
+            if len(morceaux) == 3 and morceaux[2] == 'kB':
+                valeurs[morceaux[0].rstrip(':')] = int(morceaux[1]) / 1024
+    return valeurs['Rss'], valeurs['Pss'], valeurs['Private_Clean'] + valeurs['Private_Dirty']
+
+
+def processus(mode, fichier):
+    """Processus de mesure : charge le planning (selon `mode`), le parcourt, signale qu'il est prêt puis mesure."""
+    import pyarrow.feather as feather
+
+    import noyau_planning as noyau
+
+    df = None
+    if mode == 'partage':
+        df = noyau.lire_planning(fichier)
+    elif mode == 'copie':
+        df = feather.read_table(noyau.chemin_cache_disque(fichier), memory_map=True).to_pandas()
+    if df is not None:
+        noyau.totaux_semaines(df)  # Parcourt les colonnes : toutes les pages sont effectivement lues
+    print("pret", flush=True)
+    sys.stdin.readline()  # Tous les processus sont chargés : le PSS répartit les pages partagées entre eux
+    print(*memoire_processus(), flush=True)
+    sys.stdin.readline()
+
+
+def mesurer_processus(mode, fichier, nb_processus):
+    """Moyennes (RSS, PSS, privée) en Mo sur `nb_processus` processus vivants en même temps."""
+    commandes = [sys.executable, os.path.abspath(__file__), "--processus", mode, fichier]
+    enfants = [subprocess.Popen(commandes, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(nb_processus)]
+    for enfant in enfants:
+        assert enfant.stdout.readline().strip() == "pret"
+    mesures = []
+    for enfant in enfants:
+        enfant.stdin.write("mesure\n")
+        enfant.stdin.flush()
+        mesures.append([float(v) for v in enfant.stdout.readline().split()])
+    for enfant in enfants:
+        enfant.stdin.close()
+        enfant.wait()
+    return [sum(m[i] for m in mesures) / len(mesures) for i in range(3)]
+
+
+def mesurer_sessions(fichier):
+    """RSS (Mo) du processus après l'ouverture de chaque palier de NB_SESSIONS sessions."""
+    from streamlit.testing.v1 import AppTest
+
+    import noyau_planning as noyau
+
+    os.environ["PLANNING_FICHIER"] = fichier
+    employes = sorted(noyau.construire_index_planning(noyau.lire_planning(fichier)))
+    sessions, resultats = [], []
+    for palier in NB_SESSIONS:
+        while len(sessions) < palier:
+            at = AppTest.from_file(os.path.join(DOSSIER_APP, "app.py"), default_timeout=600)
+            at.session_state['authenticated'] = True
+            at.session_state['username'] = employes[len(sessions) % len(employes)]
+            at.run()
+            assert not at.exception, at.exception
+            sessions.append(at)
+        resultats.append((palier, memoire_processus()[0]))
+    return resultats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--processus":
+        processus(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    nb_processus = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        ecrire_xlsx(generer_planning(nb_lignes, encodages_mixtes=True), fichier)
+        sessions = mesurer_sessions(fichier)  # Écrit aussi le cache disque utilisé par les processus
+
+        print(f"{nb_lignes} lignes")
+        print("  Sessions dans un processus Streamlit :")
+        for palier, rss in sessions:
+            print(f"    {palier:3d} session(s) : RSS {rss:8.1f} Mo  (+{rss - sessions[0][1]:6.1f} Mo)")
+
+        temoin = mesurer_processus('temoin', fichier, nb_processus)
+        print(f"  {nb_processus} processus, mémoire du planning par processus (hors interpréteur) :")
+        for mode, libelle in (('partage', "cache projeté, sans copie"), ('copie', "copie par processus")):
+            rss, pss, privee = (m - t for m, t in zip(mesurer_processus(mode, fichier, nb_processus), temoin))
+            print(f"    {libelle:<26}: RSS {rss:7.1f} Mo, PSS {pss:7.1f} Mo, privée {privee:7.1f} Mo")
+    finally:
+        shutil.rmtree(dossier)
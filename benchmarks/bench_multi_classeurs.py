@@ -0,0 +1,105 @@
+"""
+Mesure la lecture à froid (sans cache disque) d'un planning en plusieurs classeurs (lire_plannings sur un
+dossier, un classeur par magasin) avec 1, 2, 4... processus, et vérifie que le planning combiné est le même
+quel que soit le nombre de processus et que chaque semaine d'employé présente dans plusieurs classeurs vient
+du dernier d'entre eux (les employés MOUNIA, ADAM, HOUDA et JULIEN sont dans tous les classeurs).
+Vérifie aussi que les processus de lecture n'exécutent pas le script principal du parent (app.py sous
+« streamlit run », que Streamlit installe comme module __main__).
+
+Usage : python benchmarks/bench_multi_classeurs.py [nb_lignes_par_classeur] [nb_classeurs] [nb_processus_max]
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+from contextlib import contextmanager
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+EMPLOYES_COMMUNS = ["MOUNIA", "ADAM", "HOUDA", "JULIEN"]
+
+
+def lecture_a_froid(dossier, nb_processus):
+    """Temps de lire_plannings(dossier) après suppression des caches disque."""
+    shutil.rmtree(os.path.join(dossier, noyau.DOSSIER_CACHE), ignore_errors=True)
+    t0 = time.perf_counter()
+    df = noyau.lire_plannings(dossier, nb_processus=nb_processus)
+    return df, time.perf_counter() - t0
+
+
+def verifier_conflits(df, fichiers):
+    """Chaque semaine d'employé du planning combiné vient du dernier classeur (ordre des chemins) qui la contient."""
+    attendu = {}
+    for fichier in fichiers:
+        planning = noyau.lire_planning(fichier)
+        for cle in zip(planning[noyau.COL_EMPLOYE], planning['ANNEE'], planning[noyau.COL_SEMAINE]):
+            attendu[cle] = os.path.basename(fichier)
+    sources = df.groupby([noyau.COL_EMPLOYE, 'ANNEE', noyau.COL_SEMAINE], observed=True)[noyau.COL_SOURCE].agg(set)
+    assert len(sources) == len(attendu)
+    for cle, source in sources.items():
+        assert source == {attendu[cle]}, cle
+
+
+@contextmanager
+def script_principal_factice(dossier):
+    """
+    Installe comme module __main__ un script factice (à la place d'app.py sous Streamlit) qui laisse un fichier
+    témoin s'il est exécuté, et vérifie à la sortie qu'aucun processus de travail ne l'a exécuté.
+    """
+    script = os.path.join(dossier, "script_principal.py")
+    temoin = os.path.join(dossier, "script_principal_execute")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(f"open({temoin!r}, 'w').close()\n")
+    principal = types.ModuleType("__main__")
+    principal.__file__ = script
+    original, sys.modules["__main__"] = sys.modules["__main__"], principal
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = original
+    assert not os.path.exists(temoin), "un processus de travail a exécuté le script principal du parent"
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    nb_classeurs = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    nb_processus_max = int(sys.argv[3]) if len(sys.argv) > 3 else min(nb_classeurs, os.cpu_count() or 1)
+    paliers = sorted({nb_processus_max} | {2 ** i for i in range(nb_processus_max.bit_length())})
+
+    logging.getLogger(noyau.__name__).setLevel(logging.ERROR)  # Conflits voulus : vérifiés par verifier_conflits
+    dossier = tempfile.mkdtemp()
+    try:
+        for k in range(nb_classeurs):
+            brut = generer_planning(nb_lignes, graine=k, encodages_mixtes=True)
+            propres = ~brut['NOM VENDEUR'].isin(EMPLOYES_COMMUNS)
+            brut.loc[propres, 'NOM VENDEUR'] = f"M{k}-" + brut.loc[propres, 'NOM VENDEUR']
+            ecrire_xlsx(brut, os.path.join(dossier, f"planning_magasin{k:02d}.xlsx"))
+        fichiers = noyau.fichiers_planning(dossier)
+
+        with script_principal_factice(dossier):
+            lecture_a_froid(dossier, max(nb_processus_max, 2))
+        reference, t_reference = None, None
+        print(f"{nb_classeurs} classeurs de {nb_lignes} lignes, {os.cpu_count()} cœur(s)")
+        for nb_processus in paliers:
+            df, duree = lecture_a_froid(dossier, nb_processus)
+            if reference is None:
+                reference, t_reference = df, duree
+                verifier_conflits(reference, fichiers)
+            pd.testing.assert_frame_equal(reference, df)
+            print(f"  {nb_processus:2d} processus : {duree:7.2f} s  (x{t_reference / duree:4.2f}, "
+                  f"efficacité {t_reference / duree / nb_processus:4.0%})")
+
+        t0 = time.perf_counter()
+        depuis_cache = noyau.lire_plannings(dossier)
+        t_cache = time.perf_counter() - t0
+        pd.testing.assert_frame_equal(reference, depuis_cache)
+        print(f"  Depuis le cache combiné : {t_cache:7.3f} s  ({len(reference)} lignes gardées)")
+    finally:
+        shutil.rmtree(dossier)
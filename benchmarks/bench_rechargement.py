@@ -0,0 +1,41 @@
+"""
+Mesure le rechargement incrémental (mettre_a_jour_planning) après la modification d'une seule
+semaine d'un employé, comparé au recalcul complet (enrichir_planning), et vérifie que le résultat est identique.
+
+Usage : python benchmarks/bench_rechargement.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    brut = generer_planning(nb_lignes)
+    precedent = noyau.enrichir_planning(noyau.nettoyer_planning(brut.copy()))
+
+    # Le planificateur corrige la S42 d'un employé
+    modifie = brut.copy()
+    lignes = (modifie[noyau.COL_EMPLOYE] == "ADAM") & (modifie[noyau.COL_SEMAINE] == "S42-25")
+    modifie.loc[lignes, noyau.COL_FIN] = "ECOLE"
+    nettoye = noyau.nettoyer_planning(modifie)
+
+    t0 = time.perf_counter()
+    complet = noyau.enrichir_planning(nettoye.copy())
+    t_complet = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    incremental = noyau.mettre_a_jour_planning(precedent, nettoye.copy())
+    t_incremental = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(complet, incremental)
+
+    print(f"{nb_lignes} lignes, {lignes.sum()} lignes modifiées")
+    print(f"  Recalcul complet : {t_complet:8.2f} s")
+    print(f"  Incrémental      : {t_incremental:8.2f} s  (x{t_complet / t_incremental:.1f})")
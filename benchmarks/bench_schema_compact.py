@@ -0,0 +1,65 @@
+"""
+Compare l'empreinte mémoire (memory_usage(deep=True)) du planning enrichi compact (compacter_planning :
+catégories, minutes entières, année int16, totaux par semaine dans une table à part) à l'ancienne
+représentation (texte en objets Python, Timedelta, int64, total de la semaine répété sur chaque ligne),
+et vérifie que les deux donnent les mêmes durées, statuts, dates et totaux par semaine.
+
+Usage : python benchmarks/bench_schema_compact.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import generer_planning  # noqa: E402
+
+
+def enrichir_large(df):
+    """Ancienne représentation : colonnes calculées en types larges et total de la semaine sur chaque ligne."""
+    df['Duree_Debut'] = noyau.convertir_colonne_heures(df[noyau.COL_DEBUT])
+    df['Duree_Fin'] = noyau.convertir_colonne_heures(df[noyau.COL_FIN])
+    df = noyau.enrichir_colonnes_vectorise(df)
+    totaux = df.groupby([noyau.COL_EMPLOYE, noyau.COL_SEMAINE, 'ANNEE'])['Durée du service'].sum()
+    totaux = totaux.rename('TEMPS_TOTAL_SEMAINE').reset_index()
+    return pd.merge(df, totaux, on=[noyau.COL_EMPLOYE, noyau.COL_SEMAINE, 'ANNEE'], how='left')
+
+
+def mo(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+if __name__ == "__main__":
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    nettoye = noyau.nettoyer_planning(generer_planning(nb_lignes, encodages_mixtes=True))
+
+    t0 = time.perf_counter()
+    large = enrichir_large(nettoye.copy())
+    t_large = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compact = noyau.enrichir_planning(nettoye.copy())
+    totaux = noyau.totaux_semaines(compact)
+    t_compact = time.perf_counter() - t0
+
+    # Mêmes valeurs, en minutes et en texte
+    for col in noyau.COLONNES_HEURES_MINUTES + noyau.COLONNES_DUREES_MINUTES:
+        attendu = (large[col] / pd.Timedelta(minutes=1)).round().astype('Int64')
+        pd.testing.assert_series_equal(attendu, compact[col].astype('Int64'), check_names=False)
+    for col in [noyau.COL_EMPLOYE, noyau.COL_SEMAINE, noyau.COL_JOUR, noyau.COL_DEBUT, noyau.COL_FIN, 'Statut', 'DATE', 'ANNEE']:
+        assert (large[col].to_numpy() == compact[col].to_numpy()).all(), col
+    semaines = large.drop_duplicates([noyau.COL_EMPLOYE, 'ANNEE', noyau.COL_SEMAINE])
+    for employe, annee, semaine, total in zip(semaines[noyau.COL_EMPLOYE], semaines['ANNEE'],
+                                              semaines[noyau.COL_SEMAINE], semaines['TEMPS_TOTAL_SEMAINE']):
+        assert totaux[(employe, annee, semaine)] == total / pd.Timedelta(minutes=1)
+
+    print(f"{nb_lignes} lignes")
+    print(f"  Ancienne représentation : {mo(large):9.1f} Mo  (enrichissement {t_large:.2f} s)")
+    print(f"  Planning compact        : {mo(compact):9.1f} Mo  (enrichissement {t_compact:.2f} s, "
+          f"x{mo(large) / mo(compact):.0f} moins de mémoire)")
+    print("  Par colonne (Mo) :")
+    for col in large.columns:
+        taille_compacte = compact[col].memory_usage(deep=True, index=False) / 1e6 if col in compact else 0
+        print(f"    {col:<22}: {large[col].memory_usage(deep=True, index=False) / 1e6:8.1f} -> {taille_compacte:6.1f}")
@@ -0,0 +1,147 @@
+"""
+Compare le stockage SQLite (PlanningSQLite) au planning en mémoire sur un planning synthétique de plusieurs années :
+1. mêmes index, totaux par semaine et anomalies, mêmes lignes pour les filtres de la page (filtrer_planning),
+   mêmes totaux hebdomadaires et mêmes exports Excel ;
+2. temps par requête (une semaine d'un employé ou de tous, une année d'un employé ou de tous, export de 4 semaines) ;
+3. mémoire d'un processus qui sert le planning (RSS au-delà d'un processus témoin qui importe seulement le noyau),
+   selon le stockage.
+La base est créée avec un script principal factice (module __main__, comme app.py sous Streamlit) que le
+processus de création ne doit pas exécuter.
+
+Usage : python benchmarks/bench_sqlite.py [nb_lignes]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import noyau_planning as noyau  # noqa: E402
+from bench_memoire_partagee import memoire_processus  # noqa: E402
+from bench_multi_classeurs import script_principal_factice  # noqa: E402
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+CLE = [noyau.COL_EMPLOYE, 'ANNEE', noyau.COL_SEMAINE]
+
+
+def ouvrir(stockage, fichier):
+    """(planning, index) tels que servis par PlanningEnDirect pour ce stockage."""
+    if stockage == noyau.STOCKAGE_MEMOIRE:
+        df = noyau.lire_plannings(fichier)
+        return df, noyau.construire_index_planning(df)
+    planning = noyau.OUVERTURE_STOCKAGES[stockage](fichier)
+    return planning, planning.index_planning
+
+
+def par_semaine(df):
+    """Lignes regroupées par semaine d'employé, dans l'ordre du fichier au sein de chaque semaine."""
+    return df.sort_values(CLE, kind='stable').reset_index(drop=True)
+
+
+def requetes(index):
+    """(nom, employé, année, semaines) : filtres typiques de la page et des exports."""
+    employe = sorted(index)[0]
+    annee = max(index[employe])
+    semaine = sorted(index[employe][annee])[0]
+    return [
+        ("une semaine d'un employé", employe, annee, [semaine]),
+        ("une semaine de tous", None, annee, [semaine]),
+        ("une année d'un employé", employe, annee, None),
+        ("une année de tous", None, annee, None),
+    ]
+
+
+def chronometrer(fonction, repetitions=20):
+    t0 = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - t0) / repetitions
+
+
+def processus(stockage, fichier):
+    """Processus de mesure : ouvre le planning, répond à une requête puis affiche sa mémoire."""
+    if stockage != 'temoin':
+        planning, index = ouvrir(stockage, fichier)
+        noyau.filtrer_planning(planning, index, *requetes(index)[0][1:])
+    print(*memoire_processus(), flush=True)
+
+
+def mesurer_processus(stockage, fichier):
+    sortie = subprocess.run([sys.executable, os.path.abspath(__file__), "--processus", stockage, fichier],
+                            capture_output=True, text=True, check=True).stdout
+    return float(sortie.split()[0])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--processus":
+        processus(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    nb_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    dossier = tempfile.mkdtemp()
+    try:
+        fichier = os.path.join(dossier, "planning_synthetique.xlsx")
+        ecrire_xlsx(generer_planning(nb_lignes, encodages_mixtes=True), fichier)
+
+        df, index = ouvrir(noyau.STOCKAGE_MEMOIRE, fichier)
+        t0 = time.perf_counter()
+        with script_principal_factice(dossier):
+            base, index_base = ouvrir(noyau.STOCKAGE_SQLITE, fichier)
+        t_creation = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        base, index_base = ouvrir(noyau.STOCKAGE_SQLITE, fichier)
+        t_ouverture = time.perf_counter() - t0
+
+        # 1. Équivalence
+        assert {(e, a, s): len(p) for e, par_a in index.items() for a, par_s in par_a.items() for s, p in par_s.items()} \
+            == {(e, a, s): len(p) for e, par_a in index_base.items() for a, par_s in par_a.items() for s, p in par_s.items()}
+        assert noyau.totaux_semaines(df) == base.totaux
+        assert noyau.table_anomalies(df) == base.anomalies
+        for _, employe, annee, semaines in requetes(index):
+            pd.testing.assert_frame_equal(
+                par_semaine(noyau.filtrer_planning(df, index, employe, annee, semaines)),
+                par_semaine(noyau.filtrer_planning(base, index_base, employe, annee, semaines)),
+            )
+            pd.testing.assert_frame_equal(
+                noyau.totaux_hebdomadaires(df, index, employe, annee, semaines)
+                .astype({noyau.COL_EMPLOYE: object, 'ANNEE': 'int64', noyau.COL_SEMAINE: object}),
+                noyau.totaux_hebdomadaires(base, index_base, employe, annee, semaines),
+            )
+        annee_export = requetes(index)[0][2]
+        semaines_export = sorted({s for par_a in index.values() for s in par_a.get(annee_export, {})})[:4]
+        for fonction in (lambda p, i: noyau.to_excel_buffer_multi(p, "Tous les employés", semaines_export, annee_export, i),
+                         lambda p, i: noyau.to_excel_buffer_par_employe(p, semaines_export, annee_export, i)):
+            exports = [pd.read_excel(fonction(p, i), sheet_name=None, header=None) for p, i in ((df, index), (base, index_base))]
+            assert exports[0].keys() == exports[1].keys()
+            for feuille in exports[0]:
+                pd.testing.assert_frame_equal(exports[0][feuille], exports[1][feuille])
+
+        # 2. Temps par requête
+        print(f"{nb_lignes} lignes ({len(df)} après nettoyage), {len(index)} employés")
+        print(f"  Base SQLite : création {t_creation:.2f} s, ouverture {t_ouverture * 1000:.1f} ms "
+              f"({os.path.getsize(base.chemin) / 1e6:.1f} Mo)")
+        print("  Temps par requête (ms)      mémoire     SQLite   lignes")
+        for nom, employe, annee, semaines in requetes(index):
+            t_memoire = chronometrer(lambda: noyau.filtrer_planning(df, index, employe, annee, semaines))
+            t_sqlite = chronometrer(lambda: noyau.filtrer_planning(base, index_base, employe, annee, semaines))
+            lignes = len(noyau.positions_planning(index, employe, annee, semaines))
+            print(f"    {nom:<25}: {t_memoire * 1000:8.2f}  {t_sqlite * 1000:9.2f}  {lignes:7d}")
+        t_memoire = chronometrer(
+            lambda: noyau.to_excel_buffer_multi(df, "Tous les employés", semaines_export, annee_export, index), 3
+        )
+        t_sqlite = chronometrer(
+            lambda: noyau.to_excel_buffer_multi(base, "Tous les employés", semaines_export, annee_export, index_base), 3
+        )
+        print(f"    {'export de 4 semaines':<25}: {t_memoire * 1000:8.2f}  {t_sqlite * 1000:9.2f}")
+
+        # 3. Mémoire du processus qui sert le planning
+        temoin = mesurer_processus('temoin', fichier)
+        print("  Mémoire du processus, hors interpréteur et bibliothèques (RSS) :")
+        for stockage in (noyau.STOCKAGE_MEMOIRE, noyau.STOCKAGE_SQLITE):
+            print(f"    {stockage:<8}: {mesurer_processus(stockage, fichier) - temoin:7.1f} Mo")
+    finally:
+        shutil.rmtree(dossier)
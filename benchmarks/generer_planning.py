@@ -0,0 +1,103 @@
+"""Générateur de plannings synthétiques au même format que RePlannings*.xlsx (pour les benchmarks)."""
+import argparse
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+JOURS = ['LUNDI', 'MARDI', 'MERCREDI', 'JEUDI', 'VENDREDI', 'SAMEDI', 'DIMANCHE ']
+HORAIRES = [
+    (time(10, 0), time(19, 0)),
+    (time(11, 30), time(19, 0)),
+    (time(10, 30), time(18, 0)),
+    (time(10, 0), time(13, 0)),
+    (time(22, 0), time(6, 0)),  # Service de nuit (passe minuit)
+]
+
+
+def encoder_heure(heure, encodage):
+    """Heure telle qu'elle peut apparaître dans un classeur : objet time, texte 'HH:MM:SS' ou fraction de jour Excel."""
+    if encodage == 0:
+        return heure
+    if encodage == 1:
+        return heure.strftime("%H:%M:%S")
+    return (heure.hour * 3600 + heure.minute * 60) / 86400
+
+
+def generer_planning(nb_lignes, nb_employes=40, graine=0, encodages_mixtes=False):
+    """
+    Retourne un DataFrame brut (tel que lu par pd.read_excel) de `nb_lignes` lignes :
+    horaires en datetime.time, cases vides, marqueurs ECOLE et services de nuit.
+    Avec `encodages_mixtes`, les horaires mélangent objets time, textes 'HH:MM:SS' et fractions
+    de jour Excel, et les marqueurs ECOLE varient en casse (comme dans les classeurs saisis à la main).
+    """
+    rng = np.random.default_rng(graine)
+    employes = np.array(["MOUNIA", "ADAM", "HOUDA", "JULIEN"] + [f"VENDEUR{i:03d}" for i in range(nb_employes - 4)])
+    semaines = np.array([f"S{s:02d}-{a:02d}" for a in (24, 25, 26) for s in range(1, 53)])
+
+    choix = rng.integers(0, len(HORAIRES), nb_lignes)
+    debut = np.array([h[0] for h in HORAIRES], dtype=object)[choix]
+    fin = np.array([h[1] for h in HORAIRES], dtype=object)[choix]
+
+    tirage = rng.random(nb_lignes)
+    repos = tirage < 0.25
+    ecole = (tirage >= 0.25) & (tirage < 0.30)
+    debut[repos] = np.nan
+    fin[repos] = np.nan
+    debut[ecole] = "ECOLE"
+    fin[ecole] = "ECOLE"
+
+    if encodages_mixtes:
+        # Tirages séparés : les autres colonnes restent identiques à celles du planning non mélangé
+        rng_encodages = np.random.default_rng(graine + 1)
+        horaires = ~(repos | ecole)
+        encodages = rng_encodages.integers(0, 3, nb_lignes)
+        tables = [np.array([encoder_heure(h[i], e) for h in HORAIRES for e in range(3)], dtype=object) for i in (0, 1)]
+        debut[horaires] = tables[0][(choix * 3 + encodages)[horaires]]
+        fin[horaires] = tables[1][(choix * 3 + encodages)[horaires]]
+        marqueurs = np.array(["ECOLE", "Ecole", "ecole "], dtype=object)[rng_encodages.integers(0, 3, nb_lignes)]
+        debut[ecole] = marqueurs[ecole]
+        fin[ecole] = marqueurs[ecole]
+
+    return pd.DataFrame({
+        'NOM VENDEUR': employes[rng.integers(0, len(employes), nb_lignes)],
+        'SEMAINE': semaines[rng.integers(0, len(semaines), nb_lignes)],
+        'JOUR': np.array(JOURS)[rng.integers(0, len(JOURS), nb_lignes)],
+        'HEURE DEBUT': debut,
+        'HEURE FIN': fin,
+    })
+
+
+def ecrire_xlsx(df, fichier):
+    """
+    Écrit le planning en .xlsx ligne par ligne (xlsxwriter en mode constant_memory, qui exige un ordre
+    ligne par ligne : DataFrame.to_excel écrit colonne par colonne et perdrait des cellules).
+    Mémoire constante, même pour des millions de lignes ; les cases vides (NaN) restent vides.
+    """
+    import xlsxwriter
+
+    classeur = xlsxwriter.Workbook(fichier, {'constant_memory': True})
+    feuille = classeur.add_worksheet()
+    format_heure = classeur.add_format({'num_format': 'hh:mm:ss'})
+    feuille.write_row(0, 0, list(df.columns))
+    for num_ligne, ligne in enumerate(df.itertuples(index=False), start=1):
+        for num_col, valeur in enumerate(ligne):
+            if isinstance(valeur, time):
+                feuille.write_datetime(num_ligne, num_col, valeur, format_heure)
+            elif not (isinstance(valeur, float) and np.isnan(valeur)):
+                feuille.write(num_ligne, num_col, valeur)
+    classeur.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("lignes", type=int)
+    parser.add_argument("sortie", help="Fichier .xlsx ou .csv à écrire")
+    parser.add_argument("--encodages-mixtes", action="store_true", help="Mélanger les formats d'heure")
+    args = parser.parse_args()
+
+    df = generer_planning(args.lignes, encodages_mixtes=args.encodages_mixtes)
+    if args.sortie.endswith(".csv"):
+        df.to_csv(args.sortie, sep=';', index=False, encoding='latin1')
+    else:
+        ecrire_xlsx(df, args.sortie)
@@ -0,0 +1,182 @@
+"""
+Suite de benchmarks : génère des plannings synthétiques (encodages d'heure mélangés, lignes ECOLE, services
+de nuit) de plusieurs tailles et mesure, pour chaque taille, le temps et le pic de mémoire (tracemalloc) de :
+chargement du classeur (lire_planning, à froid puis depuis le cache disque projeté en mémoire), chaîne de
+filtres (index, années, semaines travaillées, filtrage), verifier_donnees semaine par semaine, table_anomalies
+(contrôle de tout le planning), calendrier (afficher_calendrier) et to_excel_buffer_multi.
+
+Les résultats peuvent être enregistrés comme références (--enregistrer) ; les exécutions suivantes échouent
+(code de sortie 1) si une mesure dépasse sa référence de plus de --tolerance (par défaut 30 %).
+Les références dépendent de la machine : les enregistrer sur celle qui exécute la suite (le fichier par défaut,
+benchmarks/references_suite.json, est ignoré par git).
+
+Usage : python benchmarks/suite.py [--tailles 1000 100000 1000000] [--references FICHIER]
+                                   [--tolerance 0.3] [--enregistrer] [--sans-memoire]
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+import tracemalloc
+
+DOSSIER_BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DOSSIER_BENCH))
+import noyau_planning as noyau  # noqa: E402
+from generer_planning import ecrire_xlsx, generer_planning  # noqa: E402
+
+REFERENCES_PAR_DEFAUT = os.path.join(DOSSIER_BENCH, "references_suite.json")
+TOUS = "Tous les employés"
+# Modules que le noyau n'importe qu'à leur premier usage : importés avant les mesures, pour que le coût de
+# leur import ne soit pas compté dans la première opération qui s'en sert
+MODULES_A_LA_DEMANDE = ["pyarrow", "pyarrow.feather", "openpyxl.styles.numbers", "openpyxl.utils.datetime", "xlsxwriter"]
+
+
+def ecrire_classeur(nb_lignes, fichier):
+    ecrire_xlsx(generer_planning(nb_lignes, encodages_mixtes=True), fichier)
+
+
+def annee_principale(index):
+    """Année la plus représentée dans le planning (celle des filtres et de l'export)."""
+    lignes = {}
+    for par_annee in index.values():
+        for annee, par_semaine in par_annee.items():
+            lignes[annee] = lignes.get(annee, 0) + sum(len(p) for p in par_semaine.values())
+    return max(lignes, key=lignes.get)
+
+
+def chaine_de_filtres(df):
+    """Ce que fait la page pour chaque employé : index, totaux par semaine, années, semaines travaillées, puis filtrage."""
+    index = noyau.construire_index_planning(df)
+    totaux = noyau.totaux_semaines(df)
+    for employe in index:
+        for annee in noyau.annees_planning(index, employe):
+            semaines = noyau.semaines_travaillees(totaux, index, employe, annee)
+            noyau.filtrer_planning(df, index, employe, annee, semaines[:4])
+    return index
+
+
+def verifications(df, index, annee):
+    """verifier_donnees sur chaque semaine de chaque employé pour l'année."""
+    for employe, par_annee in index.items():
+        for semaine in par_annee.get(annee, {}):
+            noyau.verifier_donnees(noyau.filtrer_planning(df, index, employe, annee, [semaine]))
+
+
+def calendriers(df, index, annee):
+    """Calendrier de chaque mois de l'année pour chaque employé (cache HTML vidé au préalable)."""
+    noyau.generer_html_calendrier.cache_clear()
+    for employe in index:
+        df_employe = noyau.filtrer_planning(df, index, employe, annee)
+        for mois in range(1, 13):
+            statuts = noyau.statuts_du_mois(df_employe, mois, annee)
+            noyau.generer_html_calendrier(mois, annee, employe, statuts, date.today())
+
+
+def operations(fichier):
+    """(nom, fonction) dans l'ordre d'exécution ; chaque fonction reçoit et complète le contexte."""
+    def charger_a_froid(ctx):
+        shutil.rmtree(os.path.join(os.path.dirname(fichier), noyau.DOSSIER_CACHE), ignore_errors=True)
+        ctx['df'] = noyau.lire_planning(fichier)
+
+    def charger_depuis_cache(ctx):
+        ctx['df'] = noyau.lire_planning(fichier)
+
+    def filtres(ctx):
+        ctx['index'] = chaine_de_filtres(ctx['df'])
+        ctx['annee'] = annee_principale(ctx['index'])
+
+    def export(ctx):
+        semaines = sorted({s for par_annee in ctx['index'].values() for s in par_annee.get(ctx['annee'], {})})
+        noyau.to_excel_buffer_multi(ctx['df'], TOUS, semaines, ctx['annee'], ctx['index'])
+
+    return [
+        ("lire_planning (à froid)", charger_a_froid),
+        ("lire_planning (cache disque)", charger_depuis_cache),
+        ("chaîne de filtres", filtres),
+        ("verifier_donnees", lambda ctx: verifications(ctx['df'], ctx['index'], ctx['annee'])),
+        ("table_anomalies", lambda ctx: noyau.table_anomalies(ctx['df'])),
+        ("afficher_calendrier", lambda ctx: calendriers(ctx['df'], ctx['index'], ctx['annee'])),
+        ("to_excel_buffer_multi", export),
+    ]
+
+
+def mesurer(fichier, avec_memoire):
+    """{opération: {'secondes': ..., 'memoire_mo': ...}} : une passe chronométrée, puis une passe sous tracemalloc."""
+    for module in MODULES_A_LA_DEMANDE:
+        importlib.import_module(module)
+    resultats = {}
+    ctx = {}
+    for nom, fonction in operations(fichier):
+        t0 = time.perf_counter()
+        fonction(ctx)
+        resultats[nom] = {'secondes': round(time.perf_counter() - t0, 4)}
+
+    if avec_memoire:
+        ctx = {}
+        for nom, fonction in operations(fichier):
+            tracemalloc.start()
+            fonction(ctx)
+            resultats[nom]['memoire_mo'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            tracemalloc.stop()
+    return resultats
+
+
+def regressions(resultats, references, tolerance):
+    """Mesures dépassant leur référence de plus de `tolerance` (les mesures sans référence sont ignorées)."""
+    depassements = []
+    for taille, par_operation in resultats.items():
+        for nom, mesures in par_operation.items():
+            reference = references.get(taille, {}).get(nom, {})
+            for critere, valeur in mesures.items():
+                if critere in reference and valeur > reference[critere] * (1 + tolerance):
+                    depassements.append(f"{taille} lignes, {nom}, {critere} : {valeur} (référence {reference[critere]})")
+    return depassements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks du planning")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--references", default=REFERENCES_PAR_DEFAUT, help="Fichier JSON des références")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Dépassement toléré (0.3 = +30 %%)")
+    parser.add_argument("--enregistrer", action="store_true", help="Enregistrer les mesures comme références")
+    parser.add_argument("--sans-memoire", action="store_true", help="Ne pas mesurer la mémoire (plus rapide)")
+    args = parser.parse_args()
+
+    resultats = {}
+    dossier = tempfile.mkdtemp()
+    try:
+        for taille in args.tailles:
+            fichier = os.path.join(dossier, f"planning_{taille}.xlsx")
+            ecrire_classeur(taille, fichier)
+            resultats[str(taille)] = mesurer(fichier, avec_memoire=not args.sans_memoire)
+
+            print(f"{taille} lignes")
+            for nom, mesures in resultats[str(taille)].items():
+                memoire = f", pic mémoire {mesures['memoire_mo']:9.1f} Mo" if 'memoire_mo' in mesures else ""
+                print(f"  {nom:<32}: {mesures['secondes']:9.3f} s{memoire}")
+    finally:
+        shutil.rmtree(dossier)
+
+    if args.enregistrer:
+        references = {}
+        if os.path.exists(args.references):
+            with open(args.references, encoding='utf-8') as f:
+                references = json.load(f)
+        references.update(resultats)
+        with open(args.references, 'w', encoding='utf-8') as f:
+            json.dump(references, f, ensure_ascii=False, indent=2)
+        print(f"Références enregistrées dans {args.references}")
+    elif os.path.exists(args.references):
+        with open(args.references, encoding='utf-8') as f:
+            depassements = regressions(resultats, json.load(f), args.tolerance)
+        if depassements:
+            print(f"Régressions (tolérance {args.tolerance:.0%}) :")
+            for depassement in depassements:
+                print(f"  {depassement}")
+            sys.exit(1)
+        print(f"Aucune régression (tolérance {args.tolerance:.0%}).")
@@ -0,0 +1,89 @@
+"""
+Traitements par lots sur un classeur de planning, sans interface Streamlit (ex. tâche de paie nocturne).
+
+    python cli_planning.py totaux RePlannings1.2.xlsx --annee 2025 -o totaux.csv
+    python cli_planning.py export RePlannings1.2.xlsx --annee 2025 --semaines S41 S42 --employe JULIEN -o julien.xlsx
+    python cli_planning.py export RePlannings1.2.xlsx --annee 2025 --par-employe -o planning_par_employe.xlsx
+    python cli_planning.py totaux 'plannings/*.xlsx' --annee 2025 -o totaux_magasins.csv
+
+Les calculs sont ceux de l'application (noyau_planning) et profitent du même cache disque. Un dossier ou un motif
+glob (entre guillemets) combine plusieurs classeurs, lus en parallèle (lire_plannings). Avec --stockage sqlite, les
+filtres et les totaux sont des requêtes sur la base SQLite du planning (PlanningSQLite), créée au premier passage ;
+avec --stockage annees, seules les années concernées par la commande sont chargées (PlanningParAnnee).
+"""
+import argparse
+import sys
+
+from noyau_planning import (
+    COL_EMPLOYE, COL_SEMAINE, OUVERTURE_STOCKAGES, STOCKAGE_MEMOIRE, ErreurPlanning, construire_index_planning,
+    lire_plannings, to_excel_buffer_multi, to_excel_buffer_par_employe, totaux_hebdomadaires,
+)
+
+
+def commande_totaux(df, index, args):
+    """Totaux d'heures nettes par employé et par semaine, en CSV (séparateur ';')."""
+    totaux = totaux_hebdomadaires(df, index, args.employe, args.annee, args.semaines)
+    totaux['HEURES_DECIMALES'] = (totaux['HEURES_NETTES'].dt.total_seconds() / 3600).round(2)
+    totaux = totaux[[COL_EMPLOYE, 'ANNEE', COL_SEMAINE, 'TOTAL', 'HEURES_DECIMALES']]
+    totaux.columns = ['Employé', 'Année', 'Semaine', 'Heures nettes', 'Heures (décimales)']
+    totaux.to_csv(args.sortie or sys.stdout, sep=';', index=False)
+
+
+def commande_export(df, index, args):
+    """Classeur Excel identique au téléchargement de l'application (ou une feuille par employé)."""
+    if args.annee is None:
+        raise ErreurPlanning("L'export nécessite --annee.")
+    if not args.sortie:
+        raise ErreurPlanning("L'export nécessite un fichier de sortie (-o).")
+
+    semaines = args.semaines or sorted({
+        semaine for par_annee in index.values() for semaine in par_annee.get(args.annee, {})
+    })
+    if args.par_employe:
+        buffer = to_excel_buffer_par_employe(df, semaines, args.annee, index)
+    else:
+        buffer = to_excel_buffer_multi(df, args.employe or "Tous les employés", semaines, args.annee, index)
+    if buffer is None:
+        raise ErreurPlanning("Aucune donnée de planning à exporter pour la sélection.")
+
+    with open(args.sortie, 'wb') as f:
+        f.write(buffer.getvalue())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Totaux et exports du planning, sans interface.")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    for nom, fonction, aide in (
+        ('totaux', commande_totaux, "Heures nettes par employé et par semaine (CSV)"),
+        ('export', commande_export, "Export Excel du planning"),
+    ):
+        sous_parser = sous_commandes.add_parser(nom, help=aide)
+        sous_parser.set_defaults(fonction=fonction)
+        sous_parser.add_argument('fichier', help="Classeur de planning (.xlsx ou .csv), dossier ou motif glob de classeurs")
+        sous_parser.add_argument('--annee', type=int, help="Année (par défaut : toutes pour les totaux)")
+        sous_parser.add_argument('--semaines', nargs='+', help="Semaines, ex. S41 S42 (par défaut : toutes)")
+        sous_parser.add_argument('-o', '--sortie', help="Fichier de sortie (totaux : sortie standard par défaut)")
+        sous_parser.add_argument('--stockage', choices=[STOCKAGE_MEMOIRE, *OUVERTURE_STOCKAGES], default=STOCKAGE_MEMOIRE,
+                                 help="Planning chargé en mémoire, interrogé dans sa base SQLite ou chargé par année")
+        groupe = sous_parser.add_mutually_exclusive_group()
+        groupe.add_argument('--employe', type=str.upper, help="Limiter à un employé (NOM VENDEUR)")
+        if nom == 'export':
+            groupe.add_argument('--par-employe', action='store_true', help="Une feuille par employé")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.stockage == STOCKAGE_MEMOIRE:
+            df = lire_plannings(args.fichier)
+            index = construire_index_planning(df)
+        else:
+            df = OUVERTURE_STOCKAGES[args.stockage](args.fichier)
+            index = df.index_planning
+        args.fonction(df, index, args)
+    except ErreurPlanning as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2090 @@
+"""
+Noyau de calcul du planning, sans dépendance à Streamlit : lecture et enrichissement des classeurs,
+caches, index, totaux d'heures et exports Excel. Utilisé par app.py (interface) et cli_planning.py (traitements par lots).
+"""
+import pandas as pd
+from datetime import date, datetime, timedelta, time
+from time import perf_counter, sleep
+import numpy as np
+import os
+import io
+import pathlib
+import pickle
+import re
+import shutil
+import subprocess
+import sys
+import glob
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, defaultdict, namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+import calendar
+import locale
+import logging
+
+# --- 1. CONFIGURATION ET CONSTANTES ---
+
+journal = logging.getLogger(__name__)
+
+# Copy-on-Write (comportement par défaut à partir de pandas 3) : les sélections de colonnes et de
+# lignes partagent les données du planning tant qu'elles ne sont pas modifiées, ce qui évite
+# les copies complètes à chaque réexécution de la page.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Définir la locale pour les noms de mois en français
+# Cela est important pour l'affichage correct des noms de mois dans le sélecteur
+try:
+    locale.setlocale(locale.LC_TIME, 'fr_FR.UTF-8')
+except locale.Error:
+    try:
+        locale.setlocale(locale.LC_TIME, 'fra')
+    except locale.Error:
+        # Fallback si la locale française n'est pas installée
+        pass 
+
+# Cache disque du planning enrichi (format Feather/Arrow), créé à côté du fichier de planning
+DOSSIER_CACHE = ".cache_planning"
+# Délai (en secondes) entre deux vérifications du fichier de planning par le thread de surveillance
+INTERVALLE_SURVEILLANCE = 5
+# À incrémenter dès que les calculs de preparer_planning changent (invalide les caches existants)
+VERSION_CALCULS = 6
+
+# Noms des colonnes (headers) - DOIVENT CORRESPONDRE
+COL_EMPLOYE = 'NOM VENDEUR'
+COL_SEMAINE = 'SEMAINE'
+COL_JOUR = 'JOUR'
+COL_DEBUT = 'HEURE DEBUT'
+COL_FIN = 'HEURE FIN'
+
+# Liste des colonnes obligatoires pour le bon fonctionnement du script
+COLONNES_OBLIGATOIRES = [COL_EMPLOYE, COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN]
+
+# Colonnes facultatives à conserver en plus des colonnes obligatoires lors de la lecture en flux
+COLONNES_SUPPLEMENTAIRES = []
+
+# Colonnes ajoutées par enrichir_planning (les autres proviennent du fichier)
+COLONNES_CALCULEES = ['Duree_Debut', 'Duree_Fin', 'ANNEE', 'Duree_Brute', 'Pause', 'Durée du service', 'Statut', 'DATE']
+
+# Planning compact (compacter_planning) : heures de début et de fin en minutes depuis minuit (vides si
+# l'heure manque), durées en minutes entières
+COLONNES_HEURES_MINUTES = ['Duree_Debut', 'Duree_Fin']
+COLONNES_DUREES_MINUTES = ['Duree_Brute', 'Pause', 'Durée du service']
+
+# Granularité du rechargement incrémental
+CLE_PARTITION = [COL_EMPLOYE, COL_SEMAINE]
+
+# Plannings en plusieurs classeurs (lire_plannings) : colonne du classeur d'origine de chaque ligne,
+# extensions retenues dans un dossier
+COL_SOURCE = 'SOURCE'
+EXTENSIONS_PLANNING = ('.xlsx', '.xls', '.csv')
+# Script neutre des processus de travail (executer_en_processus), à côté de ce module
+SCRIPT_PROCESSUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processus_planning.py")
+
+# Stockage du planning servi aux pages (PlanningEnDirect) : DataFrame en mémoire, ou base SQLite indexée
+# interrogée à chaque filtre (PlanningSQLite), dont la mémoire ne dépend plus de la taille de l'historique
+STOCKAGE_MEMOIRE = 'memoire'
+STOCKAGE_SQLITE = 'sqlite'
+# ... ou partitions par ANNEE chargées au premier accès (PlanningParAnnee)
+STOCKAGE_ANNEES = 'annees'
+# Nombre de lignes insérées à la fois lors de la création de la base SQLite
+TAILLE_LOT_SQLITE = 50_000
+# Nombre maximal d'années gardées chargées par PlanningParAnnee (les moins récemment consultées sont libérées)
+TAILLE_CACHE_ANNEES = 2
+
+# Nombre maximal de (semaine, année) gardées dans la table des semaines (infos_semaine)
+TAILLE_CACHE_SEMAINES = 4096
+# Nombre maximal de calendriers HTML gardés en cache (generer_html_calendrier)
+TAILLE_CACHE_CALENDRIERS = 256
+
+# Taille maximale (en octets) des classeurs Excel gardés en mémoire (CacheExports)
+TAILLE_CACHE_EXPORTS = 64 * 1024 * 1024
+# Valeur de « employé » dans la clé d'un export groupé (une feuille par employé, voir cle_export)
+EXPORT_PAR_EMPLOYE = "Une feuille par employé"
+# Nombre de lignes lues à la fois dans le planning lors de l'écriture d'un export
+TAILLE_LOT_EXPORT = 10_000
+# Contraintes d'Excel sur les noms de feuilles : 31 caractères au plus, sans []:*?/\ ni apostrophe finale
+LONGUEUR_MAX_FEUILLE = 31
+CARACTERES_INTERDITS_FEUILLE = re.compile(r'[\[\]:*?/\\]')
+# Nombre de threads générant les exports Excel en arrière-plan
+NB_THREADS_EXPORT = 2
+
+# Durée maximale (en minutes) d'un service passant minuit pour être compté comme une nuit plutôt que
+# comme des heures inversées (heures_inversees)
+DUREE_MAX_NUIT = 12 * 60
+
+# Ordre logique des jours
+ORDRE_JOURS = ['LUNDI', 'MARDI', 'MERCREDI', 'JEUDI', 'VENDREDI', 'SAMEDI', 'DIMANCHE']
+
+# --- 2. FONCTIONS DE TRAITEMENT ---
+
+def formater_duree(td):
+    """Convertit un Timedelta en format 'Hh MMmin' lisible, utilisé pour le total."""
+    if pd.isna(td):
+        return "0h 00"
+    
+    total_seconds = td.total_seconds()
+    heures = int(total_seconds // 3600)
+    minutes = int((total_seconds % 3600) // 60)
+    
+    return f"{heures}h {minutes:02d}"
+
+def formater_heure_pour_colonne(val):
+    """Formatte une heure (time/Timestamp/Timedelta) en hh:mm ou retourne une chaîne vide."""
+    if pd.isna(val) or val == "":
+        return ""
+    
+    if isinstance(val, (time, pd.Timestamp)):
+          # Nettoyage de l'objet heure
+          return str(val).split('.')[-1].split(' ')[-1] if ' ' in str(val) else str(val)
+    
+    if isinstance(val, pd.Timedelta):
+        seconds = val.total_seconds()
+        heures = int(seconds // 3600)
+        minutes = int((seconds % 3600) // 60)
+        return f"{heures:02d}:{minutes:02d}"
+    
+    val_str = str(val)
+    if val_str.lower() in ('nan', '<nat>'):
+        return ""
+        
+    return val_str
+
+
+def get_dates_for_week(week_str, year, format_type='full'):
+    """Calcule la plage de dates pour la semaine, en utilisant l'année fournie."""
+    try:
+        week_match = re.search(r'S(\d+)', week_str.upper())
+        if not week_match:
+            return week_str if format_type == 'full' else "Erreur SEMAINE"
+            
+        week_num = int(week_match.group(1))
+        
+    except ValueError:
+        return week_str if format_type == 'full' else "Erreur SEMAINE"
+    
+    try:
+        d = date(year, 1, 1)
+        # Début de l'année ISO (Lundi de la première semaine)
+        date_debut_annee_iso = d + timedelta(days=-d.weekday())
+
+        date_debut = date_debut_annee_iso + timedelta(weeks=week_num - 1)
+        date_fin = date_debut + timedelta(days=6)
+        
+        date_debut_str = date_debut.strftime("%d/%m/%y")
+        date_fin_str = date_fin.strftime("%d/%m/%y")
+
+        if format_type == 'full':
+            return f"{week_str} ({year}): du {date_debut_str} au {date_fin_str}"
+        elif format_type == 'start_date':
+              return date_debut
+        elif format_type == 'month':
+              return (date_debut.month, date_debut.year)
+        elif format_type == 'month_name':
+              # Retourne le nom du mois en toutes lettres
+              return date_debut.strftime('%B').title()
+        else: # only_dates
+            return f"Semaine {week_str} ({year}) : du {date_debut_str} au {date_fin_str}"
+            
+    except Exception as e:
+        # Gère les cas où la semaine n'est pas calculable pour l'année donnée
+        return date(year, 1, 1) if format_type == 'start_date' else (1, year) if format_type == 'month' else "Erreur SEMAINE"
+
+# Métadonnées d'une semaine (résultats de get_dates_for_week pour chaque format)
+InfosSemaine = namedtuple('InfosSemaine', ['debut', 'fin', 'mois', 'nom_mois', 'libelle'])
+
+@lru_cache(maxsize=TAILLE_CACHE_SEMAINES)
+def infos_semaine(week_str, year):
+    """
+    Table des semaines : calcule une seule fois par (semaine, année) la date de début, la date de fin,
+    le (mois, année) de début, le nom du mois localisé et le libellé complet, avec exactement les
+    mêmes résultats (y compris en cas d'erreur) que get_dates_for_week.
+    """
+    debut = get_dates_for_week(week_str, year, format_type='start_date')
+    return InfosSemaine(
+        debut=debut,
+        fin=debut + timedelta(days=6) if isinstance(debut, date) else None,
+        mois=get_dates_for_week(week_str, year, format_type='month'),
+        nom_mois=get_dates_for_week(week_str, year, format_type='month_name'),
+        libelle=get_dates_for_week(week_str, year, format_type='full'),
+    )
+
+def precharger_infos_semaines(index):
+    """Remplit la table des semaines pour toutes les (semaine, année) du planning (voir construire_index_planning)."""
+    for par_annee in index.values():
+        for annee, par_semaine in par_annee.items():
+            for semaine in par_semaine:
+                infos_semaine(semaine, annee)
+
+def convertir_heure_en_timedelta(val):
+    """Convertit diverses entrées d'heure en timedelta (pour le calcul des heures)."""
+    if pd.isna(val) or val == "":
+        return pd.NaT
+    if isinstance(val, str) and "ECOLE" in val.upper():
+            return pd.NaT
+            
+    if isinstance(val, (time, pd.Timestamp)):
+        return pd.to_timedelta(str(val))
+    elif isinstance(val, (int, float)) and 0 <= val <= 1:
+        total_seconds = val * 86400
+        return pd.to_timedelta(total_seconds, unit='s')
+    try:
+        return pd.to_timedelta(val)
+    except:
+        return pd.NaT
+
+# Chaînes déjà au format 'HH:MM:SS' (cas de loin le plus fréquent après le nettoyage en texte)
+MOTIF_HEURE_TEXTE = re.compile(r'^\d{1,2}:\d{2}:\d{2}(\.\d+)?$')
+
+def convertir_colonne_heures(serie):
+    """
+    Version par lots de convertir_heure_en_timedelta pour une colonne entière.
+    Chaque valeur distincte n'est convertie qu'une fois (les horaires se répètent énormément),
+    et les valeurs distinctes sont regroupées par type pour être converties en un seul appel :
+    fractions de jour Excel, datetime.time, textes 'HH:MM:SS'. Les cas restants (ECOLE,
+    cases vides, textes libres, Timestamp) passent par convertir_heure_en_timedelta.
+    """
+    codes, uniques = pd.factorize(serie)
+    uniques = np.asarray(uniques, dtype=object)
+    resultats = np.full(len(uniques), np.timedelta64('NaT', 'ns'), dtype='timedelta64[ns]')
+
+    est_fraction = np.array([
+        isinstance(v, (int, float)) and not isinstance(v, bool) and 0 <= v <= 1 for v in uniques
+    ], dtype=bool)
+    est_heure = np.array([isinstance(v, time) for v in uniques], dtype=bool)
+    est_texte = np.array([isinstance(v, str) and MOTIF_HEURE_TEXTE.match(v) is not None for v in uniques], dtype=bool)
+    est_autre = ~(est_fraction | est_heure | est_texte)
+
+    # 1. Fractions de jour Excel (0 <= val <= 1)
+    if est_fraction.any():
+        secondes = uniques[est_fraction].astype('float64') * 86400
+        resultats[est_fraction] = pd.to_timedelta(secondes, unit='s').to_numpy()
+
+    # 2. Objets datetime.time
+    if est_heure.any():
+        microsecondes = [
+            ((h.hour * 60 + h.minute) * 60 + h.second) * 1_000_000 + h.microsecond for h in uniques[est_heure]
+        ]
+        resultats[est_heure] = pd.to_timedelta(microsecondes, unit='us').to_numpy()
+
+    # 3. Textes 'HH:MM:SS'
+    if est_texte.any():
+        resultats[est_texte] = pd.to_timedelta(uniques[est_texte].astype(str)).to_numpy()
+
+    # 4. Tout le reste : conversion unitaire, mais une seule fois par valeur distincte
+    if est_autre.any():
+        resultats[est_autre] = pd.to_timedelta([convertir_heure_en_timedelta(v) for v in uniques[est_autre]]).to_numpy()
+
+    # Les valeurs manquantes (code -1) restent NaT
+    if len(uniques) == 0:
+        valeurs = np.full(len(serie), np.timedelta64('NaT', 'ns'), dtype='timedelta64[ns]')
+    else:
+        valeurs = np.where(codes >= 0, resultats[codes], np.timedelta64('NaT', 'ns'))
+    return pd.Series(valeurs, index=serie.index, name=serie.name, dtype='timedelta64[ns]')
+
+def calculer_duree_brute(row):
+    """Calcule la durée de travail brute (avant déduction de la pause)."""
+    if pd.isna(row['Duree_Debut']) or pd.isna(row['Duree_Fin']):
+        return pd.Timedelta(0)
+    
+    duree = row['Duree_Fin'] - row['Duree_Debut']
+    
+    if duree < pd.Timedelta(0):
+        duree += pd.Timedelta(days=1)
+    
+    return duree
+
+def calculer_duree_service(row):
+    """
+    Calcule la durée de travail nette pour une ligne avec déduction de pause,
+    sauf pour MOUNIA ou si le jour est DIMANCHE.
+    """
+    duree = row['Duree_Brute']
+    employe = row[COL_EMPLOYE].upper()
+    jour = row[COL_JOUR].upper()
+    
+    # 1. Règle pour MOUNIA : pas de pause (même si service > 1h)
+    if employe == "MOUNIA":
+        pass # Aucune déduction
+        
+    # 2. Règle pour DIMANCHE : pas de pause (pour les autres employés)
+    elif jour == "DIMANCHE":
+        pass # Aucune déduction le dimanche
+    
+    # 3. Règle Générale (Autres jours et autres employés) : 1h de pause si service > 1h
+    elif duree > pd.Timedelta(hours=1):
+        duree -= pd.Timedelta(hours=1)
+        
+    if duree < pd.Timedelta(0): return pd.Timedelta(0)
+    return duree
+
+def obtenir_statut_global(row):
+    """Détermine le statut (Travail, Repos, École) basé sur la durée et le texte."""
+    if row['Durée du service'] > pd.Timedelta(0):
+        return "Travail"
+    debut_str = str(row[COL_DEBUT]).upper()
+    fin_str = str(row[COL_FIN]).upper()
+    if "ECOLE" in debut_str or "ECOLE" in fin_str:
+        return "École"
+    return "Repos"
+
+
+def calculer_heures_travaillees(df_planning):
+    """Calcule le total des heures nettes pour le planning."""
+
+    durees = df_planning['Durée du service']
+    total_duree = minutes_en_duree(durees[durees > 0].sum())
+    
+    total_heures_format = formater_duree(total_duree).replace("min", "")
+    
+    return df_planning, total_heures_format
+
+def extraire_annee(semaine_str):
+    """Essaie d'extraire l'année (YY) du format SXX-YY ou retourne une année par défaut."""
+    if isinstance(semaine_str, str):
+        match = re.search(r'-(\d{2})$', semaine_str)
+        if match:
+            return 2000 + int(match.group(1))
+            
+    return date.today().year
+
+def _valeurs_par_cle(colonnes, fonction):
+    """
+    Applique `fonction` une seule fois par combinaison distincte des colonnes fournies
+    puis redistribue le résultat sur toutes les lignes (les plannings répètent
+    massivement les mêmes semaines / jours).
+    """
+    if len(colonnes) == 1:
+        codes, uniques = pd.factorize(colonnes[0])
+        resultats = [fonction(v) for v in uniques]
+    else:
+        codes, uniques = pd.MultiIndex.from_arrays(colonnes).factorize()
+        resultats = [fonction(*v) for v in uniques]
+    return resultats, codes
+
+def minutes_en_duree(minutes):
+    """Minutes (colonnes de durée du planning compact, ou leurs sommes) en Timedelta, pour l'affichage."""
+    return pd.to_timedelta(minutes, unit='min')
+
+def _en_minutes(serie, dtype):
+    """Colonne de Timedelta (arrondis à la minute) ou déjà en minutes, convertie dans le type entier `dtype`."""
+    if pd.api.types.is_timedelta64_dtype(serie):
+        serie = (serie / pd.Timedelta(minutes=1)).round()
+    return serie.astype(dtype)
+
+def compacter_planning(df):
+    """
+    Représentation compacte du planning enrichi, gardée en mémoire et dans le cache disque : textes (colonnes
+    du fichier, Statut) et DATE en catégories, heures et durées en minutes entières (Int16 pour les heures, qui
+    peuvent manquer, int16 pour les durées), ANNEE en int16. Les totaux par semaine ne sont pas répétés sur
+    chaque ligne : voir totaux_semaines.
+    """
+    df = df.reset_index(drop=True)
+    for col in COLONNES_HEURES_MINUTES:
+        df[col] = _en_minutes(df[col], 'Int16')
+    for col in COLONNES_DUREES_MINUTES:
+        df[col] = _en_minutes(df[col], 'int16')
+    df['ANNEE'] = df['ANNEE'].astype('int16')
+    for col in df.columns:
+        if df[col].dtype == 'object' or col == 'DATE':
+            df[col] = df[col].astype('category')
+    return df
+
+def duree_hors_chevauchement(groupes, debut, fin):
+    """
+    Moteur d'intervalles des services : pour des intervalles [debut, fin) répartis en groupes (un groupe
+    par employé et par jour), part de chaque intervalle qui n'est pas déjà couverte par les intervalles du
+    même groupe commençant avant lui. Par groupe, la somme des parts est la durée de l'union des intervalles :
+    les heures communes à plusieurs services ne sont comptées qu'une fois.
+    Un tri par (groupe, début) puis un seul balayage (maximum cumulé des fins), en O(n log n).
+    """
+    groupes, debut, fin = np.asarray(groupes), np.asarray(debut), np.asarray(fin)
+    ordre = np.lexsort((debut, groupes))
+    groupes_tries, debut_tries, fin_tries = groupes[ordre], debut[ordre], fin[ordre]
+
+    # Fin la plus tardive des intervalles précédents du même groupe (le début lui-même pour le premier)
+    fin_max = pd.Series(fin_tries).groupby(groupes_tries).cummax().to_numpy()
+    couvert = debut_tries.copy()
+    suite = groupes_tries[1:] == groupes_tries[:-1]
+    couvert[1:][suite] = np.maximum(debut_tries[1:][suite], fin_max[:-1][suite])
+
+    parts = np.empty_like(fin)
+    parts[ordre] = np.maximum(fin_tries - couvert, np.zeros_like(fin_tries))
+    return parts
+
+def pauses_hors_chevauchement(groupes, debut, fin, parts, pause):
+    """
+    Pause déduite de chaque intervalle (mêmes groupes et bornes que duree_hors_chevauchement, `parts` son
+    résultat). Règle : une seule pause `pause` par bloc d'intervalles d'un groupe qui se chevauchent (comptés
+    comme leur union, comme pour les heures), si la durée du bloc la dépasse ; elle est prise sur les parts des
+    intervalles du bloc dans l'ordre de leur début. Deux services du même jour qui ne se chevauchent pas (ou se
+    touchent seulement) forment deux blocs et gardent chacun leur pause.
+    """
+    groupes, debut, fin, parts = np.asarray(groupes), np.asarray(debut), np.asarray(fin), np.asarray(parts)
+    ordre = np.lexsort((debut, groupes))
+    groupes_tries, debut_tries, parts_tries = groupes[ordre], debut[ordre], parts[ordre]
+
+    # Nouveau bloc : premier intervalle du groupe, ou début après la fin la plus tardive des précédents
+    fin_max = pd.Series(fin[ordre]).groupby(groupes_tries).cummax().to_numpy()
+    nouveau = np.ones(len(ordre), dtype=bool)
+    nouveau[1:] = (groupes_tries[1:] != groupes_tries[:-1]) | (debut_tries[1:] >= fin_max[:-1])
+    blocs = np.cumsum(nouveau)
+
+    cumul = pd.Series(parts_tries).groupby(blocs).cumsum().to_numpy()
+    duree_bloc = pd.Series(parts_tries).groupby(blocs).transform('sum').to_numpy()
+    zero = np.zeros_like(parts_tries)
+    a_prendre = np.where(duree_bloc > pause, pause, zero)
+    # Pause restant à prendre avant cet intervalle, bornée par sa part
+    pauses_triees = np.clip(a_prendre - (cumul - parts_tries), zero, parts_tries)
+
+    pauses = np.empty_like(parts)
+    pauses[ordre] = pauses_triees
+    return pauses
+
+def enrichir_colonnes_vectorise(df):
+    """
+    Version colonne par colonne de extraire_annee, calculer_duree_brute, calculer_duree_service,
+    obtenir_statut_global et du calcul de DATE, sans df.apply(axis=1). Seule différence avec les
+    fonctions ligne à ligne : quand plusieurs services d'un même jour se chevauchent, la durée du
+    service ne compte que la part non couverte par les services précédents (duree_hors_chevauchement),
+    et ces services n'ont qu'une pause pour eux tous (pauses_hors_chevauchement). La pause déduite de
+    chaque ligne est gardée dans la colonne Pause (affichée par la page).
+    """
+    zero = pd.Timedelta(0)
+    une_heure = pd.Timedelta(hours=1)
+
+    # ANNEE : une extraction par libellé de semaine distinct
+    annees, codes = _valeurs_par_cle([df[COL_SEMAINE]], extraire_annee)
+    df['ANNEE'] = np.asarray(annees, dtype='int64')[codes]
+
+    # Duree_Brute : Fin - Début, +24h si le service passe minuit, 0 si une heure manque
+    debut = pd.to_timedelta(df['Duree_Debut'])
+    fin = pd.to_timedelta(df['Duree_Fin'])
+    duree = fin - debut
+    duree = duree.mask(duree < zero, duree + pd.Timedelta(days=1))
+    duree = duree.mask(debut.isna() | fin.isna(), zero)
+    df['Duree_Brute'] = duree
+
+    # Services d'un même jour qui se chevauchent : chaque ligne ne compte que sa part non couverte
+    # (les nuits se terminent après minuit : fin = début + durée brute), et le bloc qu'ils forment n'a
+    # qu'une pause. Sans chevauchement : 1h de pause si le service dépasse 1h, comme calculer_duree_service.
+    travaillee = duree > zero
+    pause = pd.Series(zero, index=df.index)
+    if travaillee.any():
+        cles = [df[COL_EMPLOYE][travaillee], df['ANNEE'][travaillee], df[COL_SEMAINE][travaillee], df[COL_JOUR][travaillee]]
+        groupes = pd.MultiIndex.from_arrays(cles).factorize()[0]
+        debut_travail = debut[travaillee].to_numpy()
+        fin_travail = debut_travail + duree[travaillee].to_numpy()
+        parts = duree_hors_chevauchement(groupes, debut_travail, fin_travail)
+        duree = duree.copy()
+        duree[travaillee] = parts
+        pause[travaillee] = pauses_hors_chevauchement(
+            groupes, debut_travail, fin_travail, parts, une_heure.to_timedelta64()
+        )
+
+    # Durée du service : durée moins la pause, sauf MOUNIA et DIMANCHE (pas de pause)
+    sans_pause = (df[COL_EMPLOYE].str.upper() == "MOUNIA") | (df[COL_JOUR].str.upper() == "DIMANCHE")
+    pause = pause.mask(sans_pause, zero)
+    df['Pause'] = pause
+    df['Durée du service'] = (duree - pause).clip(lower=zero)
+
+    # Statut : Travail si le service a une durée (même entièrement couverte par un autre service du jour),
+    # sinon École si le texte le mentionne, sinon Repos
+    ecole = (
+        df[COL_DEBUT].astype(str).str.upper().str.contains("ECOLE", regex=False) |
+        df[COL_FIN].astype(str).str.upper().str.contains("ECOLE", regex=False)
+    )
+    df['Statut'] = np.select(
+        [travaillee, ecole],
+        ["Travail", "École"],
+        default="Repos"
+    ).astype(object)
+
+    # DATE : une seule résolution par triplet (SEMAINE, ANNEE, JOUR) distinct
+    dates, codes = _valeurs_par_cle(
+        [df[COL_SEMAINE], df['ANNEE'], df[COL_JOUR]],
+        lambda semaine, annee, jour: infos_semaine(semaine, int(annee)).debut +
+        timedelta(days=ORDRE_JOURS.index(jour))
+    )
+    df['DATE'] = pd.to_datetime(pd.Series(dates, dtype=object)).to_numpy()[codes]
+
+    return df
+
+# Espaces de noms XML des classeurs .xlsx (SpreadsheetML)
+NS_XLSX = {
+    'm': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+}
+TAG_LIGNE = f"{{{NS_XLSX['m']}}}row"
+TAG_CELLULE = f"{{{NS_XLSX['m']}}}c"
+TAG_VALEUR = f"{{{NS_XLSX['m']}}}v"
+TAG_TEXTE = f"{{{NS_XLSX['m']}}}t"
+TAG_CHAINE_PARTAGEE = f"{{{NS_XLSX['m']}}}si"
+TAG_TEXTE_ENRICHI = f"{{{NS_XLSX['m']}}}r"
+TAG_DONNEES_FEUILLE = f"{{{NS_XLSX['m']}}}sheetData"
+
+def _texte_chaine(element):
+    """Texte d'une chaîne partagée ou en ligne (<si>/<is>), y compris le texte enrichi, sans la phonétique."""
+    morceaux = []
+    for enfant in element:
+        if enfant.tag == TAG_TEXTE:
+            morceaux.append(enfant.text or '')
+        elif enfant.tag == TAG_TEXTE_ENRICHI:
+            morceaux.extend(t.text or '' for t in enfant.iter(TAG_TEXTE))
+    return ''.join(morceaux)
+
+def _index_colonne(reference):
+    """Index (base 0) de la colonne d'une référence de cellule Excel ('C12' -> 2)."""
+    index = 0
+    for caractere in reference:
+        if not caractere.isalpha():
+            break
+        index = index * 26 + ord(caractere.upper()) - 64
+    return index - 1
+
+def lire_xlsx_en_flux(fichier, colonnes=None):
+    """
+    Lit la première feuille d'un classeur .xlsx ligne par ligne (iterparse sur xl/worksheets/sheetN.xml),
+    sans construire le modèle objet openpyxl en mémoire. Seules les colonnes demandées sont converties
+    et conservées (par défaut COLONNES_OBLIGATOIRES + COLONNES_SUPPLEMENTAIRES). Les valeurs sont converties
+    comme le fait pd.read_excel (heures -> datetime.time, nombres entiers -> int, cases vides -> NaN).
+    """
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+    from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+
+    colonnes = colonnes or COLONNES_OBLIGATOIRES + COLONNES_SUPPLEMENTAIRES
+
+    with zipfile.ZipFile(fichier) as archive:
+        noms = set(archive.namelist())
+
+        # 1. Première feuille du classeur et calendrier (1900 / 1904)
+        classeur = ET.fromstring(archive.read('xl/workbook.xml'))
+        proprietes = classeur.find('m:workbookPr', NS_XLSX)
+        date1904 = proprietes is not None and proprietes.get('date1904') in ('1', 'true')
+        epoque = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        id_feuille = classeur.find('m:sheets/m:sheet', NS_XLSX).get(f"{{{NS_XLSX['r']}}}id")
+        relations = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        cible = next(rel.get('Target') for rel in relations if rel.get('Id') == id_feuille)
+        chemin_feuille = cible.lstrip('/') if cible.startswith('/') else f"xl/{cible}"
+
+        # 2. Chaînes partagées
+        chaines = []
+        if 'xl/sharedStrings.xml' in noms:
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, element in ET.iterparse(f):
+                    if element.tag == TAG_CHAINE_PARTAGEE:
+                        chaines.append(_texte_chaine(element))
+                        element.clear()
+
+        # 3. Styles de cellule correspondant à des dates / heures / durées
+        styles_date, styles_duree = set(), set()
+        if 'xl/styles.xml' in noms:
+            feuille_styles = ET.fromstring(archive.read('xl/styles.xml'))
+            formats_perso = {
+                int(nf.get('numFmtId')): nf.get('formatCode')
+                for nf in feuille_styles.iterfind('m:numFmts/m:numFmt', NS_XLSX)
+            }
+            for index, xf in enumerate(feuille_styles.iterfind('m:cellXfs/m:xf', NS_XLSX)):
+                id_format = int(xf.get('numFmtId', 0))
+                code_format = formats_perso.get(id_format, BUILTIN_FORMATS.get(id_format))
+                if code_format and is_date_format(code_format):
+                    styles_date.add(index)
+                if code_format and is_timedelta_format(code_format):
+                    styles_duree.add(index)
+
+        # Conversions mises en cache : les mêmes horaires reviennent sur des milliers de lignes
+        cache_valeurs = {}
+
+        def convertir(cellule):
+            type_cellule = cellule.get('t', 'n')
+            if type_cellule == 'inlineStr':
+                enfant = cellule.find('m:is', NS_XLSX)
+                return _texte_chaine(enfant) if enfant is not None else np.nan
+            texte = cellule.findtext(TAG_VALEUR)
+            if not texte:
+                return np.nan
+            if type_cellule == 's':
+                return chaines[int(texte)]
+            cle = (type_cellule, cellule.get('s'), texte)
+            if cle in cache_valeurs:
+                return cache_valeurs[cle]
+            if type_cellule == 'n':
+                valeur = float(texte) if ('.' in texte or 'E' in texte or 'e' in texte) else int(texte)
+                style = int(cellule.get('s', 0))
+                if style in styles_date:
+                    try:
+                        valeur = from_excel(valeur, epoque, timedelta=style in styles_duree)
+                    except (OverflowError, ValueError):
+                        valeur = np.nan
+                elif valeur == int(valeur):
+                    valeur = int(valeur)
+            elif type_cellule == 'b':
+                valeur = bool(int(texte))
+            elif type_cellule == 'd':
+                valeur = from_ISO8601(texte)
+            elif type_cellule == 'e':
+                valeur = np.nan
+            else:
+                valeur = texte
+            cache_valeurs[cle] = valeur
+            return valeur
+
+        # 4. Parcours de la feuille ligne par ligne ; les colonnes sont remplies au fil de l'eau
+        nom_par_index = None
+        donnees = {}
+        nb_lignes = 0
+        with archive.open(chemin_feuille) as f:
+            donnees_feuille = None
+            for evenement, element in ET.iterparse(f, events=('start', 'end')):
+                if evenement == 'start':
+                    if element.tag == TAG_DONNEES_FEUILLE:
+                        donnees_feuille = element
+                    continue
+                if element.tag != TAG_LIGNE:
+                    continue
+
+                valeurs = {}
+                position = -1
+                for cellule in element.iter(TAG_CELLULE):
+                    reference = cellule.get('r')
+                    position = _index_colonne(reference) if reference else position + 1
+                    if nom_par_index is None or position in nom_par_index:
+                        valeurs[position] = convertir(cellule)
+
+                if nom_par_index is None:
+                    # Ligne d'en-tête : on ne retient que les colonnes demandées
+                    nom_par_index = {
+                        i: str(v).strip() for i, v in valeurs.items()
+                        if isinstance(v, str) and v.strip() in colonnes
+                    }
+                    donnees = {nom: [] for nom in nom_par_index.values()}
+                elif any(not (isinstance(v, float) and np.isnan(v)) for v in valeurs.values()):
+                    for i, nom in nom_par_index.items():
+                        donnees[nom].append(valeurs.get(i, np.nan))
+                    nb_lignes += 1
+
+                # Libère la ligne traitée : la mémoire reste constante quelle que soit la taille de la feuille
+                if donnees_feuille is not None:
+                    donnees_feuille.clear()
+
+    df = pd.DataFrame({nom: pd.Series(valeurs, dtype=object) for nom, valeurs in donnees.items()})
+    return df.infer_objects()
+
+def suffixe_cache_disque():
+    """
+    Partie du nom de cache qui ne dépend pas du contenu : version des calculs et année en cours
+    (extraire_annee utilise l'année en cours pour les semaines sans suffixe '-YY').
+    """
+    return f"-v{VERSION_CALCULS}-{date.today().year}"
+
+def chemin_cache_disque(fichier):
+    """Chemin du cache Feather du fichier, dont le nom dépend du contenu du fichier et de suffixe_cache_disque()."""
+    empreinte = hashlib.sha256()
+    with open(fichier, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            empreinte.update(bloc)
+    cle = f"{empreinte.hexdigest()[:16]}{suffixe_cache_disque()}"
+    dossier = os.path.join(os.path.dirname(os.path.abspath(fichier)), DOSSIER_CACHE)
+    return os.path.join(dossier, f"{os.path.basename(fichier)}.{cle}.feather")
+
+def cache_disque_precedent(chemin_cache):
+    """Dernier cache écrit pour le même fichier (version précédente du classeur), ou None."""
+    dossier = os.path.dirname(chemin_cache)
+    if not os.path.isdir(dossier):
+        return None
+    prefixe = os.path.basename(chemin_cache).rsplit('.', 2)[0] + '.'
+    suffixe = f"{suffixe_cache_disque()}.feather"
+    candidats = [
+        os.path.join(dossier, nom) for nom in os.listdir(dossier)
+        if nom.startswith(prefixe) and nom.endswith(suffixe) and os.path.join(dossier, nom) != chemin_cache
+    ]
+    return max(candidats, key=os.path.getmtime) if candidats else None
+
+def lire_cache_disque(chemin_cache):
+    """
+    Relit le planning enrichi depuis le cache, projeté en mémoire et sans copie (planning_depuis_arrow),
+    ou retourne None s'il est absent ou illisible.
+    """
+    if chemin_cache is None or not os.path.exists(chemin_cache):
+        return None
+    try:
+        import pyarrow.feather as feather
+        return planning_depuis_arrow(feather.read_table(chemin_cache, memory_map=True))
+    except Exception:
+        return None
+
+def planning_depuis_arrow(table):
+    """
+    Planning compact dont les colonnes pointent directement dans la table Arrow projetée en mémoire (cache
+    non compressé, en un seul bloc) : les codes des catégories et les minutes ne sont pas copiés, et les pages
+    du fichier sont partagées par toutes les sessions et tous les processus Streamlit de la machine.
+    Les tableaux sont en lecture seule : le planning partagé ne peut pas être modifié en place.
+    Les colonnes qui ne s'y prêtent pas (plusieurs blocs, autres types) sont converties normalement.
+    """
+    import pyarrow as pa
+
+    colonnes = {}
+    for nom, colonne in zip(table.column_names, table.columns):
+        tableau = colonne.chunk(0) if colonne.num_chunks == 1 else None
+        if tableau is not None and pa.types.is_dictionary(tableau.type) and tableau.null_count == 0:
+            colonnes[nom] = pd.Categorical.from_codes(
+                tableau.indices.to_numpy(zero_copy_only=True), dtype=pd.CategoricalDtype(
+                    tableau.dictionary.to_pandas(), ordered=tableau.type.ordered
+                ), validate=False
+            )
+        elif tableau is not None and nom in COLONNES_HEURES_MINUTES and pa.types.is_int16(tableau.type):
+            # Int16 : valeurs sans copie, seul le masque des heures manquantes est construit
+            valeurs = np.frombuffer(tableau.buffers()[1], dtype=np.int16, count=len(tableau), offset=tableau.offset * 2)
+            colonnes[nom] = pd.arrays.IntegerArray(valeurs, tableau.is_null().to_numpy(zero_copy_only=False))
+        elif tableau is not None and pa.types.is_integer(tableau.type) and tableau.null_count == 0:
+            colonnes[nom] = tableau.to_numpy(zero_copy_only=True)
+        else:
+            colonnes[nom] = colonne.to_pandas()
+    return pd.DataFrame(colonnes, copy=False)
+
+def ecrire_cache_disque(df, chemin_cache):
+    """Écrit le planning enrichi dans le cache et supprime les caches périmés du même fichier."""
+    try:
+        import pyarrow.feather as feather
+        dossier = os.path.dirname(chemin_cache)
+        os.makedirs(dossier, exist_ok=True)
+        prefixe = os.path.basename(chemin_cache).rsplit('.', 2)[0] + '.'
+        for ancien in os.listdir(dossier):
+            if ancien.startswith(prefixe) and ancien.endswith('.feather'):
+                try:
+                    os.remove(os.path.join(dossier, ancien))
+                except OSError:
+                    pass  # Encore projeté en mémoire par un autre processus (Windows) : supprimé à la prochaine écriture
+        # Écriture dans un fichier temporaire puis renommage : un lecteur ne voit jamais un fichier à moitié écrit.
+        # Non compressé et en un seul bloc, pour être projeté en mémoire tel quel (planning_depuis_arrow)
+        temporaire = f"{chemin_cache}.{os.getpid()}.tmp"
+        feather.write_feather(df, temporaire, compression='uncompressed', chunksize=max(len(df), 1))
+        os.replace(temporaire, chemin_cache)
+    except Exception:
+        # Le cache n'est qu'une optimisation : en cas d'échec, on recalculera au prochain démarrage
+        pass
+
+def signature_fichier(fichier):
+    """(date de modification, taille) du fichier : change à chaque enregistrement du planning."""
+    try:
+        infos = os.stat(fichier)
+        return (infos.st_mtime_ns, infos.st_size)
+    except OSError:
+        return None
+
+def construire_index_planning(df):
+    """
+    Index employé -> année -> semaine -> positions (dans l'ordre du fichier) des lignes de df.
+    Construit une seule fois par version des données ; les filtres de la page passent ensuite
+    par filtrer_planning au lieu de parcourir tout le DataFrame.
+    """
+    index = {}
+    groupes = df.groupby([COL_EMPLOYE, 'ANNEE', COL_SEMAINE], sort=False, observed=True).indices
+    for (employe, annee, semaine), positions in groupes.items():
+        index.setdefault(employe, {}).setdefault(int(annee), {})[semaine] = positions
+    return index
+
+def positions_planning(index, employe=None, annee=None, semaines=None):
+    """Positions triées des lignes correspondant aux filtres (None = pas de filtre sur ce critère)."""
+    morceaux = []
+    for nom in (index if employe is None else [employe]):
+        par_annee = index.get(nom, {})
+        for a in (par_annee if annee is None else [annee]):
+            par_semaine = par_annee.get(a, {})
+            for semaine in (par_semaine if semaines is None else semaines):
+                if semaine in par_semaine:
+                    morceaux.append(par_semaine[semaine])
+    if not morceaux:
+        return np.array([], dtype=np.intp)
+    return morceaux[0] if len(morceaux) == 1 else np.sort(np.concatenate(morceaux))
+
+def filtrer_planning(df, index, employe=None, annee=None, semaines=None):
+    """
+    Équivalent indexé de df[(employé) & (année) & (semaines)] : coût proportionnel au résultat.
+    `df` peut aussi être un planning stocké (PlanningSQLite, PlanningParAnnee) et `index` son index_planning.
+    """
+    if isinstance(df, (PlanningSQLite, PlanningParAnnee)):
+        return df.filtrer(employe, annee, semaines)
+    return df.take(positions_planning(index, employe, annee, semaines))
+
+def totaux_semaines(df):
+    """
+    Table des totaux par semaine, séparée des lignes du planning : (employé, année, semaine) -> minutes
+    de service de la semaine. Calculée une fois par version des données, comme l'index.
+    """
+    totaux = df['Durée du service'].astype('int64').groupby(
+        [df[COL_EMPLOYE], df['ANNEE'], df[COL_SEMAINE]], sort=False, observed=True
+    ).sum()
+    return {(employe, int(annee), semaine): int(minutes) for (employe, annee, semaine), minutes in totaux.items()}
+
+def semaines_travaillees(totaux, index, employe=None, annee=None):
+    """Semaines (triées) de l'année où le temps total (totaux_semaines) est positif, pour un employé ou pour tous."""
+    semaines = set()
+    for nom in (index if employe is None else [employe]):
+        for semaine in index.get(nom, {}).get(annee, {}):
+            if totaux.get((nom, annee, semaine), 0) > 0:
+                semaines.add(semaine)
+    return sorted(semaines)
+
+def annees_planning(index, employe=None):
+    """Années présentes dans le planning (pour un employé, ou pour tous si employe est None)."""
+    return sorted({a for nom in (index if employe is None else [employe]) for a in index.get(nom, {})})
+
+def totaux_hebdomadaires(df, index, employe=None, annee=None, semaines=None):
+    """
+    Total des heures nettes par employé et par semaine (même règle que calculer_heures_travaillees :
+    seules les durées de service positives comptent), trié par employé, année et semaine.
+    """
+    if isinstance(df, PlanningSQLite):
+        totaux = df.minutes_par_semaine(employe, annee, semaines)
+    else:
+        df_filtre = filtrer_planning(df, index, employe, annee, semaines)
+        durees = df_filtre['Durée du service']
+        totaux = (
+            durees.where(durees > 0)
+            .groupby([df_filtre[COL_EMPLOYE], df_filtre['ANNEE'], df_filtre[COL_SEMAINE]], observed=True)
+            .sum()
+            .rename('HEURES_NETTES')
+            .reset_index()
+        )
+    totaux['HEURES_NETTES'] = minutes_en_duree(totaux['HEURES_NETTES'])
+    totaux['TOTAL'] = [formater_duree(total).replace("min", "") for total in totaux['HEURES_NETTES']]
+    return totaux
+
+class ErreurPlanning(Exception):
+    """Fichier de planning introuvable, illisible ou incomplet (message affichable tel quel)."""
+
+def lire_planning(fichier):
+    """
+    Charge le fichier, vérifie les colonnes et calcule toutes les durées par ligne (planning compact).
+    N'utilise pas Streamlit (utilisable depuis un thread) : les problèmes de fichier lèvent ErreurPlanning.
+    """
+    if not os.path.exists(fichier):
+        raise ErreurPlanning(f"**ERREUR CRITIQUE DE FICHIER :** Le fichier '{fichier}' est introuvable. Assurez-vous qu'il est dans le même dossier que 'app.py' et que le nom est exact.")
+
+    # Cache disque : évite de relire et recalculer le classeur après un redémarrage du serveur
+    chemin_cache = chemin_cache_disque(fichier)
+    df = lire_cache_disque(chemin_cache)
+    if df is not None:
+        return df
+
+    # Lecture en flux pour les .xlsx, puis pd.read_excel et enfin CSV en cas d'échec
+    lecteurs = [pd.read_excel, lambda f: pd.read_csv(f, sep=';', encoding='latin1')]
+    if fichier.lower().endswith('.xlsx'):
+        lecteurs.insert(0, lire_xlsx_en_flux)
+
+    df = None
+    for lecteur in lecteurs:
+        try:
+            df = lecteur(fichier)
+            break
+        except Exception:
+            continue
+
+    if df is None:
+        raise ErreurPlanning(f"**ERREUR CRITIQUE DE FICHIER :** Impossible de lire le fichier '{fichier}'. Vérifiez que le fichier n'est pas déjà ouvert et que son contenu est valide (format Excel ou CSV).")
+    
+    df.columns = df.columns.str.strip()
+    colonnes_manquantes = [col for col in COLONNES_OBLIGATOIRES if col not in df.columns]
+    
+    if colonnes_manquantes:
+        raise ErreurPlanning(f"**ERREUR DE DONNÉES : Colonnes manquantes.** Votre fichier doit contenir : {', '.join(COLONNES_OBLIGATOIRES)}. Manque : {', '.join(colonnes_manquantes)}")
+        
+    df = nettoyer_planning(df)
+
+    # Rechargement incrémental : si une version précédente du classeur est en cache,
+    # seules les semaines modifiées sont recalculées
+    df_precedent = lire_cache_disque(cache_disque_precedent(chemin_cache))
+    if df_precedent is not None:
+        df = mettre_a_jour_planning(df_precedent, df)
+    else:
+        df = enrichir_planning(df)
+
+    ecrire_cache_disque(df, chemin_cache)
+    # Relu depuis le cache projeté en mémoire : le processus partage alors les pages du fichier avec les autres
+    df_partage = lire_cache_disque(chemin_cache)
+    return df if df_partage is None else df_partage
+
+def fichiers_planning(source):
+    """
+    Classeurs désignés par `source` : un fichier, un dossier (ses fichiers EXTENSIONS_PLANNING) ou un motif glob
+    (ex. 'plannings/RePlannings*.xlsx'), triés par chemin. Un fichier seul est retourné même s'il n'existe pas
+    (lire_planning signale l'erreur) ; les fichiers de verrouillage d'Excel (~$...) sont ignorés.
+    """
+    if os.path.isdir(source):
+        fichiers = [os.path.join(source, nom) for nom in os.listdir(source) if nom.lower().endswith(EXTENSIONS_PLANNING)]
+    elif any(caractere in source for caractere in '*?['):
+        fichiers = glob.glob(source)
+    else:
+        return [source]
+    return sorted(f for f in fichiers if os.path.isfile(f) and not os.path.basename(f).startswith('~$'))
+
+def signature_source(source):
+    """Signatures (signature_fichier) des classeurs de la source : change dès qu'un classeur est modifié, ajouté ou retiré."""
+    return tuple((fichier, signature_fichier(fichier)) for fichier in fichiers_planning(source))
+
+def marquer_source(df, fichier):
+    """Ajoute la colonne COL_SOURCE (nom du classeur d'origine, en catégorie) sans copier les autres colonnes."""
+    source = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[os.path.basename(fichier)])
+    return df.assign(**{COL_SOURCE: source})
+
+def chemin_cache_combine(source, chemins_caches):
+    """
+    Chemin du cache Feather du planning combiné de plusieurs classeurs, à côté du premier : le nom dépend de la
+    source (un cache par dossier ou motif, l'ancien est remplacé) et des caches des classeurs (donc de leur contenu).
+    """
+    empreinte_source = hashlib.sha256(os.path.abspath(source).encode()).hexdigest()[:8]
+    empreinte = hashlib.sha256('\n'.join(os.path.basename(c) for c in chemins_caches).encode()).hexdigest()[:16]
+    dossier = os.path.dirname(chemins_caches[0])
+    return os.path.join(dossier, f"plannings-{empreinte_source}.{empreinte}{suffixe_cache_disque()}.feather")
+
+def lire_plannings(source, nb_processus=None):
+    """
+    Planning compact d'un ou plusieurs classeurs (fichiers_planning), chaque ligne marquée de son classeur
+    (COL_SOURCE). Les classeurs sans cache disque sont lus et enrichis en parallèle (lire_planning, un processus
+    par classeur, au plus `nb_processus`, par défaut un par cœur) ; les autres sont relus depuis leur cache.
+    Le planning combiné (combiner_plannings) est lui-même mis en cache disque.
+    """
+    fichiers = fichiers_planning(source)
+    if not fichiers:
+        raise ErreurPlanning(f"**ERREUR CRITIQUE DE FICHIER :** Aucun classeur de planning trouvé pour '{source}'.")
+    if len(fichiers) == 1:
+        return marquer_source(lire_planning(fichiers[0]), fichiers[0])
+
+    chemins_caches = [chemin_cache_disque(fichier) for fichier in fichiers]
+    chemin_combine = chemin_cache_combine(source, chemins_caches)
+    df = lire_cache_disque(chemin_combine)
+    if df is not None:
+        return df
+
+    plannings = [lire_cache_disque(chemin) for chemin in chemins_caches]
+    a_lire = [i for i, planning in enumerate(plannings) if planning is None]
+    for i, df in zip(a_lire, lire_en_parallele([fichiers[i] for i in a_lire], nb_processus)):
+        plannings[i] = df
+    df = combiner_plannings(plannings, fichiers)
+
+    ecrire_cache_disque(df, chemin_combine)
+    df_partage = lire_cache_disque(chemin_combine)
+    return df if df_partage is None else df_partage
+
+def executer_en_processus(fonction, *args):
+    """
+    fonction(*args) dans un nouveau processus Python, lancé par le script neutre SCRIPT_PROCESSUS : il ne
+    reprend pas l'état du serveur (threads de surveillance, verrous) et, contrairement aux processus 'spawn'
+    de multiprocessing, ne réexécute pas le module __main__ du parent (app.py sous Streamlit). `fonction` doit
+    être importable (fonction d'un module) ; ses arguments et son résultat passent par pickle, et une exception
+    qu'elle lève est relevée ici.
+    """
+    processus = subprocess.run(
+        [sys.executable, SCRIPT_PROCESSUS], input=pickle.dumps((fonction, args), protocol=pickle.HIGHEST_PROTOCOL),
+        stdout=subprocess.PIPE
+    )
+    if processus.returncode != 0 or not processus.stdout:
+        raise RuntimeError(f"Processus de travail interrompu (code {processus.returncode}) pendant {fonction.__name__}.")
+    reussi, resultat = pickle.loads(processus.stdout)
+    if not reussi:
+        raise resultat
+    return resultat
+
+def lire_en_parallele(fichiers, nb_processus=None):
+    """lire_planning de chaque fichier, dans un processus par fichier s'il y en a plusieurs (dans l'ordre de `fichiers`)."""
+    nb_processus = min(len(fichiers), nb_processus or os.cpu_count() or 1)
+    if nb_processus <= 1:
+        return [lire_planning(fichier) for fichier in fichiers]
+    # Un thread par processus de lecture en cours : il attend son processus sans tenir le GIL
+    with ThreadPoolExecutor(nb_processus) as pool:
+        return list(pool.map(lambda fichier: executer_en_processus(lire_planning, fichier), fichiers))
+
+def combiner_plannings(plannings, fichiers):
+    """
+    Concatène les plannings de plusieurs classeurs (dans l'ordre de `fichiers`) en un planning compact.
+    Conflits : une même semaine d'un employé (employé, ANNEE, SEMAINE) présente dans plusieurs classeurs est
+    prise en entier dans le dernier d'entre eux, dans l'ordre des chemins (fichiers_planning), les autres
+    versions sont écartées et signalées dans le journal. Le résultat ne dépend donc ni de l'ordre de fin des
+    lectures ni des dates de modification des fichiers.
+    """
+    rangs = np.repeat(np.arange(len(plannings)), [len(df) for df in plannings])
+    df = pd.concat(
+        [marquer_source(df, fichier) for df, fichier in zip(plannings, fichiers)], ignore_index=True
+    )
+    par_semaine = pd.Series(rangs).groupby([df[COL_EMPLOYE], df['ANNEE'], df[COL_SEMAINE]], sort=False, observed=True)
+    retenus = par_semaine.transform('max').to_numpy()
+    en_conflit = par_semaine.transform('min').to_numpy() != retenus
+    if en_conflit.any():
+        conflits = df.loc[en_conflit & (rangs == retenus), [COL_EMPLOYE, 'ANNEE', COL_SEMAINE, COL_SOURCE]].drop_duplicates()
+        exemples = ", ".join(
+            f"{employe} {semaine} {annee} ({source})"
+            for employe, annee, semaine, source in conflits.head(20).itertuples(index=False)
+        )
+        journal.warning(
+            "%d semaine(s) d'employé présentes dans plusieurs classeurs, seule celle du dernier classeur est gardée : %s",
+            len(conflits), exemples
+        )
+    return compacter_planning(df[rangs == retenus])
+
+# --- Stockage SQLite (STOCKAGE_SQLITE) ---
+
+def _identifiant_sql(nom):
+    """Nom de colonne entre guillemets pour SQLite (les en-têtes du classeur contiennent des espaces et des accents)."""
+    return '"' + nom.replace('"', '""') + '"'
+
+def _type_colonne_sqlite(serie):
+    """(type, catégories) d'une colonne du planning compact : 'category', 'date' (catégories de dates) ou son dtype."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categories = serie.cat.categories
+        if pd.api.types.is_datetime64_any_dtype(categories):
+            return 'date', list(categories.strftime('%Y-%m-%d'))
+        return 'category', list(categories)
+    return str(serie.dtype), None
+
+def _valeurs_sqlite(serie, type_colonne):
+    """
+    Valeurs Python (None pour les cases vides) d'une colonne du planning compact, à insérer dans la base : les
+    catégories sont stockées par leur code (comme dans le cache Feather), la liste des catégories dans la table colonnes.
+    """
+    if type_colonne in ('category', 'date'):
+        codes = serie.cat.codes.to_numpy()
+        valeurs = codes.astype(object)
+        valeurs[codes < 0] = None
+        return valeurs.tolist()
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+def chemin_stockage(source, extension):
+    """
+    Chemin du stockage (base SQLite, dossier des partitions par année) du planning de `source`, nommé comme son
+    cache combiné (chemin_cache_combine) avec l'extension `extension`.
+    """
+    fichiers = fichiers_planning(source)
+    if not fichiers:
+        raise ErreurPlanning(f"**ERREUR CRITIQUE DE FICHIER :** Aucun classeur de planning trouvé pour '{source}'.")
+    for fichier in fichiers:
+        if not os.path.exists(fichier):
+            raise ErreurPlanning(f"**ERREUR CRITIQUE DE FICHIER :** Le fichier '{fichier}' est introuvable. Assurez-vous qu'il est dans le même dossier que 'app.py' et que le nom est exact.")
+    chemin = chemin_cache_combine(source, [chemin_cache_disque(fichier) for fichier in fichiers])
+    return chemin[:-len('.feather')] + extension
+
+def remplacer_stockage(temporaire, chemin):
+    """Renomme le stockage `temporaire` en `chemin` et supprime les anciens stockages de la même source."""
+    prefixe = os.path.basename(chemin).rsplit('.', 2)[0] + '.'
+    extension = os.path.splitext(chemin)[1]
+    dossier = os.path.dirname(chemin)
+    for ancien in os.listdir(dossier):
+        if ancien.startswith(prefixe) and ancien.endswith(extension):
+            try:
+                if os.path.isdir(os.path.join(dossier, ancien)):
+                    shutil.rmtree(os.path.join(dossier, ancien))
+                else:
+                    os.remove(os.path.join(dossier, ancien))
+            except OSError:
+                pass  # Encore ouvert par un autre processus (Windows) : supprimé à la prochaine création
+    os.replace(temporaire, chemin)
+
+def preparer_stockage(df):
+    """
+    Prépare un planning compact pour les stockages SQLite et par année : (planning trié par ANNEE, employé et
+    semaine, où les lignes d'une semaine d'un employé sont contiguës et dans l'ordre du fichier ; semaines ;
+    anomalies). semaines : (employé, année, semaine, position de début, position de fin dans le planning trié,
+    total de totaux_semaines) ; anomalies : (employé, année, semaine, type, jours en JSON), d'après table_anomalies.
+    """
+    ordre = np.lexsort((
+        pd.factorize(df[COL_SEMAINE], sort=True)[0], pd.factorize(df[COL_EMPLOYE], sort=True)[0], df['ANNEE'].to_numpy()
+    ))
+    df = df.take(ordre).reset_index(drop=True)
+    totaux = totaux_semaines(df)
+    semaines = [
+        (employe, int(annee), semaine, int(positions[0]), int(positions[-1]) + 1, totaux[(employe, int(annee), semaine)])
+        for (employe, annee, semaine), positions in df.groupby(
+            [COL_EMPLOYE, 'ANNEE', COL_SEMAINE], sort=False, observed=True
+        ).indices.items()
+    ]
+    anomalies = [
+        (employe, annee, semaine, type_anomalie, json.dumps(jours))
+        for (employe, annee, semaine), par_type in table_anomalies(df).items()
+        for type_anomalie, jours in par_type.items()
+    ]
+    return df, semaines, anomalies
+
+def lire_semaines_stockage(semaines, anomalies):
+    """
+    (index, totaux, anomalies, nombre de lignes) d'un stockage, d'après ses tables semaines et anomalies
+    (preparer_stockage) : l'index donne pour chaque semaine d'un employé les positions de ses lignes (range).
+    """
+    index, totaux, nb_lignes = {}, {}, 0
+    for employe, annee, semaine, debut, fin, total in semaines:
+        index.setdefault(employe, {}).setdefault(annee, {})[semaine] = range(debut, fin)
+        totaux[(employe, annee, semaine)] = total
+        nb_lignes = max(nb_lignes, fin)
+    table = {}
+    for employe, annee, semaine, type_anomalie, jours in anomalies:
+        table.setdefault((employe, annee, semaine), {})[type_anomalie] = tuple(json.loads(jours))
+    return index, totaux, table, nb_lignes
+
+def creer_base_sqlite(source, chemin):
+    """
+    Crée la base SQLite du planning compact de `source` (lire_plannings) :
+    - table planning, dans l'ordre de preparer_stockage, avec un index sur (employé, ANNEE, SEMAINE) et un sur
+      DATE ; les colonnes en catégories (textes, DATE) y sont stockées par leur code ;
+    - table colonnes : type et catégories de chaque colonne, pour reconstruire le planning compact ;
+    - tables semaines et anomalies (preparer_stockage), calculées ici une fois pour toutes.
+    Écrite dans un fichier temporaire puis renommée ; les anciennes bases de la même source sont supprimées.
+    """
+    df, semaines, anomalies = preparer_stockage(lire_plannings(source))
+    types = {col: _type_colonne_sqlite(df[col]) for col in df.columns}
+
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    if os.path.exists(temporaire):
+        os.remove(temporaire)
+    cnx = sqlite3.connect(temporaire)
+    try:
+        # Pas de journal : un échec laisse un fichier temporaire, jamais une base incomplète
+        cnx.execute("PRAGMA journal_mode = OFF")
+        cnx.execute("PRAGMA synchronous = OFF")
+        cnx.execute("CREATE TABLE planning ({})".format(', '.join(
+            f"{_identifiant_sql(col)} {'REAL' if type_colonne.startswith('float') else 'INTEGER'}"
+            for col, (type_colonne, _) in types.items()
+        )))
+        cnx.execute("CREATE TABLE colonnes (nom TEXT, type TEXT, categories TEXT)")
+        cnx.executemany("INSERT INTO colonnes VALUES (?, ?, ?)", [
+            (col, type_colonne, json.dumps(categories)) for col, (type_colonne, categories) in types.items()
+        ])
+
+        insertion = f"INSERT INTO planning VALUES ({', '.join('?' * len(types))})"
+        for debut in range(0, len(df), TAILLE_LOT_SQLITE):
+            lot = df.iloc[debut:debut + TAILLE_LOT_SQLITE]
+            cnx.executemany(insertion, zip(*(_valeurs_sqlite(lot[col], types[col][0]) for col in df.columns)))
+        cnx.execute(
+            f"CREATE INDEX planning_semaine ON planning ({_identifiant_sql(COL_EMPLOYE)}, ANNEE, {_identifiant_sql(COL_SEMAINE)})"
+        )
+        cnx.execute("CREATE INDEX planning_date ON planning (DATE)")
+
+        cnx.execute("CREATE TABLE semaines (employe TEXT, annee INTEGER, semaine TEXT, debut INTEGER, fin INTEGER, total INTEGER)")
+        cnx.executemany("INSERT INTO semaines VALUES (?, ?, ?, ?, ?, ?)", semaines)
+        cnx.execute("CREATE TABLE anomalies (employe TEXT, annee INTEGER, semaine TEXT, type TEXT, jours TEXT)")
+        cnx.executemany("INSERT INTO anomalies VALUES (?, ?, ?, ?, ?)", anomalies)
+        cnx.commit()
+    finally:
+        cnx.close()
+    remplacer_stockage(temporaire, chemin)
+
+def ouvrir_planning_sqlite(source):
+    """
+    PlanningSQLite de `source`, après création de sa base si les classeurs ont changé (creer_base_sqlite). La base
+    est créée dans un processus à part (executer_en_processus) : le planning complet n'est jamais chargé dans le
+    processus du serveur, et la mémoire utilisée pour la créer est rendue au système à la fin.
+    """
+    chemin = chemin_stockage(source, '.sqlite')
+    if not os.path.exists(chemin):
+        executer_en_processus(creer_base_sqlite, source, chemin)
+    return PlanningSQLite(chemin)
+
+class PlanningSQLite:
+    """
+    Planning compact stocké dans une base SQLite (creer_base_sqlite), accepté à la place du DataFrame par
+    filtrer_planning, totaux_hebdomadaires et les exports. Seuls le schéma, l'index (positions des semaines dans
+    la table, sous forme de range), les totaux par semaine et les anomalies sont gardés en mémoire : chaque
+    filtre est une requête sur l'index (employé, ANNEE, SEMAINE), dont le coût dépend du résultat.
+    Les connexions, en lecture seule, sont réutilisées d'une requête à l'autre (une par thread actif).
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._uri = f"{pathlib.Path(chemin).absolute().as_uri()}?mode=ro"
+        self._connexions = queue.SimpleQueue()
+        with self._connexion() as cnx:
+            self._colonnes = [
+                (nom, type_colonne, json.loads(categories))
+                for nom, type_colonne, categories in cnx.execute("SELECT nom, type, categories FROM colonnes ORDER BY rowid")
+            ]
+            self.index_planning, self.totaux, self.anomalies, self.nb_lignes = lire_semaines_stockage(
+                cnx.execute("SELECT employe, annee, semaine, debut, fin, total FROM semaines ORDER BY debut"),
+                cnx.execute("SELECT employe, annee, semaine, type, jours FROM anomalies ORDER BY rowid"),
+            )
+        self._dtypes = {
+            nom: pd.CategoricalDtype(pd.to_datetime(categories) if type_colonne == 'date' else categories)
+            if type_colonne in ('category', 'date') else type_colonne
+            for nom, type_colonne, categories in self._colonnes
+        }
+        self._codes = {
+            nom: {valeur: code for code, valeur in enumerate(categories)}
+            for nom, type_colonne, categories in self._colonnes if type_colonne == 'category'
+        }
+
+    def __len__(self):
+        return self.nb_lignes
+
+    @contextmanager
+    def _connexion(self):
+        try:
+            cnx = self._connexions.get_nowait()
+        except queue.Empty:
+            cnx = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        try:
+            yield cnx
+        finally:
+            self._connexions.put(cnx)
+
+    def _conditions(self, employe, annee, semaines):
+        """
+        Clause WHERE (et ses paramètres) des filtres, toujours sur le début de l'index (employé, ANNEE). Employés et
+        semaines sont cherchés par leur code (-1, qui n'est jamais stocké, pour une valeur inconnue).
+        """
+        employes = list(self.index_planning) if employe is None else [employe]
+        annees = annees_planning(self.index_planning, employe) if annee is None else [int(annee)]
+        conditions = [
+            f"{_identifiant_sql(COL_EMPLOYE)} IN ({', '.join('?' * len(employes))})",
+            f"ANNEE IN ({', '.join('?' * len(annees))})",
+        ]
+        parametres = [self._codes[COL_EMPLOYE].get(nom, -1) for nom in employes] + annees
+        if semaines is not None:
+            conditions.append(f"{_identifiant_sql(COL_SEMAINE)} IN ({', '.join('?' * len(semaines))})")
+            parametres += [self._codes[COL_SEMAINE].get(semaine, -1) for semaine in semaines]
+        return ' AND '.join(conditions), parametres
+
+    def filtrer(self, employe=None, annee=None, semaines=None):
+        """Équivalent de filtrer_planning : lignes (planning compact, indexé par leur position dans la table) en ordre de table."""
+        conditions, parametres = self._conditions(employe, annee, semaines)
+        colonnes = ', '.join(
+            f"IFNULL({_identifiant_sql(nom)}, -1)" if type_colonne in ('category', 'date') else _identifiant_sql(nom)
+            for nom, type_colonne, _ in self._colonnes
+        )
+        with self._connexion() as cnx:
+            lignes = cnx.execute(
+                f"SELECT rowid - 1, {colonnes} FROM planning WHERE {conditions} ORDER BY rowid", parametres
+            ).fetchall()
+        valeurs = list(zip(*lignes)) if lignes else [()] * (len(self._colonnes) + 1)
+        donnees = {}
+        for (nom, type_colonne, _), colonne in zip(self._colonnes, valeurs[1:]):
+            if type_colonne in ('category', 'date'):
+                donnees[nom] = pd.Categorical.from_codes(np.array(colonne, dtype=np.int32), dtype=self._dtypes[nom])
+            else:
+                donnees[nom] = pd.array(list(colonne), dtype=self._dtypes[nom])
+        return pd.DataFrame(donnees, index=pd.Index(valeurs[0], dtype=np.intp))
+
+    def minutes_par_semaine(self, employe=None, annee=None, semaines=None):
+        """Minutes de service positives par employé, année et semaine (filtres de filtrer), triées, pour totaux_hebdomadaires."""
+        conditions, parametres = self._conditions(employe, annee, semaines)
+        cles = ', '.join([_identifiant_sql(COL_EMPLOYE), 'ANNEE', _identifiant_sql(COL_SEMAINE)])
+        service = _identifiant_sql('Durée du service')
+        with self._connexion() as cnx:
+            lignes = cnx.execute(
+                f"SELECT {cles}, SUM(CASE WHEN {service} > 0 THEN {service} ELSE 0 END) FROM planning "
+                f"WHERE {conditions} GROUP BY {cles} ORDER BY {cles}", parametres
+            ).fetchall()
+        totaux = pd.DataFrame(lignes, columns=[COL_EMPLOYE, 'ANNEE', COL_SEMAINE, 'HEURES_NETTES'])
+        for col in (COL_EMPLOYE, COL_SEMAINE):
+            totaux[col] = self._dtypes[col].categories.to_numpy()[totaux[col].to_numpy(dtype=np.intp)]
+        return totaux
+
+def creer_partitions_annees(source, dossier):
+    """
+    Crée le dossier des partitions par ANNEE du planning compact de `source` (lire_plannings). Pour chaque année :
+    un cache Feather (lignes dans l'ordre de preparer_stockage, lisibles par lire_cache_disque) et un fichier
+    JSON de ses semaines et anomalies (preparer_stockage). En plus : schema.feather (première ligne, pour les
+    types et catégories du planning vide) et metadonnees.json (nombre de lignes, position de la première ligne
+    et employés de chaque année). Écrit dans un dossier temporaire puis renommé ; les anciens dossiers de la
+    même source sont supprimés.
+    """
+    import pyarrow.feather as feather
+
+    df, semaines, anomalies = preparer_stockage(lire_plannings(source))
+    temporaire = f"{dossier}.{os.getpid()}.tmp"
+    shutil.rmtree(temporaire, ignore_errors=True)
+    os.makedirs(temporaire)
+
+    debuts, employes = {}, {}
+    for annee, positions in df.groupby('ANNEE', sort=True).indices.items():
+        annee = int(annee)
+        debuts[annee] = int(positions[0])
+        partition = df.iloc[positions[0]:positions[-1] + 1].reset_index(drop=True)
+        feather.write_feather(partition, os.path.join(temporaire, f"{annee}.feather"),
+                              compression='uncompressed', chunksize=max(len(partition), 1))
+        semaines_annee = [ligne for ligne in semaines if ligne[1] == annee]
+        employes[annee] = sorted({ligne[0] for ligne in semaines_annee})
+        with open(os.path.join(temporaire, f"{annee}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'semaines': semaines_annee, 'anomalies': [ligne for ligne in anomalies if ligne[1] == annee]}, f)
+    # Un planning Arrow sans ligne perd les catégories : le schéma est gardé avec une ligne
+    feather.write_feather(df.iloc[:1], os.path.join(temporaire, "schema.feather"), compression='uncompressed')
+    with open(os.path.join(temporaire, "metadonnees.json"), 'w', encoding='utf-8') as f:
+        json.dump({'nb_lignes': len(df), 'annees': debuts, 'employes': employes}, f)
+    remplacer_stockage(temporaire, dossier)
+
+def ouvrir_planning_annees(source):
+    """
+    PlanningParAnnee de `source`, après création de ses partitions si les classeurs ont changé
+    (creer_partitions_annees, dans un processus à part comme pour ouvrir_planning_sqlite).
+    """
+    dossier = chemin_stockage(source, '.annees')
+    if not os.path.isdir(dossier):
+        executer_en_processus(creer_partitions_annees, source, dossier)
+    return PlanningParAnnee(dossier)
+
+class _AnneesEmploye(Mapping):
+    """Années d'un employé dans un PlanningParAnnee (index_planning) : année -> semaine -> positions, lues au premier accès."""
+
+    def __init__(self, planning, employe, annees):
+        self._planning, self._employe, self._annees = planning, employe, annees
+
+    def __getitem__(self, annee):
+        if annee not in self._annees:
+            raise KeyError(annee)
+        return self._planning.metadonnees_annee(annee)[0].get(self._employe, {}).get(annee, {})
+
+    def __iter__(self):
+        return iter(self._annees)
+
+    def __len__(self):
+        return len(self._annees)
+
+class _TableParAnnee(Mapping):
+    """Totaux ou anomalies d'un PlanningParAnnee : (employé, année, semaine) -> valeur, lus par année au premier accès."""
+
+    def __init__(self, planning, rang):
+        self._planning, self._rang = planning, rang
+
+    def __getitem__(self, cle):
+        if cle[1] not in self._planning._debuts:
+            raise KeyError(cle)
+        return self._planning.metadonnees_annee(cle[1])[self._rang][cle]
+
+    def __iter__(self):
+        for annee in self._planning._debuts:
+            yield from self._planning.metadonnees_annee(annee)[self._rang]
+
+    def __len__(self):
+        return sum(len(self._planning.metadonnees_annee(annee)[self._rang]) for annee in self._planning._debuts)
+
+class PlanningParAnnee:
+    """
+    Planning compact partitionné par ANNEE (creer_partitions_annees), accepté à la place du DataFrame par
+    filtrer_planning (et donc les exports et totaux_hebdomadaires). À l'ouverture, seules les années et leurs
+    employés sont lus : index_planning, totaux et anomalies lisent les semaines, totaux et anomalies d'une année
+    au premier accès (gardés ensuite, ils sont petits devant les lignes), et les lignes d'une année sont chargées
+    (cache Feather projeté en mémoire) au premier filtre qui la concerne. Au plus `taille_cache` années de lignes
+    restent chargées : la moins récemment consultée est libérée pour faire place à une nouvelle.
+    """
+
+    def __init__(self, dossier, taille_cache=TAILLE_CACHE_ANNEES):
+        self.dossier = dossier
+        self.taille_cache = taille_cache
+        with open(os.path.join(dossier, "metadonnees.json"), encoding='utf-8') as f:
+            metadonnees = json.load(f)
+        self.nb_lignes = metadonnees['nb_lignes']
+        self._debuts = {int(annee): debut for annee, debut in metadonnees['annees'].items()}
+        annees_employes = {}
+        for annee, employes in metadonnees['employes'].items():
+            for employe in employes:
+                annees_employes.setdefault(employe, []).append(int(annee))
+        self.index_planning = {
+            employe: _AnneesEmploye(self, employe, annees) for employe, annees in annees_employes.items()
+        }
+        self.totaux = _TableParAnnee(self, 1)
+        self.anomalies = _TableParAnnee(self, 2)
+        self._vide = lire_cache_disque(os.path.join(dossier, "schema.feather")).iloc[:0]
+        self._metadonnees = {}
+        self._annees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def __len__(self):
+        return self.nb_lignes
+
+    def annees_chargees(self):
+        """Années dont les lignes sont actuellement en mémoire, de la moins à la plus récemment consultée."""
+        with self._verrou:
+            return list(self._annees)
+
+    def metadonnees_annee(self, annee):
+        """(index, totaux, anomalies) de l'année (lire_semaines_stockage), lus au premier accès."""
+        with self._verrou:
+            metadonnees = self._metadonnees.get(annee)
+            if metadonnees is None:
+                with open(os.path.join(self.dossier, f"{annee}.json"), encoding='utf-8') as f:
+                    contenu = json.load(f)
+                metadonnees = lire_semaines_stockage(contenu['semaines'], contenu['anomalies'])[:3]
+                self._metadonnees[annee] = metadonnees
+            return metadonnees
+
+    def annee(self, annee):
+        """Lignes de l'année (planning compact, positions locales à l'année), chargées au premier accès."""
+        with self._verrou:
+            df = self._annees.get(annee)
+            if df is None:
+                df = lire_cache_disque(os.path.join(self.dossier, f"{annee}.feather"))
+                if df is None:
+                    raise ErreurPlanning(f"**ERREUR DE DONNÉES :** Partition {annee} du planning illisible ({self.dossier}).")
+                self._annees[annee] = df
+                while len(self._annees) > self.taille_cache:
+                    self._annees.popitem(last=False)
+            else:
+                self._annees.move_to_end(annee)
+            return df
+
+    def filtrer(self, employe=None, annee=None, semaines=None):
+        """
+        Équivalent de filtrer_planning : lignes indexées par leur position dans le planning trié (uniques d'une
+        année à l'autre, comme les rowid de PlanningSQLite). Seules les années qui ont des lignes sélectionnées sont chargées.
+        """
+        morceaux = []
+        for a in (annees_planning(self.index_planning, employe) if annee is None else [int(annee)]):
+            positions = np.asarray(positions_planning(self.index_planning, employe, a, semaines), dtype=np.intp)
+            if len(positions) > 0:
+                morceaux.append(self.annee(a).take(positions - self._debuts[a]).set_axis(positions))
+        if not morceaux:
+            return self._vide
+        return morceaux[0] if len(morceaux) == 1 else pd.concat(morceaux)
+
+# Ouverture des plannings stockés, par type de stockage (hors STOCKAGE_MEMOIRE)
+OUVERTURE_STOCKAGES = {STOCKAGE_SQLITE: ouvrir_planning_sqlite, STOCKAGE_ANNEES: ouvrir_planning_annees}
+
+# Version complète du planning servie aux pages : DataFrame enrichi (ou PlanningSQLite), index (construire_index_planning),
+# version des données (signature_source des classeurs dont ils proviennent), anomalies (table_anomalies)
+# et totaux par semaine (totaux_semaines)
+InstantanePlanning = namedtuple('InstantanePlanning', ['df', 'index', 'version', 'anomalies', 'totaux'])
+
+class PlanningEnDirect:
+    """
+    Planning enrichi tenu à jour en arrière-plan : un thread surveille le fichier, le dossier ou le motif de
+    classeurs (lire_plannings, par scrutation de signature_source) et reconstruit les données hors des requêtes des utilisateurs. Le nouveau
+    DataFrame remplace l'ancien d'un seul coup, une fois entièrement calculé ; en cas d'échec de
+    lecture (fichier en cours d'enregistrement...), l'ancienne version reste servie.
+    Le DataFrame est partagé entre toutes les sessions : il ne doit jamais être modifié en place.
+    Avec `stockage` = STOCKAGE_SQLITE ou STOCKAGE_ANNEES, le planning servi est un PlanningSQLite
+    (ouvrir_planning_sqlite) ou un PlanningParAnnee (ouvrir_planning_annees) à la place du DataFrame : index,
+    anomalies et totaux viennent alors du stockage.
+    """
+
+    def __init__(self, fichier, intervalle=INTERVALLE_SURVEILLANCE, stockage=STOCKAGE_MEMOIRE):
+        self.fichier = fichier
+        self.intervalle = intervalle
+        self.stockage = stockage
+        self._verrou = threading.Lock()
+        self._instantane = InstantanePlanning(None, None, None, None, None)
+        self._signature = None
+        self._signature_en_echec = None
+        self.derniere_actualisation = None
+        self.duree_reconstruction = None
+        self.derniere_erreur = None
+
+        # Premier chargement synchrone, puis surveillance en tâche de fond
+        self.actualiser()
+        threading.Thread(target=self._surveiller, name=f"surveillance-{os.path.basename(fichier)}", daemon=True).start()
+
+    def instantane(self):
+        """
+        Dernière version complète du planning (InstantanePlanning), ou des None si aucun
+        chargement n'a encore réussi. Le DataFrame et les tables qui en dérivent sont toujours cohérents entre eux.
+        """
+        return self._instantane
+
+    def actualiser(self):
+        """Reconstruit le planning si le fichier a changé depuis le dernier chargement (ou le dernier échec)."""
+        with self._verrou:
+            signature = signature_source(self.fichier)
+            if self._instantane.df is not None and signature in (self._signature, self._signature_en_echec):
+                return
+            debut = perf_counter()
+            try:
+                if self.stockage == STOCKAGE_MEMOIRE:
+                    df = lire_plannings(self.fichier)
+                    index = construire_index_planning(df)
+                    anomalies = table_anomalies(df)
+                    totaux = totaux_semaines(df)
+                else:
+                    df = OUVERTURE_STOCKAGES[self.stockage](self.fichier)
+                    index, anomalies, totaux = df.index_planning, df.anomalies, df.totaux
+                if self.stockage != STOCKAGE_ANNEES:
+                    # Par année : les semaines d'une année ne sont connues qu'à son premier accès
+                    precharger_infos_semaines(index)
+            except Exception as e:
+                self._signature_en_echec = signature
+                self.derniere_erreur = str(e)
+                return
+            self._instantane, self._signature = InstantanePlanning(df, index, signature, anomalies, totaux), signature
+            self._signature_en_echec = None
+            self.derniere_erreur = None
+            self.duree_reconstruction = perf_counter() - debut
+            self.derniere_actualisation = datetime.now()
+
+    def _surveiller(self):
+        while True:
+            sleep(self.intervalle)
+            self.actualiser()
+
+# Préchauffages en cours ou terminés (un par fichier, stockage et processus), voir prechauffer
+_prechauffages = {}
+_verrou_prechauffages = threading.Lock()
+
+def prechauffer(fichier, stockage=STOCKAGE_MEMOIRE):
+    """
+    Lance, une seule fois par processus, la création de PlanningEnDirect(fichier, stockage=stockage) dans un thread (lecture,
+    enrichissement, index et table des semaines) et retourne son Future : future.done() indique que le
+    planning est prêt. Appelé au démarrage du serveur (serveur.py), avant toute session, puis par
+    l'application qui récupère ainsi la même instance. Un préchauffage en échec est relancé au prochain appel.
+    """
+    with _verrou_prechauffages:
+        future = _prechauffages.get((fichier, stockage))
+        if future is None or (future.done() and future.exception() is not None):
+            future = Future()
+            _prechauffages[(fichier, stockage)] = future
+            threading.Thread(
+                target=_prechauffer, args=(fichier, stockage, future),
+                name=f"prechauffage-{os.path.basename(fichier)}", daemon=True
+            ).start()
+        return future
+
+def _prechauffer(fichier, stockage, future):
+    debut = perf_counter()
+    journal.info("Préchauffage du planning %s...", fichier)
+    try:
+        planning = PlanningEnDirect(fichier, stockage=stockage)
+    except Exception as e:
+        journal.exception("Échec du préchauffage du planning %s", fichier)
+        future.set_exception(e)
+        return
+    if planning.derniere_erreur:
+        journal.warning("Planning %s illisible : %s", fichier, planning.derniere_erreur)
+    else:
+        journal.info(
+            "Planning %s prêt en %.2f s (%d lignes, dont %.2f s de lecture et calculs)",
+            fichier, perf_counter() - debut, len(planning.instantane().df), planning.duree_reconstruction
+        )
+    future.set_result(planning)
+
+def preparer_planning(df):
+    """Nettoie un planning brut (colonnes déjà vérifiées) et calcule les durées par ligne (planning compact)."""
+    return enrichir_planning(nettoyer_planning(df))
+
+def nettoyer_planning(df):
+    """Nettoyage du texte (espaces, majuscules) et suppression des lignes vides."""
+    for col in df.columns:
+        if df[col].dtype == 'object' or df[col].dtype.name == 'category':
+            df[col] = df[col].astype(str).str.strip()
+            
+    df = df.dropna(how='all')
+    df[COL_JOUR] = df[COL_JOUR].astype(str).str.upper()
+    df[COL_SEMAINE] = df[COL_SEMAINE].astype(str).str.upper()
+    return df
+
+def enrichir_planning(df):
+    """Calcule les durées par ligne d'un planning nettoyé et retourne sa représentation compacte."""
+    # --- CALCULS DE DURÉE PAR LIGNE (Pour le calendrier et le tableau) ---
+    df['Duree_Debut'] = convertir_colonne_heures(df[COL_DEBUT])
+    df['Duree_Fin'] = convertir_colonne_heures(df[COL_FIN])
+    
+    # Calculs vectorisés (colonnes entières) : ANNEE, Duree_Brute, Durée du service, Statut, DATE
+    df = enrichir_colonnes_vectorise(df)
+    # -----------------------------------------------------------------------------------
+
+    return compacter_planning(df)
+
+def _codes_partitions(df_precedent, df):
+    """Code entier de la partition (employé, semaine) de chaque ligne, commun aux deux plannings."""
+    codes_employe, employes = pd.factorize(pd.concat([df_precedent[COL_EMPLOYE], df[COL_EMPLOYE]], ignore_index=True))
+    codes_semaine, semaines = pd.factorize(pd.concat([df_precedent[COL_SEMAINE], df[COL_SEMAINE]], ignore_index=True))
+    codes = codes_employe.astype('int64') * len(semaines) + codes_semaine
+    return codes[:len(df_precedent)], codes[len(df_precedent):], len(employes) * len(semaines)
+
+def signatures_partitions(df, colonnes, codes, nb_partitions):
+    """
+    Empreinte du contenu de chaque partition : somme des empreintes de ligne pondérées par leur rang
+    dans la partition (sensible à l'ordre des lignes). Retourne aussi l'ordre de tri stable par partition.
+    """
+    empreintes = pd.util.hash_pandas_object(df[colonnes], index=False).to_numpy()
+    ordre = np.argsort(codes, kind='stable')
+    codes_tries = codes[ordre]
+    debuts = np.searchsorted(codes_tries, codes_tries, side='left')
+    rangs = (np.arange(len(codes)) - debuts).astype('uint64') + 1
+
+    # Les débordements des entiers non signés 64 bits sont voulus (arithmétique modulo 2**64)
+    signatures = np.zeros(nb_partitions, dtype='uint64')
+    np.add.at(signatures, codes_tries, empreintes[ordre] * rangs)
+    return signatures, np.bincount(codes, minlength=nb_partitions), ordre
+
+def mettre_a_jour_planning(df_precedent, df):
+    """
+    Enrichit le planning nettoyé `df` en réutilisant le planning enrichi précédent : seules les
+    partitions (employé, semaine) nouvelles ou modifiées sont recalculées (durées et total de la semaine),
+    les autres lignes sont recopiées telles quelles. Le résultat est identique à enrichir_planning(df).
+    """
+    colonnes = list(df.columns)
+    colonnes_precedentes = [col for col in df_precedent.columns if col not in COLONNES_CALCULEES]
+    # Les colonnes de texte du planning compact sont des catégories (du texte dans le planning nettoyé)
+    types_precedents = [
+        np.dtype(object) if isinstance(dtype, pd.CategoricalDtype) else dtype for dtype in df_precedent[colonnes].dtypes
+    ] if colonnes_precedentes == colonnes else None
+    if colonnes_precedentes != colonnes or types_precedents != list(df.dtypes) or df.empty:
+        return enrichir_planning(df)
+
+    df = df.reset_index(drop=True)
+    codes_precedents, codes, nb_partitions = _codes_partitions(df_precedent, df)
+    signatures, nb_lignes, ordre = signatures_partitions(df, colonnes, codes, nb_partitions)
+    signatures_prec, nb_lignes_prec, ordre_prec = signatures_partitions(
+        df_precedent, colonnes, codes_precedents, nb_partitions
+    )
+    inchangee = (signatures == signatures_prec) & (nb_lignes == nb_lignes_prec) & (nb_lignes > 0)
+
+    reutilisee = inchangee[codes]
+    if not reutilisee.any():
+        return enrichir_planning(df)
+
+    # Dans l'ordre trié par partition, les blocs des partitions inchangées ont la même longueur
+    # dans les deux plannings : la k-ième ligne réutilisée correspond à la k-ième ligne précédente.
+    positions = ordre[inchangee[codes[ordre]]]
+    positions_prec = ordre_prec[inchangee[codes_precedents[ordre_prec]]]
+
+    # Seules les colonnes calculées sont recopiées (les colonnes du fichier viennent de `df`), puis remises
+    # dans l'ordre des lignes de `df` ; compacter_planning rétablit les types du planning compact
+    # (les catégories des lignes reprises et des lignes recalculées peuvent différer)
+    recalculees = np.flatnonzero(~reutilisee)
+    df_recalcule = enrichir_planning(df.iloc[recalculees].copy()) if len(recalculees) else None
+    emplacements = np.argsort(np.concatenate([positions, recalculees]), kind='stable')
+    for col in COLONNES_CALCULEES:
+        morceaux = [df_precedent[col].take(positions_prec)]
+        if df_recalcule is not None:
+            morceaux.append(df_recalcule[col])
+        df[col] = pd.concat(morceaux, ignore_index=True).take(emplacements).reset_index(drop=True)
+
+    return compacter_planning(df)
+
+def heures_inversees(df):
+    """
+    Lignes travaillées dont l'heure de fin précède l'heure de début, hors services de nuit : un service passant
+    minuit est une nuit s'il dure au plus DUREE_MAX_NUIT (22h-6h), sinon les heures ont été saisies à l'envers
+    (18h-10h au lieu de 10h-18h). Duree_Brute n'est jamais négative (+24h quand le service passe minuit),
+    la comparaison porte donc sur les heures converties.
+    """
+    return (
+        (df['Durée du service'] > 0) & (df['Duree_Fin'] < df['Duree_Debut']) & (df['Duree_Brute'] > DUREE_MAX_NUIT)
+    ).to_numpy(dtype=bool, na_value=False)
+
+def verifier_donnees(df_semaine):
+    """Vérifie la logique des données de planning et retourne une liste d'avertissements."""
+    avertissements = []
+    
+    # 1. Vérification : Heure de début après Heure de fin (sans compter les nuits)
+    erreurs_ordre = df_semaine[heures_inversees(df_semaine)]
+    
+    if not erreurs_ordre.empty:
+        jours = ", ".join(erreurs_ordre[COL_JOUR].unique())
+        avertissements.append(MESSAGES_ANOMALIES[ANOMALIE_HEURE_INVERSEE].format(jours=jours))
+
+    # 2. Vérification : Multiples entrées pour le même jour
+    comptage_jours = df_semaine.groupby(COL_JOUR, observed=True).size()
+    multiples_entrees = comptage_jours[comptage_jours > 1]
+    
+    if not multiples_entrees.empty:
+        jours = ", ".join(multiples_entrees.index)
+        avertissements.append(MESSAGES_ANOMALIES[ANOMALIE_MULTIPLES_ENTREES].format(jours=jours))
+    
+    return avertissements
+
+# Types d'anomalies relevées par table_anomalies
+ANOMALIE_HEURE_INVERSEE = "Heure inversée"
+ANOMALIE_MULTIPLES_ENTREES = "Multiples entrées"
+ANOMALIE_CHEVAUCHEMENT = "Chevauchement"
+
+MESSAGES_ANOMALIES = {
+    ANOMALIE_HEURE_INVERSEE: "**Heure inversée :** Les horaires de début et de fin sont inversés pour le(s) jour(s) : **{jours}**. Vérifiez la saisie.",
+    ANOMALIE_MULTIPLES_ENTREES: "**Multiples entrées :** Plusieurs lignes de planning trouvées pour le(s) jour(s) : **{jours}**. Le temps de travail des services est cumulé.",
+    ANOMALIE_CHEVAUCHEMENT: "**Chevauchement :** Des services se chevauchent le(s) jour(s) : **{jours}**. Les heures communes ne sont comptées qu'une fois, vérifiez la saisie.",
+}
+
+def _jours_chevauchants(df, cles, candidats):
+    """
+    Positions des lignes (parmi les candidats) dont le service est en partie couvert par un service du même
+    jour commençant avant lui (fin = début + durée brute, nuits comprises ; voir duree_hors_chevauchement).
+    """
+    positions = np.flatnonzero(candidats)
+    if len(positions) < 2:
+        return positions[:0]
+    groupes = df.iloc[positions].groupby(cles, sort=False, observed=True).ngroup().to_numpy()
+    debut = df['Duree_Debut'].iloc[positions].to_numpy(dtype='int64')
+    duree = df['Duree_Brute'].iloc[positions].to_numpy(dtype='int64')
+    return positions[duree_hors_chevauchement(groupes, debut, debut + duree) < duree]
+
+def table_anomalies(df):
+    """
+    Contrôle de tout le planning en une passe (mêmes règles que verifier_donnees, par employé et par jour,
+    plus la détection des services qui se chevauchent réellement) : dictionnaire
+    (employé, année, semaine) -> {type d'anomalie: jours concernés, dans l'ordre de la semaine}.
+    Calculé au chargement ; les pages n'ont plus qu'à consulter la semaine affichée (avertissements_semaine).
+    """
+    cles = [COL_EMPLOYE, 'ANNEE', COL_SEMAINE, COL_JOUR]
+    duree = df['Duree_Brute']
+
+    # 1. Heure de début après l'heure de fin (sans compter les nuits), sur les lignes travaillées
+    inversees = heures_inversees(df)
+    # 2. Plusieurs lignes pour le même jour
+    multiples = df.groupby(cles, sort=False, observed=True)[COL_JOUR].transform('size').to_numpy() > 1
+    # 3. Parmi elles, services (heures renseignées) qui se chevauchent
+    chevauchements = _jours_chevauchants(df, cles, multiples & (duree > 0).to_numpy())
+
+    morceaux = [
+        df.loc[inversees, cles].assign(TYPE=ANOMALIE_HEURE_INVERSEE),
+        df.loc[multiples, cles].assign(TYPE=ANOMALIE_MULTIPLES_ENTREES),
+        df.iloc[chevauchements][cles].assign(TYPE=ANOMALIE_CHEVAUCHEMENT),
+    ]
+    anomalies = pd.concat(morceaux, ignore_index=True).drop_duplicates()
+    anomalies['RANG_JOUR'] = pd.Categorical(anomalies[COL_JOUR], categories=ORDRE_JOURS).codes
+    anomalies = anomalies.sort_values('RANG_JOUR', kind='stable')
+
+    table = {}
+    for (employe, annee, semaine, type_anomalie), jours in anomalies.groupby(
+        [COL_EMPLOYE, 'ANNEE', COL_SEMAINE, 'TYPE'], sort=False, observed=True
+    )[COL_JOUR]:
+        table.setdefault((employe, int(annee), semaine), {})[type_anomalie] = tuple(jours)
+    return table
+
+def avertissements_semaine(anomalies, employe, annee, semaine):
+    """Avertissements (texte Markdown) d'une semaine d'un employé, d'après table_anomalies."""
+    par_type = anomalies.get((employe, annee, semaine), {})
+    return [
+        MESSAGES_ANOMALIES[type_anomalie].format(jours=", ".join(par_type[type_anomalie]))
+        for type_anomalie in MESSAGES_ANOMALIES if type_anomalie in par_type
+    ]
+
+def statuts_du_mois(df_employe, mois, annee):
+    """Statut (Travail/Repos/École) de chaque jour du mois présent dans les données, en tuple trié (jour, statut)."""
+    # On filtre les données reçues (qui peuvent contenir plusieurs mois) pour n'afficher que le mois en cours.
+    df_mois = df_employe[
+        (df_employe['ANNEE'] == annee) &
+        (df_employe['DATE'].dt.month == mois)
+    ]
+    statuts = pd.Series(df_mois['Statut'].to_numpy(), index=df_mois['DATE'].dt.day.to_numpy())
+    # Note: Si plusieurs entrées existent pour un jour, seul le statut de la dernière ligne sera retenu
+    statuts = statuts[~statuts.index.duplicated(keep='last')]
+    return tuple(sorted(zip(statuts.index.tolist(), statuts.tolist())))
+
+@lru_cache(maxsize=TAILLE_CACHE_CALENDRIERS)
+def generer_html_calendrier(mois, annee, employe_affiche, statuts, aujourdhui, anniversaire=None):
+    """
+    HTML du calendrier mensuel. Mis en cache par (mois, année, employé, statuts du mois, date du jour, anniversaire
+    (mois, jour) de l'employé) : les statuts reflètent à la fois la version des données et les semaines sélectionnées.
+    Le cache est celui du module (comme infos_semaine) : il survit aux réexécutions du script de la page.
+    """
+    statut_par_jour = defaultdict(lambda: 'Repos', statuts)
+    is_admin_view_all = (employe_affiche == "Tous les employés")
+
+    # 2. Préparer les styles
+    styles = {
+        'Travail': 'background-color: #CCFFCC; font-weight: bold;',
+        'Repos': 'background-color: #F0F0F0;',
+        'École': 'background-color: #DDEEFF; color: #0000FF;',
+        'Aujourdhui': 'border: 2px solid #FF0000; font-weight: bold; padding: 2px;',
+        'Anniversaire': 'background-color: #FFFF99; font-weight: bold;',
+        'Default': 'background-color: white;'
+    }
+    
+    # 3. Générer le calendrier HTML
+    cal = calendar.Calendar(firstweekday=calendar.MONDAY)
+    
+    # Utilisation du nom du mois localisé
+    nom_du_mois = date(annee, mois, 1).strftime('%B').title()
+    
+    html_calendar = f"<h4>{nom_du_mois} {annee}</h4>"
+    
+    # Correction pour forcer l'affichage des 7 colonnes
+    html_calendar += "<table style='width: 100%; font-size: 14px; text-align: center; border-collapse: collapse; table-layout: fixed;'>"
+    html_calendar += "<thead><tr>"
+    
+    # Forcer la largeur des en-têtes (noms de jours localisés)
+    jours_semaine = [date(2000, 1, day).strftime('%a').title() for day in range(3, 10)] # Lun, Mar, Mer...
+    for day_name in jours_semaine:
+        html_calendar += f"<th style='width: 14.28%;'>{day_name}</th>"
+    html_calendar += "</tr></thead><tbody>"
+    
+    # Gestion de l'Anniversaire (uniquement en vue individuelle)
+    anniversaire_trouve = False
+    mois_anniv, jour_anniv = None, None
+    
+    if employe_affiche != "Tous les employés" and anniversaire is not None:
+        mois_anniv, jour_anniv = anniversaire
+        if mois == mois_anniv:
+            anniversaire_trouve = True
+            
+    # Utilisation de l'information de l'utilisateur (JULIEN - 18/10)
+    if employe_affiche == "JULIEN" and mois == 10 and jour_anniv == 18:
+        anniversaire_trouve = True
+
+    for week in cal.monthdays2calendar(annee, mois):
+        html_calendar += "<tr>"
+        for day_num, weekday in week:
+            if day_num == 0:
+                html_calendar += "<td style='background-color: #E8E8E8; height: 35px;'></td>"
+                continue
+            
+            day_date = date(annee, mois, day_num)
+            
+            # Application des styles
+            day_style = styles.get('Default')
+            
+            if not is_admin_view_all:
+                day_status = statut_par_jour[day_num]
+                day_style = styles.get(day_status, styles['Default'])
+                
+            # Styles spéciaux
+            if day_date == aujourdhui:
+                day_style += styles['Aujourdhui']
+                
+            if anniversaire_trouve and day_num == jour_anniv:
+                day_style = styles['Anniversaire']
+            
+            html_calendar += f"<td style='{day_style}; border: 1px solid #DDDDDD; height: 35px;'>{day_num}</td>"
+        html_calendar += "</tr>"
+    
+    html_calendar += "</tbody></table>"
+    
+    return html_calendar
+
+# --- FONCTION D'EXPORT MISE À JOUR (Multi-semaines) ---
+def to_excel_buffer_multi(df_initial, employe_selectionne, semaines_a_exporter, annee_selectionnee, index_planning=None):
+    """
+    Crée un buffer Excel en mémoire pour le téléchargement multi-semaines (export limité aux 4 colonnes essentielles).
+    Si `index_planning` (construire_index_planning) est fourni, le filtrage passe par l'index.
+    Le classeur est écrit ligne par ligne (mode constant_memory de xlsxwriter) : seul le fichier
+    compressé final est gardé en mémoire, quelle que soit la taille de l'export.
+    """
+    
+    # 1. Filtrer les données pour les semaines sélectionnées (et l'employé, SAUF si 'Tous les employés')
+    if index_planning is not None:
+        df_export_data = filtrer_planning(
+            df_initial, index_planning,
+            employe=None if employe_selectionne == "Tous les employés" else employe_selectionne,
+            annee=annee_selectionnee,
+            semaines=semaines_a_exporter
+        )
+    else:
+        df_export_data = df_initial[
+            (df_initial[COL_SEMAINE].isin(semaines_a_exporter)) &
+            (df_initial['ANNEE'] == annee_selectionnee)
+        ].copy()
+        
+        if employe_selectionne != "Tous les employés":
+            df_export_data = df_export_data[df_export_data[COL_EMPLOYE] == employe_selectionne].copy()
+    
+    if df_export_data.empty:
+        return None
+        
+    # 2. Calcul du total global (uniquement pour l'info d'en-tête)
+    df_export_data, total_heures_format = calculer_heures_travaillees(df_export_data)
+    
+    # 3. Colonnes exportées et ordre des lignes (employé, semaine puis jour), sans construire de DataFrame trié
+    tous = employe_selectionne == "Tous les employés"
+    cols_to_export = [COL_EMPLOYE, COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN] if tous else [COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN]
+    ordre = ordre_export(df_export_data, par_employe=tous)
+    valeurs = [df_export_data[col].to_numpy() for col in cols_to_export]
+    
+    output = io.BytesIO()
+    
+    try:
+        import xlsxwriter
+        
+        # constant_memory : chaque ligne est écrite sur disque dès que la suivante commence, la mémoire
+        # utilisée ne dépend donc plus du nombre de lignes exportées (les lignes doivent être écrites dans l'ordre).
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        sheet_name = 'Planning Global' if tous else nom_feuille_export(employe_selectionne)
+        ecrire_feuille_export(
+            workbook, sheet_name, employe_selectionne, len(semaines_a_exporter), annee_selectionnee,
+            total_heures_format, valeurs, ordre
+        )
+        workbook.close()
+            
+    except ImportError:
+        raise ErreurPlanning("Erreur d'exportation : Le module 'xlsxwriter' est manquant.")
+          
+    output.seek(0)
+    return output
+
+def nom_feuille_export(employe, noms_pris=()):
+    """
+    Nom de feuille 'Planning <employé>' accepté par Excel : caractères interdits retirés, tronqué à
+    31 caractères et rendu unique parmi `noms_pris` (sans tenir compte de la casse, comme Excel) en
+    remplaçant la fin du nom par un suffixe numérique (~2, ~3...).
+    """
+    nom = CARACTERES_INTERDITS_FEUILLE.sub('', f'Planning {employe}').strip()[:LONGUEUR_MAX_FEUILLE].rstrip(" '")
+    pris = {n.lower() for n in noms_pris}
+    candidat, numero = nom, 1
+    while candidat.lower() in pris:
+        numero += 1
+        suffixe = f'~{numero}'
+        candidat = nom[:LONGUEUR_MAX_FEUILLE - len(suffixe)] + suffixe
+    return candidat
+
+def ordre_export(df_export_data, par_employe):
+    """Positions des lignes dans l'ordre de l'export : (employé,) semaine puis jour de la semaine."""
+    ordre_jours = pd.Categorical(df_export_data[COL_JOUR], categories=ORDRE_JOURS, ordered=True).codes.astype(np.int64)
+    ordre_jours[ordre_jours < 0] = len(ORDRE_JOURS)  # Jours inconnus en dernier
+    cles_tri = [ordre_jours, pd.factorize(df_export_data[COL_SEMAINE], sort=True)[0]]
+    if par_employe:
+        cles_tri.append(pd.factorize(df_export_data[COL_EMPLOYE], sort=True)[0])
+    return np.lexsort(cles_tri)  # Tri stable, la dernière clé est la principale
+
+def valeurs_cellules(valeurs):
+    """
+    Valeurs d'une colonne prêtes pour write_row : les cases vides (NaN, pd.NA, NaT) deviennent None, écrites
+    comme cellules vides (comme pd.ExcelWriter) au lieu de faire échouer write_number.
+    """
+    manquantes = pd.isna(valeurs)
+    if not manquantes.any():
+        return valeurs
+    valeurs = valeurs.astype(object)
+    valeurs[manquantes] = None
+    return valeurs
+
+def ecrire_feuille_export(workbook, sheet_name, employe_selectionne, nb_semaines, annee_selectionnee,
+                          total_heures_format, valeurs, ordre):
+    """
+    Ajoute au classeur xlsxwriter une feuille d'export : en-tête d'informations puis une ligne par position
+    de `ordre`, avec les colonnes `valeurs` (tableaux alignés sur les lignes du planning filtré).
+    Une colonne Employé est ajoutée en tête pour 'Tous les employés'.
+    """
+    tous = employe_selectionne == "Tous les employés"
+    column_names = (['Employé'] if tous else []) + ['Semaine', 'Jour', 'Début', 'Fin']
+    
+    # Formats
+    time_format = workbook.add_format({'num_format': 'hh:mm'})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#DDEEFF', 'border': 1})
+    
+    worksheet = workbook.add_worksheet(sheet_name)
+    
+    # Mise en forme des colonnes
+    start_col_time = 2 if tous else 1
+    worksheet.set_column('A:A', 15) # Employé ou Semaine
+    worksheet.set_column(start_col_time, start_col_time + 1, 12, time_format)  # Début, Fin
+    
+    # Infos de l'en-tête (Lignes 1 à 4)
+    worksheet.write('A1', "Export Global Planning", workbook.add_format({'bold': True, 'font_size': 14}))
+    worksheet.write('A2', f"Employé(s) : {employe_selectionne.title()}")
+    worksheet.write('A3', f"Période: {nb_semaines} semaine(s) de l'année {annee_selectionnee}")
+    worksheet.write('A4', f"TOTAL HEURES NETTES sur la période: {total_heures_format}h", workbook.add_format({'bold': True, 'bg_color': '#CCFFCC'}))
+    
+    # Message d'information sur les heures omises (au-dessus du tableau pour ne masquer aucune ligne)
+    worksheet.write('A6', "NOTE : Les colonnes de calcul (Pause Déduite, Heures Net) ont été omises de cet export.")
+    
+    # En-têtes (ligne 7), puis les données à partir de la ligne 8, lot par lot
+    worksheet.write_row(6, 0, column_names, header_format)
+    row_num = 7
+    for debut_lot in range(0, len(ordre), TAILLE_LOT_EXPORT):
+        lot = ordre[debut_lot:debut_lot + TAILLE_LOT_EXPORT]
+        for ligne in zip(*(valeurs_cellules(v[lot]) for v in valeurs)):
+            worksheet.write_row(row_num, 0, ligne)
+            row_num += 1
+
+def to_excel_buffer_par_employe(df_initial, semaines_a_exporter, annee_selectionnee, index_planning):
+    """
+    Export groupé : un seul classeur avec une feuille par employé pour les semaines sélectionnées,
+    chaque feuille étant identique à l'export individuel de cet employé. Les données ne sont filtrées
+    et triées qu'une fois (par employé, semaine puis jour), puis chaque feuille reçoit sa tranche de lignes.
+    """
+    df_export_data = filtrer_planning(df_initial, index_planning, annee=annee_selectionnee, semaines=semaines_a_exporter)
+    if df_export_data.empty:
+        return None
+    
+    # Totaux d'heures nettes de tous les employés en un seul regroupement (même calcul que calculer_heures_travaillees)
+    durees = df_export_data['Durée du service']
+    totaux = durees.where(durees > 0).groupby(df_export_data[COL_EMPLOYE].to_numpy()).sum()
+    
+    ordre = ordre_export(df_export_data, par_employe=True)
+    employes_tries = df_export_data[COL_EMPLOYE].to_numpy()[ordre]
+    employes, debuts = np.unique(employes_tries, return_index=True)
+    fins = np.append(debuts[1:], len(ordre))
+    valeurs = [df_export_data[col].to_numpy() for col in [COL_SEMAINE, COL_JOUR, COL_DEBUT, COL_FIN]]
+    
+    output = io.BytesIO()
+    
+    try:
+        import xlsxwriter
+        
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        noms_feuilles = []
+        for employe, debut, fin in zip(employes, debuts, fins):
+            noms_feuilles.append(nom_feuille_export(employe, noms_feuilles))
+            ecrire_feuille_export(
+                workbook, noms_feuilles[-1], employe, len(semaines_a_exporter), annee_selectionnee,
+                formater_duree(minutes_en_duree(totaux[employe])).replace("min", ""), valeurs, ordre[debut:fin]
+            )
+        workbook.close()
+            
+    except ImportError:
+        raise ErreurPlanning("Erreur d'exportation : Le module 'xlsxwriter' est manquant.")
+          
+    output.seek(0)
+    return output
+
+class CacheExports:
+    """
+    Classeurs Excel (to_excel_buffer_multi) partagés par toutes les sessions et générés à la demande
+    dans un pool de threads, pour ne pas bloquer les pages. Chaque classeur est identifié par son
+    contenu (cle_export) ; les classeurs prêts sont gardés en mémoire dans la limite de `taille_max`
+    octets, les moins récemment téléchargés étant évincés en premier.
+    """
+
+    def __init__(self, taille_max=TAILLE_CACHE_EXPORTS, nb_threads=NB_THREADS_EXPORT):
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._classeurs = OrderedDict()
+        self._taille = 0
+        self._en_cours = set()
+        self._echecs = {}
+        self._pool = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="export-excel")
+
+    def etat(self, cle):
+        """('pret', contenu), ('en_cours', None), ('echec', message) ou (None, None) si rien n'a été demandé."""
+        with self._verrou:
+            if cle in self._classeurs:
+                self._classeurs.move_to_end(cle)
+                return 'pret', self._classeurs[cle]
+            if cle in self._en_cours:
+                return 'en_cours', None
+            if cle in self._echecs:
+                return 'echec', self._echecs[cle]
+            return None, None
+
+    def demander(self, cle, df_initial, index_planning):
+        """Lance la génération du classeur en arrière-plan (sans effet s'il est déjà prêt ou en cours)."""
+        with self._verrou:
+            if cle in self._classeurs or cle in self._en_cours:
+                return
+            self._echecs.pop(cle, None)
+            self._en_cours.add(cle)
+        self._pool.submit(self._generer, cle, df_initial, index_planning)
+
+    def _generer(self, cle, df_initial, index_planning):
+        employe, semaines, annee, _ = cle
+        try:
+            if employe == EXPORT_PAR_EMPLOYE:
+                buffer = to_excel_buffer_par_employe(df_initial, list(semaines), annee, index_planning)
+            else:
+                buffer = to_excel_buffer_multi(df_initial, employe, list(semaines), annee, index_planning)
+            contenu = buffer.getvalue() if buffer is not None else None
+            erreur = None if contenu is not None else "Aucune donnée de planning à exporter pour la sélection."
+        except Exception as e:
+            contenu, erreur = None, f"Erreur lors de la génération de l'export : {e}"
+
+        with self._verrou:
+            self._en_cours.discard(cle)
+            if contenu is None:
+                self._echecs[cle] = erreur
+                return
+            self._classeurs[cle] = contenu
+            self._taille += len(contenu)
+            # Le classeur qui vient d'être généré est toujours conservé, même s'il dépasse la limite à lui seul
+            while self._taille > self.taille_max and len(self._classeurs) > 1:
+                _, evince = self._classeurs.popitem(last=False)
+                self._taille -= len(evince)
+
+def cle_export(employe_selectionne, semaines_a_exporter, annee_selectionnee, version_planning):
+    """
+    Identifiant d'un export : même sélection sur la même version des données => même classeur.
+    `employe_selectionne` vaut EXPORT_PAR_EMPLOYE pour l'export groupé (to_excel_buffer_par_employe).
+    """
+    return (employe_selectionne, tuple(sorted(semaines_a_exporter)), int(annee_selectionnee), version_planning)
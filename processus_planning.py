@@ -0,0 +1,23 @@
+"""
+Point d'entrée neutre des processus de travail du noyau (executer_en_processus dans noyau_planning) :
+
+    python processus_planning.py < (fonction, arguments) picklés > (succès, résultat ou exception) picklés
+
+Les processus 'spawn' de multiprocessing réimportent le module __main__ de leur parent : sous « streamlit run »,
+c'est le script app.py (Streamlit l'installe dans sys.modules), que chaque processus réexécuterait (page de
+connexion, préchauffage du planning, nouveaux processus). Lancé par ce script, un processus de travail n'importe
+que les modules des fonctions qu'il exécute.
+"""
+import pickle
+import sys
+
+if __name__ == "__main__":
+    sortie = sys.stdout.buffer
+    sys.stdout = sys.stderr  # Les affichages de la fonction ne se mêlent pas au résultat
+    fonction, arguments = pickle.load(sys.stdin.buffer)
+    try:
+        resultat = (True, fonction(*arguments))
+    except Exception as erreur:
+        resultat = (False, erreur)
+    pickle.dump(resultat, sortie, protocol=pickle.HIGHEST_PROTOCOL)
+    sortie.flush()
@@ -0,0 +1,26 @@
+"""
+Lance le serveur Streamlit de l'application en préchauffant le planning dès le démarrage du processus,
+avant l'arrivée de la première session (la première connexion n'attend plus la lecture du classeur) :
+
+    python serveur.py [options de « streamlit run »]
+
+Le temps entre le démarrage et la disponibilité du planning est affiché dans la console.
+"""
+import logging
+import os
+import sys
+
+from streamlit.web import cli as stcli
+
+import noyau_planning
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    # Même fichier et même stockage que NOM_DU_FICHIER et STOCKAGE_PLANNING dans app.py
+    noyau_planning.prechauffer(
+        os.environ.get("PLANNING_FICHIER", "RePlannings1.2.xlsx"), os.environ.get("PLANNING_STOCKAGE", "memoire")
+    )
+
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app, *sys.argv[1:]]
+    sys.exit(stcli.main())